@@ -0,0 +1 @@
+# Make benchmarks directory a proper Python package
\ No newline at end of file
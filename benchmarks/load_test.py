@@ -0,0 +1,787 @@
+"""
+HTTP load test for the RFQ web routes.
+
+Starts app.py in a child process against a scratch PostgreSQL database, with
+the AI services replayed offline (services/providers.py), and drives it with
+virtual users walking realistic journeys:
+
+    browse   GET /rfq/, a filtered dashboard page, then one RFQ's page
+    create   GET /rfq/new, POST /rfq/new (multipart PDF or DOCX upload),
+             POST /rfq/<id>/process, GET /rfq/<id>, PUT /rfq/<id>/items
+    edit     GET /rfq/<id> of an existing RFQ, then PUT /rfq/<id>/items
+             (a 409 from a concurrent edit is an expected answer)
+
+Users are closed-loop: each waits for a response, then "thinks" for an
+exponentially distributed time before the next request. The number of users
+is raised step by step (--steps); each step reports requests and journeys
+per second, error rate and p50/p95/p99 latency overall and per route.
+
+The server is saturated at the first step where the added users raise
+throughput by less than --min-scaling of linear scaling (doubling the users
+should double requests per second), the error rate passes --max-error-rate,
+or p95 passes --slo-p95-ms. The ramp stops there, and the saturating load is
+run once more for --profile-seconds with every request profiled. That pass
+is kept as a profile snapshot: the merged cProfile stats of the request
+threads (load with pstats or snakeviz), a top-functions report and the app's
+/metrics. The measured steps run without the profiler, so its overhead does
+not move the saturation point. Results are appended to a JSONL history with
+the git commit:
+
+    LOAD_TEST_DATABASE_URL=postgresql://localhost/rfq_load_test \\
+        python -m benchmarks.load_test --steps 1,2,4,8,16,32 --step-seconds 30
+    python -m benchmarks.load_test --latency openai=lognormal:1.5,0.4 --think-time 2 --compare
+
+The database is dropped and recreated, so it must not be the application's.
+"""
+import os
+import re
+import sys
+import io
+import json
+import html
+import time
+import uuid
+import random
+import shutil
+import pstats
+import cProfile
+import marshal
+import socket
+import argparse
+import datetime
+import platform
+import tempfile
+import threading
+import subprocess
+import http.client
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from config import settings
+from benchmarks.pipeline_throughput import (
+    synthetic_items, document_lines, write_pdf, write_docx, summarize, git_commit, load_history
+)
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Profiler control routes, answered by the load-test server in front of the app
+CONTROL_PREFIX = "/__load_test"
+
+JOURNEYS = ("browse", "create", "edit")
+
+
+# Server side (python -m benchmarks.load_test --serve, started by main())
+
+class RequestProfiler:
+    """
+    While enabled, runs each request under its own cProfile.Profile and
+    merges the results. cProfile's clock is wall time, so a request waiting
+    on PostgreSQL, the connection pool or a stubbed provider is charged to
+    the call it waits in.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._stats: Optional[pstats.Stats] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            self._stats = None
+            self.enabled = True
+
+    def stop(self) -> Optional[pstats.Stats]:
+        with self._lock:
+            self.enabled = False
+            stats, self._stats = self._stats, None
+            return stats
+
+    def add(self, profile: cProfile.Profile):
+        with self._lock:
+            if not self.enabled:
+                return
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+
+class _ControlMiddleware:
+    """Serves the profiler control routes and profiles the app's requests while enabled"""
+
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path.startswith(CONTROL_PREFIX + "/"):
+            return self.control(path, start_response)
+        if not self.profiler.enabled:
+            return self.app(environ, start_response)
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            # Render the whole body inside the profile
+            response = self.app(environ, start_response)
+            try:
+                return [b"".join(response)]
+            finally:
+                if hasattr(response, "close"):
+                    response.close()
+        finally:
+            profile.disable()
+            self.profiler.add(profile)
+
+    def control(self, path: str, start_response):
+        if path == CONTROL_PREFIX + "/profile/start":
+            self.profiler.start()
+            body = b"started\n"
+        elif path == CONTROL_PREFIX + "/profile/stop":
+            # The merged stats in the pstats file format (marshal of Stats.stats)
+            stats = self.profiler.stop()
+            body = marshal.dumps(stats.stats if stats is not None else {})
+        else:
+            start_response("404 Not Found", [("Content-Type", "text/plain")])
+            return [b"unknown control route\n"]
+        start_response("200 OK", [("Content-Type", "application/octet-stream"), ("Content-Length", str(len(body)))])
+        return [body]
+
+
+def serve(host: str, port: int) -> int:
+    """Reset the scratch database and serve app.py the way app.run() does (threaded werkzeug)"""
+    from werkzeug.serving import make_server, WSGIRequestHandler
+
+    # Only ever reset a database the parent process checked and passed in
+    if not os.getenv("LOAD_TEST_DATABASE_URL") or os.getenv("LOAD_TEST_DATABASE_URL") != settings.DATABASE_URL:
+        print("❌ --serve needs LOAD_TEST_DATABASE_URL equal to DATABASE_URL; start it through main()")
+        return 2
+
+    from app import app
+    from db_models import db
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        # The access log would cost the server as much as some routes
+        def log_request(self, *args, **kwargs):
+            pass
+
+    server = make_server(host, port, _ControlMiddleware(app, RequestProfiler()), threaded=True,
+                         request_handler=QuietRequestHandler)
+    print(f"✅ Load-test server listening on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def profile_report(path: str, top: int = 30) -> str:
+    """Functions of a pstats file by own time and by cumulative time"""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    if not stats.stats:
+        return "No requests were profiled\n"
+    out.write("By own time:\n")
+    stats.sort_stats("tottime").print_stats(top)
+    out.write("By cumulative time:\n")
+    stats.sort_stats("cumulative").print_stats(top)
+    return out.getvalue()
+
+
+# Client side
+
+class _JourneyAborted(Exception):
+    """The step ended, or a request failed and the rest of the journey cannot follow"""
+
+
+class Recorder:
+    """Request samples of one step, from every virtual user"""
+
+    def __init__(self, measure_from: float):
+        self.measure_from = measure_from
+        self.requests: List[Tuple[str, int, float, bool]] = []
+        self.journeys: Dict[str, int] = {}
+        self.errors: List[str] = []
+        self._lock = threading.Lock()
+
+    def request(self, route: str, status: int, started: float, seconds: float, ok: bool, error: str):
+        if started < self.measure_from:
+            return
+        with self._lock:
+            self.requests.append((route, status, seconds, ok))
+            if not ok:
+                self.errors.append(f"{route}: {error}")
+
+    def journey(self, name: str, started: float):
+        if started < self.measure_from:
+            return
+        with self._lock:
+            self.journeys[name] = self.journeys.get(name, 0) + 1
+
+
+class SharedState:
+    """RFQs created so far, for the browse and edit journeys"""
+
+    def __init__(self):
+        self.rfq_ids: List[str] = []
+        self._lock = threading.Lock()
+
+    def add(self, rfq_id: str):
+        with self._lock:
+            self.rfq_ids.append(rfq_id)
+
+    def pick(self, rng: random.Random) -> Optional[str]:
+        with self._lock:
+            return rng.choice(self.rfq_ids) if self.rfq_ids else None
+
+
+def multipart_body(fields: Dict[str, str], files: List[Tuple[str, str, bytes]]) -> Tuple[bytes, str]:
+    """multipart/form-data body for fields and (field, filename, content) files"""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        )
+    for name, filename, content in files:
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode("utf-8") + content + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+_ROW = re.compile(
+    r'<tr data-item-id="([^"]*)">.*?class="form-control item-name" value="([^"]*)".*?'
+    r'class="form-control item-quantity" value="([^"]*)".*?'
+    r'<textarea class="form-control item-description">(.*?)</textarea>',
+    re.S
+)
+_RFQ_ID = re.compile(r'data-rfq-id="([^"]+)"')
+_UPDATED_AT = re.compile(r'data-updated-at="([^"]*)"')
+
+
+def parse_rfq_page(page: str) -> Tuple[Optional[str], str, List[Dict[str, Any]]]:
+    """RFQ id, updated_at and items from data_extraction.html, as data_extraction.js reads them"""
+    rfq_id = _RFQ_ID.search(page)
+    updated_at = _UPDATED_AT.search(page)
+    items = [
+        {
+            "id": html.unescape(item_id),
+            "name": html.unescape(name),
+            "quantity": int(quantity) if quantity.isdigit() else 1,
+            "description": html.unescape(description)
+        }
+        for item_id, name, quantity, description in _ROW.findall(page)
+    ]
+    return rfq_id.group(1) if rfq_id else None, html.unescape(updated_at.group(1)) if updated_at else "", items
+
+
+class VirtualUser:
+    """One simulated user with its own HTTP connection and random stream"""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        recorder: Recorder,
+        state: SharedState,
+        documents: List[Tuple[str, bytes]],
+        think_time: float,
+        timeout: float,
+        deadline: float,
+        rng: random.Random
+    ):
+        self.recorder = recorder
+        self.state = state
+        self.documents = documents
+        self.think_time = think_time
+        self.deadline = deadline
+        self.rng = rng
+        self.connection = http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def think(self):
+        if self.think_time > 0:
+            time.sleep(max(0.0, min(self.rng.expovariate(1 / self.think_time), self.deadline - time.perf_counter())))
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        route: str,
+        body: Optional[bytes] = None,
+        headers: Optional[Dict[str, str]] = None,
+        expected: Sequence[int] = (200,)
+    ) -> Tuple[int, bytes]:
+        """Send one request and record it; a failed request aborts the journey"""
+        started = time.perf_counter()
+        if started >= self.deadline:
+            raise _JourneyAborted()
+        error = ""
+        try:
+            self.connection.request(method, path, body=body, headers=headers or {})
+            response = self.connection.getresponse()
+            payload = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException) as e:
+            self.connection.close()
+            status, payload, error = 0, b"", f"{type(e).__name__}: {e}"
+        ok = status in expected
+        if not ok and not error:
+            error = f"HTTP {status}"
+        self.recorder.request(route, status, started, time.perf_counter() - started, ok, error)
+        if not ok:
+            raise _JourneyAborted()
+        return status, payload
+
+    def browse(self):
+        self.request("GET", "/rfq/", "GET /rfq/")
+        self.think()
+        status = self.rng.choice(["draft", "ready"])
+        self.request("GET", f"/rfq/?status={status}", "GET /rfq/?status")
+        rfq_id = self.state.pick(self.rng)
+        if rfq_id:
+            self.think()
+            self.request("GET", f"/rfq/{rfq_id}", "GET /rfq/<id>")
+
+    def create(self):
+        self.request("GET", "/rfq/new", "GET /rfq/new")
+        self.think()
+        filename, content = self.rng.choice(self.documents)
+        body, content_type = multipart_body(
+            {"client_name": f"Load Test Client {self.rng.randint(1, 50)}", "notes": "load test"},
+            [("files", filename, content)]
+        )
+        _, page = self.request("POST", "/rfq/new", "POST /rfq/new", body, {"Content-Type": content_type})
+        rfq_id, _, _ = parse_rfq_page(page.decode("utf-8", "replace"))
+        if not rfq_id:
+            self.recorder.request("POST /rfq/new", 200, time.perf_counter(), 0.0, False, "No RFQ id in the page")
+            raise _JourneyAborted()
+        self.think()
+        self.request("POST", f"/rfq/{rfq_id}/process", "POST /rfq/<id>/process")
+        self.state.add(rfq_id)
+        self.think()
+        self.edit(rfq_id)
+
+    def edit(self, rfq_id: Optional[str] = None):
+        rfq_id = rfq_id or self.state.pick(self.rng)
+        if not rfq_id:
+            return
+        _, page = self.request("GET", f"/rfq/{rfq_id}", "GET /rfq/<id>")
+        _, updated_at, items = parse_rfq_page(page.decode("utf-8", "replace"))
+        self.think()
+        # Change a quantity, drop one item and add one, as an editor would
+        if items:
+            self.rng.choice(items)["quantity"] = self.rng.choice([1, 2, 5, 10, 25])
+        if len(items) > 1:
+            items.pop(self.rng.randrange(len(items)))
+        items.append({"id": f"new-{uuid.uuid4().hex[:8]}", "name": "Safety Gloves", "quantity": 10,
+                      "description": "added during load test"})
+        body = json.dumps({"items": items, "updated_at": updated_at}).encode("utf-8")
+        self.request("PUT", f"/rfq/{rfq_id}/items", "PUT /rfq/<id>/items", body,
+                     {"Content-Type": "application/json"}, expected=(200, 409))
+
+    def run(self, mix: Dict[str, float]):
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        while time.perf_counter() < self.deadline:
+            name = self.rng.choices(names, weights=weights)[0]
+            started = time.perf_counter()
+            try:
+                getattr(self, name)()
+                self.recorder.journey(name, started)
+            except _JourneyAborted:
+                pass
+            self.think()
+        self.connection.close()
+
+
+def build_documents(directory: str, count: int, seed: int) -> List[Tuple[str, bytes]]:
+    """RFQ documents to upload: PDFs and DOCX files of mostly small, sometimes long item lists"""
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    documents = []
+    for number in range(count):
+        items = synthetic_items(rng, rng.randint(3, 10) if rng.random() < 0.8 else rng.randint(20, 60))
+        attachment = {"items": items, "style": rng.randrange(3)}
+        if number % 2 == 0:
+            filename = f"rfq-{number:03d}.pdf"
+            write_pdf(os.path.join(directory, filename), document_lines(attachment))
+        else:
+            filename = f"rfq-{number:03d}.docx"
+            write_docx(os.path.join(directory, filename), attachment)
+        with open(os.path.join(directory, filename), "rb") as source:
+            documents.append((filename, source.read()))
+    return documents
+
+
+def summarize_step(recorder: Recorder, users: int, seconds: float) -> Dict[str, Any]:
+    routes: Dict[str, List[Tuple[int, float, bool]]] = {}
+    for route, status, latency, ok in recorder.requests:
+        routes.setdefault(route, []).append((status, latency, ok))
+
+    def stats(samples: List[Tuple[int, float, bool]]) -> Dict[str, Any]:
+        errors = sum(1 for _, _, ok in samples if not ok)
+        return {
+            "requests": len(samples),
+            "per_second": round(len(samples) / seconds, 3) if seconds else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+            "latency": summarize([latency * 1000 for _, latency, _ in samples]) if samples else {}
+        }
+
+    everything = [sample for samples in routes.values() for sample in samples]
+    journeys = sum(recorder.journeys.values())
+    return {
+        "users": users,
+        "seconds": round(seconds, 3),
+        **stats(everything),
+        "journeys": dict(sorted(recorder.journeys.items())),
+        "journeys_per_second": round(journeys / seconds, 3) if seconds else 0.0,
+        "conflicts": sum(1 for route, status, _, _ in recorder.requests if status == 409),
+        "routes": {route: stats(samples) for route, samples in sorted(routes.items())},
+        "error_samples": sorted(set(recorder.errors))[:5]
+    }
+
+
+def saturation_reason(
+    step: Dict[str, Any],
+    previous: Optional[Dict[str, Any]],
+    min_scaling: float,
+    max_error_rate: float,
+    slo_p95_ms: Optional[float]
+) -> Optional[str]:
+    """Why the server counts as saturated at this step, or None"""
+    if step["error_rate"] > max_error_rate:
+        return f"error rate {step['error_rate'] * 100:.1f}% > {max_error_rate * 100:.1f}%"
+    if slo_p95_ms is not None and step["latency"] and step["latency"]["p95_ms"] > slo_p95_ms:
+        return f"p95 {step['latency']['p95_ms']:.0f}ms > {slo_p95_ms:.0f}ms"
+    if previous is not None and previous["per_second"] and step["users"] > previous["users"]:
+        # Throughput gained relative to the gain linear scaling would give
+        gained = step["per_second"] / previous["per_second"] - 1
+        linear = step["users"] / previous["users"] - 1
+        if gained < min_scaling * linear:
+            return (f"{step['per_second']:.1f} requests/s at {step['users']} users vs "
+                    f"{previous['per_second']:.1f}/s at {previous['users']} ({gained / linear * 100:.0f}% of linear)")
+    return None
+
+
+def _free_port(host: str) -> int:
+    with socket.socket() as probe:
+        probe.bind((host, 0))
+        return probe.getsockname()[1]
+
+
+def _get(host: str, port: int, path: str, method: str = "GET", timeout: float = 60) -> Tuple[int, bytes]:
+    connection = http.client.HTTPConnection(host, port, timeout=timeout)
+    try:
+        connection.request(method, path)
+        response = connection.getresponse()
+        return response.status, response.read()
+    finally:
+        connection.close()
+
+
+def start_server(
+    host: str,
+    port: int,
+    database_url: str,
+    work_dir: str,
+    latencies: Dict[str, str],
+    pdf_backend: str,
+    seed: int
+) -> subprocess.Popen:
+    """Start app.py in a child process with offline providers and wait until /health answers"""
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": os.pathsep.join(filter(None, [REPO_ROOT, env.get("PYTHONPATH")])),
+        "DATABASE_URL": database_url,
+        "LOAD_TEST_DATABASE_URL": database_url,
+        "PROVIDER_MODE": "replay",
+        "PROVIDER_REPLAY_MISSING": "synthetic",
+        "PROVIDER_FIXTURES_DIR": os.path.join(work_dir, "fixtures"),
+        "PROVIDER_LATENCY_OPENAI": latencies["openai"],
+        "PROVIDER_LATENCY_AZURE": latencies["azure"],
+        "PROVIDER_LATENCY_VISION": latencies["vision"],
+        "PROVIDER_SEED": str(seed),
+        "TRACE_EXPORT_PATH": os.path.join(work_dir, "traces.jsonl"),
+        # Set, with any value, so PDFs go through replayed Azure layout instead of PyPDF2
+        "AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT": "https://replay.invalid/" if pdf_backend == "azure" else "",
+        "AZURE_DOCUMENT_INTELLIGENCE_KEY": "replay" if pdf_backend == "azure" else ""
+    })
+    log = open(os.path.join(work_dir, "server.log"), "w")
+    # The server's cwd is the work directory, so uploads/ lands there
+    process = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.load_test", "--serve", "--host", host, "--port", str(port)],
+        cwd=work_dir, env=env, stdout=log, stderr=subprocess.STDOUT
+    )
+    log.close()
+    deadline = time.monotonic() + 120
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}; see {os.path.join(work_dir, 'server.log')}")
+        try:
+            if _get(host, port, "/health", timeout=5)[0] == 200:
+                return process
+        except OSError:
+            pass
+        time.sleep(0.25)
+    process.terminate()
+    raise RuntimeError(f"Server did not answer /health; see {os.path.join(work_dir, 'server.log')}")
+
+
+def run_step(
+    host: str,
+    port: int,
+    users: int,
+    seconds: float,
+    warmup: float,
+    state: SharedState,
+    documents: List[Tuple[str, bytes]],
+    mix: Dict[str, float],
+    think_time: float,
+    timeout: float,
+    seed: int
+) -> Dict[str, Any]:
+    """Run users virtual users for warmup + seconds; only requests started after the warmup count"""
+    start = time.perf_counter()
+    recorder = Recorder(start + warmup)
+    deadline = start + warmup + seconds
+    virtual_users = [
+        VirtualUser(host, port, recorder, state, documents, think_time, timeout, deadline,
+                    random.Random(seed * 100003 + users * 1009 + number))
+        for number in range(users)
+    ]
+    threads = [threading.Thread(target=user.run, args=(mix,), daemon=True) for user in virtual_users]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Requests still in flight at the deadline are counted, so the window runs until they finish
+    return summarize_step(recorder, users, time.perf_counter() - recorder.measure_from)
+
+
+def write_snapshot(
+    directory: str,
+    step: Dict[str, Any],
+    reason: Optional[str],
+    profiled: Dict[str, Any],
+    profile_data: bytes,
+    metrics_text: str
+):
+    """The saturated step, the profiled pass, its pstats file and report, and /metrics"""
+    os.makedirs(directory, exist_ok=True)
+    profile_path = os.path.join(directory, "profile.pstats")
+    with open(profile_path, "wb") as out:
+        out.write(profile_data)
+    with open(os.path.join(directory, "profile.txt"), "w", encoding="utf-8") as out:
+        out.write(f"{step['users']} users, {step['per_second']} requests/s "
+                  f"({('saturated: ' + reason) if reason else 'not saturated, last step'}); "
+                  f"profiled pass: {profiled['per_second']} requests/s over {profiled['seconds']}s\n\n")
+        out.write(profile_report(profile_path))
+    with open(os.path.join(directory, "metrics.prom"), "w", encoding="utf-8") as out:
+        out.write(metrics_text)
+    with open(os.path.join(directory, "step.json"), "w", encoding="utf-8") as out:
+        json.dump({"step": step, "reason": reason, "profiled": profiled}, out, indent=2)
+
+
+def print_step(step: Dict[str, Any]):
+    latency = step["latency"] or {}
+    print(f"{step['users']:>6} {step['requests']:>8} {step['per_second']:>9.2f} {step['journeys_per_second']:>10.2f} "
+          f"{step['error_rate'] * 100:>6.2f}% {latency.get('p50_ms', 0):>9.1f} {latency.get('p95_ms', 0):>9.1f} "
+          f"{latency.get('p99_ms', 0):>9.1f} {step['conflicts']:>9}")
+    for sample in step["error_samples"]:
+        print(f"    ❌ {sample}")
+
+
+def print_routes(step: Dict[str, Any]):
+    print(f"\n{'route at ' + str(step['users']) + ' users':<28} {'requests':>8} {'per sec':>9} {'errors':>7} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, stats in step["routes"].items():
+        latency = stats["latency"] or {}
+        print(f"{route:<28} {stats['requests']:>8} {stats['per_second']:>9.2f} {stats['errors']:>7} "
+              f"{latency.get('p50_ms', 0):>9.1f} {latency.get('p95_ms', 0):>9.1f} {latency.get('p99_ms', 0):>9.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load-test the RFQ web routes at increasing concurrency")
+    parser.add_argument("--database-url", default=os.getenv("LOAD_TEST_DATABASE_URL"))
+    parser.add_argument("--steps", default="1,2,4,8,16,32", help="Concurrent users per step")
+    parser.add_argument("--step-seconds", type=float, default=30)
+    parser.add_argument("--warmup-seconds", type=float, default=3, help="Not measured, at the start of each step")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Mean pause between a user's requests")
+    parser.add_argument("--mix", default="browse=0.5,create=0.2,edit=0.3", help="Journey weights")
+    parser.add_argument("--seed-rfqs", type=int, default=20, help="RFQs created before the first step")
+    parser.add_argument("--documents", type=int, default=12, help="Distinct documents to upload")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument("--pdf-backend", choices=["pypdf2", "azure"], default="pypdf2")
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=SPEC",
+                        help="Replay latency per service (openai, azure, vision), e.g. openai=lognormal:1.5,0.4")
+    parser.add_argument("--min-scaling", type=float, default=0.5,
+                        help="Saturated when added users scale throughput by less than this fraction of linear")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument("--slo-p95-ms", type=float, default=None)
+    parser.add_argument("--keep-going", action="store_true", help="Run every step, also past saturation")
+    parser.add_argument("--profile-seconds", type=float, default=10,
+                        help="Length of the profiled pass at the saturating load")
+    parser.add_argument("--results", default="benchmarks/results/load_test.jsonl")
+    parser.add_argument("--snapshot-dir", default="benchmarks/results/load_test",
+                        help="Saturation snapshots go to a timestamped directory under this one")
+    parser.add_argument("--work-dir", default=None, help="Uploads and server log; default: a temporary directory")
+    parser.add_argument("--compare", action="store_true", help="Compare with the previous run with the same settings")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        return serve(args.host, args.port)
+
+    if not args.database_url:
+        print("❌ Set LOAD_TEST_DATABASE_URL or pass --database-url (a scratch database)")
+        return 2
+    if args.database_url == settings.DATABASE_URL:
+        print("❌ Refusing to reset the application database; use a scratch database")
+        return 2
+
+    latencies = {"openai": "none", "azure": "none", "vision": "none"}
+    for option in args.latency:
+        service, _, spec = option.partition("=")
+        if service not in latencies or not spec:
+            parser.error(f"Invalid --latency {option!r}")
+        latencies[service] = spec
+    mix: Dict[str, float] = {}
+    for option in args.mix.split(","):
+        name, _, weight = option.partition("=")
+        if name.strip() not in JOURNEYS:
+            parser.error(f"Unknown journey {name!r} in --mix (known: {', '.join(JOURNEYS)})")
+        mix[name.strip()] = float(weight or 1)
+    steps = [int(users) for users in args.steps.split(",") if users.strip()]
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="rfq-load-test-")
+    os.makedirs(work_dir, exist_ok=True)
+    documents = build_documents(os.path.join(work_dir, "documents"), args.documents, args.seed)
+    port = args.port or _free_port(args.host)
+    print(f"🔄 Starting the app on {args.host}:{port} (work directory {work_dir})...")
+    server = start_server(args.host, port, args.database_url, work_dir, latencies, args.pdf_backend,
+                          args.seed)
+
+    results: List[Dict[str, Any]] = []
+    saturated: Optional[Tuple[Dict[str, Any], str]] = None
+    try:
+        state = SharedState()
+        if args.seed_rfqs:
+            print(f"🔄 Creating {args.seed_rfqs} RFQs...")
+            seeder = VirtualUser(args.host, port, Recorder(0.0), state, documents, 0.0, args.timeout,
+                                 float("inf"), random.Random(args.seed))
+            for _ in range(args.seed_rfqs):
+                try:
+                    seeder.create()
+                except _JourneyAborted:
+                    pass
+            seeder.connection.close()
+            if not state.rfq_ids:
+                print(f"❌ Could not create any RFQ; see {os.path.join(work_dir, 'server.log')}")
+                return 1
+
+        print(f"\n{'users':>6} {'requests':>8} {'req/s':>9} {'journeys/s':>10} {'errors':>7} "
+              f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'conflicts':>9}")
+        for users in steps:
+            step = run_step(args.host, port, users, args.step_seconds, args.warmup_seconds, state, documents,
+                            mix, args.think_time, args.timeout, args.seed)
+            reason = saturation_reason(step, results[-1] if results else None,
+                                       args.min_scaling, args.max_error_rate, args.slo_p95_ms)
+            results.append(step)
+            print_step(step)
+            if reason and saturated is None:
+                saturated = (step, reason)
+                print(f"    ⚠️ Saturated: {reason}")
+                if not args.keep_going:
+                    break
+
+        # Profile the saturating load (or the highest one, if the server kept up)
+        step, reason = saturated if saturated is not None else (results[-1], None)
+        print(f"🔄 Profiling {args.profile_seconds:g}s at {step['users']} users...")
+        _get(args.host, port, CONTROL_PREFIX + "/profile/start", "POST")
+        profiled = run_step(args.host, port, step["users"], args.profile_seconds, args.warmup_seconds, state,
+                            documents, mix, args.think_time, args.timeout, args.seed + 1)
+        profile_data = _get(args.host, port, CONTROL_PREFIX + "/profile/stop", "POST")[1]
+        metrics_text = _get(args.host, port, "/metrics")[1].decode("utf-8")
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    timestamp = datetime.datetime.now().isoformat(timespec="seconds")
+    snapshot = os.path.join(args.snapshot_dir, f"{timestamp.replace(':', '')}-{step['users']}users")
+    write_snapshot(snapshot, step, reason, profiled, profile_data, metrics_text)
+    print_routes(step)
+
+    # Capacity: the best step before saturation (or overall, if it never saturated)
+    sustainable = [result for result in results if saturated is None or result["users"] < saturated[0]["users"]]
+    best = max(sustainable or results[:1], key=lambda result: result["per_second"])
+    if saturated is not None:
+        print(f"\n⚠️ Saturated at {step['users']} users ({reason}); "
+              f"best sustained: {best['per_second']:.2f} requests/s at {best['users']} users")
+    else:
+        print(f"\n✅ Not saturated up to {step['users']} users: {best['per_second']:.2f} requests/s at {best['users']}")
+    print(f"📸 Profile snapshot: {snapshot}")
+
+    commit, dirty = git_commit()
+    result = {
+        "benchmark": "load_test",
+        "timestamp": timestamp,
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {
+            "steps": steps,
+            "step_seconds": args.step_seconds,
+            "warmup_seconds": args.warmup_seconds,
+            "think_time": args.think_time,
+            "mix": mix,
+            "seed_rfqs": args.seed_rfqs,
+            "documents": args.documents,
+            "seed": args.seed,
+            "pdf_backend": args.pdf_backend,
+            "latency": latencies
+        },
+        "steps": results,
+        "saturation": {"users": step["users"], "reason": reason} if saturated is not None else None,
+        "capacity": {"users": best["users"], "per_second": best["per_second"]},
+        "snapshot": snapshot
+    }
+
+    history = load_history(args.results)
+    if args.compare:
+        comparable = [previous for previous in history if previous.get("settings") == result["settings"]]
+        if comparable:
+            previous = comparable[-1]
+            old = previous["capacity"]["per_second"]
+            change = f"{(best['per_second'] - old) / old * 100:+.1f}%" if old else "n/a"
+            print(f"Compared with {(previous.get('commit') or 'unknown')[:10]} ({previous['timestamp']}): "
+                  f"capacity {old:.2f} -> {best['per_second']:.2f} requests/s ({change}), saturation at "
+                  f"{(previous.get('saturation') or {}).get('users', '-')} -> "
+                  f"{(result['saturation'] or {}).get('users', '-')} users")
+        else:
+            print("No previous result with these settings to compare with")
+    if args.results:
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        with open(args.results, "a", encoding="utf-8") as out:
+            out.write(json.dumps(result) + "\n")
+        print(f"Result appended to {args.results} (commit {(commit or 'unknown')[:10]}{', dirty' if dirty else ''})")
+
+    if not args.work_dir:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,572 @@
+"""
+End-to-end throughput benchmark for RFQ document extraction and ingestion.
+
+Generates a reproducible corpus of RFQ emails with PDF, DOCX, XLSX, CSV and
+PNG attachments of varied sizes, then runs process_document over every
+attachment and RFQPipeline.process over every email. OpenAI, Azure and
+Google Vision are replayed offline (services/providers.py): OCR and layout
+answers are written as fixtures with the corpus, chat completions are
+synthesized locally, and each call waits for a configurable simulated
+latency (none by default, so the run measures the pipeline's own work).
+
+Reports documents per second, p50/p95/p99 latency per stage (from the
+tracing spans) and peak RSS. Each result is appended to a JSONL history
+with the git commit and the corpus id, and --compare prints the change
+against the previous run on the same corpus and settings:
+
+    python -m benchmarks.pipeline_throughput --emails 200 --concurrency 4 --compare
+    python -m benchmarks.pipeline_throughput --latency openai=lognormal:1.5,0.4 --latency vision=fixed:0.8
+
+Nothing leaves the machine: notifications go to a stub sender and RFQs are
+only written to the database with --persist (which needs the application
+database).
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import datetime
+import platform
+import resource
+import subprocess
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from config import settings
+from models import FileType
+from services.providers import (
+    ProviderRouter, set_provider_router, request_key, layout_request, vision_request
+)
+from services.tracing import tracer
+from services.rate_limit import RateLimiter
+
+# Bump when the generated corpus changes, so old results stop comparing against new ones
+CORPUS_VERSION = 1
+
+ITEM_NOUNS = [
+    "laptop", "monitor", "network switch", "router", "server rack", "ups battery", "drill", "angle grinder",
+    "safety gloves", "safety helmet", "hydraulic pump", "ball valve", "bearing", "induction motor",
+    "proximity sensor", "led panel", "cable tray", "copper cable", "fastener kit", "office chair",
+    "filing cabinet", "lab beaker", "ph meter", "packing tape", "steel pipe", "pvc pipe", "relay",
+    "circuit breaker", "toner cartridge", "thermal printer"
+]
+ITEM_QUALIFIERS = [
+    "industrial", "heavy duty", "14 inch", "24 port", "stainless", "3 phase", "wireless", "compact",
+    "explosion proof", "high precision", "galvanized", "ergonomic", "10 kva", "m12", "class a"
+]
+BRANDS = ["Dell", "HP", "Cisco", "Bosch", "Siemens", "ABB", "Tata", "Makita", "3M", "Schneider", "SKF"]
+SIZE_CLASSES = [((3, 10), 0.6), ((20, 60), 0.3), ((150, 400), 0.1)]
+ATTACHMENT_MIX = [("pdf", 0.35), ("docx", 0.2), ("xlsx", 0.15), ("csv", 0.1), ("png", 0.2)]
+ATTACHMENT_FILE_TYPES = {"pdf": FileType.PDF, "docx": FileType.DOCX, "xlsx": FileType.EXCEL,
+                         "csv": FileType.EXCEL, "png": FileType.IMAGE}
+
+
+def _weighted(rng: random.Random, choices):
+    return rng.choices([value for value, _ in choices], weights=[weight for _, weight in choices])[0]
+
+
+def synthetic_items(rng: random.Random, count: int) -> List[Dict[str, Any]]:
+    items = []
+    for _ in range(count):
+        noun = rng.choice(ITEM_NOUNS)
+        name = f"{rng.choice(ITEM_QUALIFIERS)} {noun}".title()
+        if rng.random() < 0.5:
+            name = f"{rng.choice(BRANDS)} {name}"
+        items.append({
+            "name": name,
+            "quantity": rng.choice([1, 2, 5, 10, 20, 50, 100, 250]),
+            "description": f"{noun} for {rng.choice(['plant', 'office', 'site', 'lab', 'warehouse'])} use, "
+                           f"grade {rng.randint(1, 9)}"
+        })
+    return items
+
+
+def item_lines(items: List[Dict[str, Any]], style: int) -> List[str]:
+    """Items written the ways RFQ emails list them"""
+    lines = []
+    for item in items:
+        if style == 0:
+            lines += [f"- {item['name']} (Qty: {item['quantity']})", f"  {item['description']}"]
+        elif style == 1:
+            lines.append(f"{item['quantity']} x {item['name']}")
+        else:
+            lines.append(f"{item['name']} - {item['quantity']} pcs")
+    return lines
+
+
+def synthetic_corpus(emails: int, seed: int) -> List[Dict[str, Any]]:
+    """
+    Manifest of the corpus: one entry per email with its body and attachment
+    description. Deterministic for a given (emails, seed, CORPUS_VERSION).
+    """
+    rng = random.Random(seed)
+    manifest = []
+    for number in range(emails):
+        is_rfq = rng.random() < 0.9
+        body_items = synthetic_items(rng, rng.randint(1, 6)) if is_rfq else []
+        intro = ("Dear Sir/Madam,\nPlease send us your quotation (RFQ) for the following items:"
+                 if is_rfq else "Hello,\nThanks for the meeting yesterday, minutes are below.")
+        body = "\n".join([intro, ""] + item_lines(body_items, rng.randint(0, 2)) + ["", "Regards,", f"Buyer {number}"])
+
+        attachment = None
+        if rng.random() < 0.8:
+            kind = _weighted(rng, ATTACHMENT_MIX)
+            low, high = _weighted(rng, SIZE_CLASSES)
+            # Images hold one page of text
+            count = min(rng.randint(low, high), 40) if kind == "png" else rng.randint(low, high)
+            attachment = {
+                "kind": kind,
+                "file": f"email{number:05d}.{kind}",
+                "style": rng.randint(0, 2),
+                "items": synthetic_items(rng, count)
+            }
+        manifest.append({
+            "id": f"email{number:05d}",
+            "subject": f"RFQ {number}" if is_rfq else f"Meeting notes {number}",
+            "sender_email": f"buyer{number % 50}@client{number % 7}.example",
+            "is_rfq": is_rfq,
+            "body": body,
+            "attachment": attachment
+        })
+    return manifest
+
+
+def corpus_id(manifest: List[Dict[str, Any]]) -> str:
+    payload = json.dumps({"version": CORPUS_VERSION, "manifest": manifest}, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def document_lines(attachment: Dict[str, Any]) -> List[str]:
+    return ["REQUEST FOR QUOTATION (RFQ)", ""] + item_lines(attachment["items"], attachment["style"])
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, lines: List[str], lines_per_page: int = 60):
+    """Minimal text PDF (Helvetica, one text object per page) that PyPDF2 can read"""
+    pages = [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)] or [[]]
+    objects = [b"", b"", b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in pages:
+        stream = "BT /F1 10 Tf 12 TL 50 800 Td\n" + "".join(f"({_pdf_escape(line)}) Tj T*\n" for line in page) + "ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = b" ".join(b"%d 0 R" % page_id for page_id in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    with open(path, "wb") as target:
+        target.write(out.getvalue())
+
+
+def write_docx(path: str, attachment: Dict[str, Any]):
+    import docx
+    document = docx.Document()
+    document.add_heading("REQUEST FOR QUOTATION (RFQ)", level=1)
+    document.add_paragraph("Please quote for the items below.")
+    table = document.add_table(rows=1, cols=3)
+    for cell, title in zip(table.rows[0].cells, ["Item", "Qty", "Description"]):
+        cell.text = title
+    for item in attachment["items"]:
+        cells = table.add_row().cells
+        cells[0].text, cells[1].text, cells[2].text = item["name"], str(item["quantity"]), item["description"]
+    document.save(path)
+
+
+def write_table(path: str, attachment: Dict[str, Any]):
+    import pandas as pd
+    frame = pd.DataFrame(
+        [[item["name"], item["quantity"], item["description"]] for item in attachment["items"]],
+        columns=["Item (RFQ)", "Qty", "Description"]
+    )
+    if path.endswith(".csv"):
+        frame.to_csv(path, index=False)
+    else:
+        frame.to_excel(path, index=False)
+
+
+def write_png(path: str, lines: List[str]):
+    """Scanned-page-like image of the text (the OCR answer is a fixture)"""
+    from PIL import Image, ImageDraw
+    image = Image.new("L", (1240, 40 + 16 * len(lines)), color=255)
+    draw = ImageDraw.Draw(image)
+    for number, line in enumerate(lines):
+        draw.text((40, 20 + 16 * number), line, fill=0)
+    image.save(path, optimize=False)
+
+
+def build_corpus(directory: str, manifest: List[Dict[str, Any]], identifier: str):
+    """Write the attachments and their OCR/layout fixtures unless the corpus already exists"""
+    marker = os.path.join(directory, "manifest.json")
+    if os.path.exists(marker):
+        with open(marker, "r", encoding="utf-8") as source:
+            if json.load(source).get("corpus_id") == identifier:
+                return
+    os.makedirs(directory, exist_ok=True)
+    router = ProviderRouter(mode="replay", fixtures_dir=os.path.join(directory, "fixtures"))
+    for entry in manifest:
+        attachment = entry["attachment"]
+        if attachment is None:
+            continue
+        path = os.path.join(directory, attachment["file"])
+        lines = document_lines(attachment)
+        kind = attachment["kind"]
+        if kind == "pdf":
+            write_pdf(path, lines)
+            layout = {
+                "pages": [{"page_number": 1, "lines": lines}],
+                "tables": [],
+                "paragraphs": [{"text": line, "role": "body"} for line in lines if line]
+            }
+            request = layout_request("prebuilt-layout", path)
+            router.store.put("azure", request_key("azure", request),
+                             {"service": "azure", "request": request, "response": layout, "latency_seconds": None})
+        elif kind == "docx":
+            write_docx(path, attachment)
+        elif kind in ("xlsx", "csv"):
+            write_table(path, attachment)
+        else:
+            write_png(path, lines)
+            request = vision_request(path)
+            router.store.put("vision", request_key("vision", request),
+                             {"service": "vision", "request": request, "response": "\n".join(lines),
+                              "latency_seconds": None})
+    with open(marker, "w", encoding="utf-8") as out:
+        json.dump({"corpus_id": identifier, "emails": len(manifest)}, out)
+
+
+class TraceCollector:
+    """Tracer exporter that keeps every finished trace in memory"""
+
+    def __init__(self):
+        self.traces: List[Dict[str, Any]] = []
+
+    def export(self, record: Dict[str, Any]):
+        self.traces.append(record)
+
+    def find(self, rfq_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        return []
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Linearly interpolated percentile of sorted values"""
+    if len(values) == 1:
+        return values[0]
+    rank = q * (len(values) - 1)
+    low = int(rank)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (rank - low)
+
+
+def summarize(durations_ms: List[float]) -> Dict[str, float]:
+    values = sorted(durations_ms)
+    return {
+        "count": len(values),
+        "mean_ms": round(sum(values) / len(values), 3),
+        "p50_ms": round(percentile(values, 0.50), 3),
+        "p95_ms": round(percentile(values, 0.95), 3),
+        "p99_ms": round(percentile(values, 0.99), 3)
+    }
+
+
+def stage_latencies(traces: List[Dict[str, Any]], phase: str) -> Dict[str, Dict[str, float]]:
+    """Per-stage latency summary; spans below a document are labelled with its file type"""
+    durations: Dict[str, List[float]] = {}
+    for trace in traces:
+        spans = {span["span_id"]: span for span in trace["spans"]}
+        for span in trace["spans"]:
+            file_type, ancestor = None, span
+            while ancestor is not None and file_type is None:
+                file_type = ancestor["attributes"].get("file_type")
+                ancestor = spans.get(ancestor["parent_id"])
+            label = f"{phase}/{span['name']}" + (f"[{file_type}]" if file_type else "")
+            durations.setdefault(label, []).append(span["duration_ms"])
+    return {label: summarize(values) for label, values in sorted(durations.items())}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def run_phase(
+    jobs: List[Callable[[], Any]],
+    concurrency: int,
+    warmup: int,
+    collector: TraceCollector,
+    quiet: bool
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Run jobs on concurrency threads; returns the phase summary and its traces"""
+    errors: List[str] = []
+    latencies: List[float] = []
+
+    def run(job):
+        start = time.perf_counter()
+        try:
+            job()
+        except Exception as e:
+            errors.append(f"{type(e).__name__}: {e}")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    output = open(os.devnull, "w") if quiet else sys.stdout
+    try:
+        with contextlib.redirect_stdout(output):
+            for job in jobs[:warmup]:
+                run(job)
+            errors.clear()
+            latencies.clear()
+            collector.traces.clear()
+
+            measured = jobs[warmup:]
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                list(pool.map(run, measured))
+            elapsed = time.perf_counter() - started
+    finally:
+        if quiet:
+            output.close()
+
+    summary = {
+        "count": len(measured),
+        "seconds": round(elapsed, 3),
+        "per_second": round(len(measured) / elapsed, 3) if elapsed else 0.0,
+        "errors": len(errors),
+        "error_samples": sorted(set(errors))[:5],
+        "latency": summarize(latencies) if latencies else {}
+    }
+    return summary, list(collector.traces)
+
+
+def git_commit() -> Tuple[Optional[str], bool]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                capture_output=True, text=True, check=True).stdout
+        return commit, bool(status.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return None, False
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as source:
+            return [json.loads(line) for line in source if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+def print_comparison(result: Dict[str, Any], previous: Dict[str, Any]):
+    def change(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+6.1f}%" if old else "   n/a"
+
+    print(f"\nCompared with {(previous.get('commit') or 'unknown')[:10]} ({previous['timestamp']}):")
+    for phase, summary in result["phases"].items():
+        old = previous["phases"].get(phase)
+        if old:
+            print(f"  {phase:<44} {summary['per_second']:>9.2f}/s  {change(summary['per_second'], old['per_second'])}")
+    for label, stats in result["stages"].items():
+        old = previous["stages"].get(label)
+        if old:
+            print(f"  {label + ' p95':<44} {stats['p95_ms']:>9.1f}ms {change(stats['p95_ms'], old['p95_ms'])}")
+    print(f"  {'peak RSS':<44} {result['peak_rss_mb']:>9.1f}MB {change(result['peak_rss_mb'], previous['peak_rss_mb'])}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark RFQ extraction and ingestion throughput")
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=5, help="Jobs per phase run before timing starts")
+    parser.add_argument("--corpus-dir", default=None, help="Default: data/benchmarks/corpus-<corpus id>")
+    parser.add_argument("--pdf-backend", choices=["pypdf2", "azure"], default="pypdf2",
+                        help="Extract PDFs locally with PyPDF2 or through replayed Azure layout results")
+    parser.add_argument("--latency", action="append", default=[], metavar="SERVICE=SPEC",
+                        help="Replay latency per service (openai, azure, vision), e.g. openai=lognormal:1.5,0.4")
+    parser.add_argument("--phases", default="documents,pipeline")
+    parser.add_argument("--persist", action="store_true", help="Store RFQs in the application database")
+    parser.add_argument("--results", default="benchmarks/results/pipeline_throughput.jsonl")
+    parser.add_argument("--compare", action="store_true", help="Compare with the previous comparable result")
+    parser.add_argument("--verbose", action="store_true", help="Keep the pipeline's own log output")
+    args = parser.parse_args(argv)
+
+    latencies = {"openai": "none", "azure": "none", "vision": "none"}
+    for option in args.latency:
+        service, _, spec = option.partition("=")
+        if service not in latencies or not spec:
+            parser.error(f"Invalid --latency {option!r}")
+        latencies[service] = spec
+
+    manifest = synthetic_corpus(args.emails, args.seed)
+    identifier = corpus_id(manifest)
+    corpus_dir = args.corpus_dir or os.path.join("data", "benchmarks", f"corpus-{identifier}")
+    started = time.perf_counter()
+    build_corpus(corpus_dir, manifest, identifier)
+    attachments = [entry["attachment"] for entry in manifest if entry["attachment"]]
+    kinds: Dict[str, int] = {}
+    for attachment in attachments:
+        kinds[attachment["kind"]] = kinds.get(attachment["kind"], 0) + 1
+    print(f"Corpus {identifier}: {len(manifest)} emails, {len(attachments)} attachments "
+          f"({', '.join(f'{count} {kind}' for kind, count in sorted(kinds.items()))}) "
+          f"in {corpus_dir} [{time.perf_counter() - started:.1f}s]")
+
+    # Offline providers, and every trace kept in memory
+    set_provider_router(ProviderRouter(
+        mode="replay",
+        fixtures_dir=os.path.join(corpus_dir, "fixtures"),
+        replay_missing="synthetic",
+        latencies=latencies,
+        latency_scale=1.0,
+        seed=args.seed
+    ))
+    if args.pdf_backend == "azure":
+        settings.AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT = "https://replay.invalid/"
+        settings.AZURE_DOCUMENT_INTELLIGENCE_KEY = "replay"
+    else:
+        settings.AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT = ""
+        settings.AZURE_DOCUMENT_INTELLIGENCE_KEY = ""
+    collector = TraceCollector()
+    tracer.exporter, tracer.sample_rate = collector, 1.0
+
+    from services.document_processor import process_document
+    from services.email_pipeline import RFQPipeline
+    from services.notification_dispatcher import NotificationDispatcher
+
+    phases: Dict[str, Dict[str, Any]] = {}
+    stages: Dict[str, Dict[str, float]] = {}
+    selected = [phase.strip() for phase in args.phases.split(",") if phase.strip()]
+
+    if "documents" in selected:
+        def document_job(attachment):
+            path = os.path.join(corpus_dir, attachment["file"])
+
+            def job():
+                items = asyncio.run(process_document(path, ATTACHMENT_FILE_TYPES[attachment["kind"]]))
+                # A faster extractor that loses items is not an improvement
+                if len(items) != len(attachment["items"]):
+                    raise ValueError(f"{attachment['kind']}: extracted {len(items)} of {len(attachment['items'])} items")
+            return job
+
+        jobs = [document_job(attachment) for attachment in attachments]
+        summary, traces = run_phase(jobs, args.concurrency, min(args.warmup, len(jobs) // 2),
+                                    collector, not args.verbose)
+        phases["documents"] = summary
+        stages.update(stage_latencies(traces, "documents"))
+
+    if "pipeline" in selected:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+            pipeline = RFQPipeline()
+        sent = []
+        pipeline.notifications = NotificationDispatcher(
+            lambda text: sent.append(len(text)) or True,
+            window_seconds=0.2,
+            limiter=RateLimiter(1000, 1000)
+        )
+
+        def email_job(entry):
+            path = os.path.join(corpus_dir, entry["attachment"]["file"]) if entry["attachment"] else None
+            metadata = {
+                "subject": entry["subject"],
+                "sender_name": "",
+                "sender_email": entry["sender_email"],
+                "body": entry["body"]
+            } if args.persist else None
+
+            def job():
+                if args.persist:
+                    from db_utils import app_context
+                    with app_context():
+                        asyncio.run(pipeline.process(entry["body"], path, email_metadata=metadata))
+                else:
+                    asyncio.run(pipeline.process(entry["body"], path, email_metadata=metadata))
+            return job
+
+        jobs = [email_job(entry) for entry in manifest]
+        summary, traces = run_phase(jobs, args.concurrency, min(args.warmup, len(jobs) // 2),
+                                    collector, not args.verbose)
+        pipeline.close()
+        summary["notifications_sent"] = len(sent)
+        phases["pipeline"] = summary
+        stages.update(stage_latencies(traces, "pipeline"))
+
+    commit, dirty = git_commit()
+    result = {
+        "benchmark": "pipeline_throughput",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "dirty": dirty,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "corpus_id": identifier,
+        "settings": {
+            "emails": args.emails,
+            "seed": args.seed,
+            "concurrency": args.concurrency,
+            "pdf_backend": args.pdf_backend,
+            "latency": latencies,
+            "persist": args.persist
+        },
+        "phases": phases,
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb()
+    }
+
+    print(f"\n{'phase':<44} {'jobs':>6} {'per sec':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>6}")
+    for phase, summary in phases.items():
+        latency = summary["latency"]
+        print(f"{phase:<44} {summary['count']:>6} {summary['per_second']:>9.2f} {latency.get('p50_ms', 0):>9.1f} "
+              f"{latency.get('p95_ms', 0):>9.1f} {latency.get('p99_ms', 0):>9.1f} {summary['errors']:>6}")
+        for sample in summary["error_samples"]:
+            print(f"  ❌ {sample}")
+    print(f"\n{'stage':<44} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for label, stats in stages.items():
+        print(f"{label:<44} {stats['count']:>6} {stats['mean_ms']:>9.2f} {stats['p50_ms']:>9.2f} "
+              f"{stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}")
+    print(f"\nPeak RSS: {result['peak_rss_mb']} MB")
+
+    history = load_history(args.results)
+    if args.compare:
+        comparable = [
+            previous for previous in history
+            if previous.get("corpus_id") == identifier and previous.get("settings") == result["settings"]
+        ]
+        if comparable:
+            print_comparison(result, comparable[-1])
+        else:
+            print("\nNo previous result for this corpus and settings to compare with")
+    if args.results:
+        os.makedirs(os.path.dirname(os.path.abspath(args.results)), exist_ok=True)
+        with open(args.results, "a", encoding="utf-8") as out:
+            out.write(json.dumps(result) + "\n")
+        print(f"Result appended to {args.results} (commit {(commit or 'unknown')[:10]}{', dirty' if dirty else ''})")
+
+    return 1 if any(summary["errors"] for summary in phases.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Benchmark for item-vendor match scoring.
+
+Compares the original per-pair loop (calculate_vendor_match_score), the
+inverted VendorIndex and the NumPy VendorScoringEngine on a synthetic
+catalog, and checks that the engine reproduces the original scores exactly.
+Also checks that semantic matching suggests the demo "IT Equipment" vendor
+for a laptop and a server, the example given in the README.
+
+    python -m benchmarks.vendor_scoring --vendors 10000 --items 500
+"""
+import sys
+import time
+import random
+import argparse
+from typing import List, Optional
+
+from config import settings
+from models import Vendor, VendorType, Location, VendorPerformance, ItemDetail
+from services.demo_vendors import demo_vendors
+from services.vendor_index import VendorIndex
+from services.vendor_matcher import calculate_vendor_match_score
+
+CATEGORY_WORDS = [
+    "electronic", "components", "industrial", "supplies", "equipment", "machinery", "parts",
+    "it", "networking", "cables", "pcb", "assembly", "mechanical", "hydraulic", "pumps",
+    "valves", "bearings", "motors", "sensors", "safety", "lighting", "tools", "fasteners",
+    "office", "furniture", "laboratory", "chemicals", "packaging", "steel", "plastics"
+]
+BRANDS = [f"Brand{i}" for i in range(1500)] + ["Dell", "HP", "Cisco", "Bosch", "Siemens", "ABB", "Tata"]
+ITEM_WORDS = CATEGORY_WORDS + ["laptop", "server", "drill", "gloves", "monitor", "switch", "relay", "pipe"]
+
+
+def synthetic_vendors(count: int, seed: int = 7) -> List[Vendor]:
+    rng = random.Random(seed)
+    vendors = []
+    for i in range(count):
+        specializations = [
+            " ".join(rng.sample(CATEGORY_WORDS, rng.randint(1, 3))).title()
+            for _ in range(rng.randint(1, 4))
+        ]
+        vendors.append(Vendor(
+            id=f"vendor-{i}",
+            name=f"Vendor {i}",
+            vendor_type=rng.choice(list(VendorType)),
+            location=Location(country="USA", zip_code=f"{rng.randint(10000, 99999)}"),
+            specializations=specializations,
+            brands_carried=rng.sample(BRANDS, rng.randint(0, 4)),
+            performance=None if rng.random() < 0.1 else VendorPerformance(
+                quality_rating=round(rng.uniform(3, 5), 1),
+                reliability_score=round(rng.uniform(3, 5), 1),
+                pricing_consistency=round(rng.uniform(3, 5), 1)
+            )
+        ))
+    return vendors
+
+
+def synthetic_items(count: int, seed: int = 11) -> List[ItemDetail]:
+    rng = random.Random(seed)
+    return [
+        ItemDetail(
+            id=f"item-{i}",
+            name=" ".join(rng.sample(ITEM_WORDS, rng.randint(1, 4))),
+            quantity=rng.randint(1, 100),
+            brand=rng.choice(BRANDS) if rng.random() < 0.6 else None,
+            type=" ".join(rng.sample(CATEGORY_WORDS, 2)) if rng.random() < 0.5 else None
+        )
+        for i in range(count)
+    ]
+
+
+# (item name, specialization of the demo vendor it must be matched with)
+SEMANTIC_EXAMPLES = [("Laptop", "IT Equipment"), ("Server", "IT Equipment")]
+
+
+def check_semantic_examples() -> List[str]:
+    """
+    Match the SEMANTIC_EXAMPLES against the demo vendors with the configured
+    similarity threshold and return a message for each one that fails
+    """
+    vendors = demo_vendors()
+    semantic = VendorIndex(vendors).semantic_index(wait=True)
+    failures = []
+    for name, specialization in SEMANTIC_EXAMPLES:
+        item = ItemDetail(id=name, name=name, quantity=1)
+        similar = semantic.similar_vendors(
+            item, settings.VENDOR_SEMANTIC_CANDIDATES, settings.VENDOR_SEMANTIC_MIN_SIMILARITY
+        )
+        best = max(similar, key=similar.get) if similar else None
+        expected = next(vendor for vendor in vendors if specialization in vendor.specializations)
+        if best != expected.id:
+            failures.append(
+                f'"{name}" is not matched with "{specialization}" '
+                f"(similarities {[round(value, 3) for value in similar.values()]}, "
+                f"min {settings.VENDOR_SEMANTIC_MIN_SIMILARITY})"
+            )
+    return failures
+
+
+def timed(label: str, func):
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<40} {elapsed * 1000:10.1f} ms")
+    return result, elapsed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark vendor match scoring")
+    parser.add_argument("--vendors", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--baseline-items", type=int, default=20,
+                        help="Items scored with the original loop (extrapolated to --items)")
+    args = parser.parse_args(argv)
+
+    vendors = synthetic_vendors(args.vendors)
+    items = synthetic_items(args.items)
+    sample = items[:args.baseline_items]
+    print(f"Scoring {len(items)} items x {len(vendors)} vendors")
+
+    _, baseline = timed(
+        f"original loop ({len(sample)} items)",
+        lambda: [[calculate_vendor_match_score(item, vendor) for vendor in vendors] for item in sample]
+    )
+    print(f"  {'original loop (extrapolated)':<40} {baseline / len(sample) * len(items) * 1000:10.1f} ms")
+
+    index, _ = timed("build VendorIndex", lambda: VendorIndex(vendors))
+    timed("VendorIndex.candidate_scores", lambda: [index.candidate_scores(item) for item in items])
+    engine, _ = timed("build VendorScoringEngine", index.scoring_engine)
+    timed("engine.score_matrix", lambda: engine.score_matrix(items))
+    timed("engine.rank (all candidates)", lambda: engine.rank(items))
+    timed("engine.rank (top 10)", lambda: engine.rank(items, top_k=10))
+
+    scores, _ = engine.score_matrix(sample)
+    mismatches = sum(
+        1
+        for row, item in enumerate(sample)
+        for column, vendor in enumerate(vendors)
+        if scores[row, column] != calculate_vendor_match_score(item, vendor)
+    )
+    if mismatches:
+        print(f"❌ {mismatches} scores differ from calculate_vendor_match_score")
+        return 1
+    print(f"✅ Engine scores match calculate_vendor_match_score exactly on {len(sample) * len(vendors)} pairs")
+
+    failures = check_semantic_examples()
+    for failure in failures:
+        print(f"❌ Semantic matching: {failure}")
+    if failures:
+        return 1
+    print(f"✅ Semantic matching suggests the demo vendors for {len(SEMANTIC_EXAMPLES)} README examples")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,7 @@
 import datetime
 import uuid
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, DateTime, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, Float, Text, ForeignKey, DateTime, Index, func, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from typing import List, Optional
 
@@ -18,7 +18,7 @@ class UploadedFile(db.Model):
     file_type = Column(SQLEnum(FileType), nullable=False)
     upload_date = Column(DateTime, default=datetime.datetime.utcnow)
     file_path = Column(String(255), nullable=False)
-    rfq_id = Column(String(36), ForeignKey('rfqs.id'), nullable=False)
+    rfq_id = Column(String(36), ForeignKey('rfqs.id'), nullable=False, index=True)
     
     rfq = relationship("RFQ", back_populates="files")
 
@@ -29,7 +29,7 @@ class ItemDetail(db.Model):
     name = Column(String(255), nullable=False)
     quantity = Column(Integer, nullable=True)    
     description = Column(Text, nullable=True)
-    rfq_id = Column(String(36), ForeignKey('rfqs.id'), nullable=False)
+    rfq_id = Column(String(36), ForeignKey('rfqs.id'), nullable=False, index=True)
     
     rfq = relationship("RFQ", back_populates="items")
 
@@ -47,6 +47,15 @@ class RFQ(db.Model):
     files = relationship("UploadedFile", back_populates="rfq", cascade="all, delete-orphan")
     items = relationship("ItemDetail", back_populates="rfq", cascade="all, delete-orphan")
     emails = relationship("Email", back_populates="rfq", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Dashboard: newest first, keyset-paginated on (created_at, id)
+        Index('ix_rfqs_created_at_id', created_at, id),
+        Index('ix_rfqs_status_created_at_id', status, created_at, id),
+        # Dashboard client filter: lower(client_name) LIKE 'prefix%'
+        Index('ix_rfqs_client_name_lower', func.lower(client_name).label('client_name_lower'),
+              postgresql_ops={'client_name_lower': 'text_pattern_ops'}),
+    )
 
 class Location(db.Model):
     __tablename__ = 'locations'
@@ -56,7 +65,7 @@ class Location(db.Model):
     city = Column(String(100), nullable=True)
     zip_code = Column(String(20), nullable=True)
     address = Column(Text, nullable=True)
-    vendor_id = Column(String(36), ForeignKey('vendors.id'), nullable=False)
+    vendor_id = Column(String(36), ForeignKey('vendors.id'), nullable=False, index=True)
     
     vendor = relationship("Vendor", back_populates="location")
 
@@ -68,7 +77,7 @@ class VendorPerformance(db.Model):
     quality_rating = Column(Float, nullable=True)
     pricing_consistency = Column(Float, nullable=True)
     reliability_score = Column(Float, nullable=True)
-    vendor_id = Column(String(36), ForeignKey('vendors.id'), nullable=False)
+    vendor_id = Column(String(36), ForeignKey('vendors.id'), nullable=False, index=True)
     
     vendor = relationship("Vendor", back_populates="performance")
 
@@ -77,14 +86,14 @@ class VendorSpecialization(db.Model):
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     specialization = Column(String(100), nullable=False)
-    vendor_id = Column(String(36), ForeignKey('vendors.id'), nullable=False)
+    vendor_id = Column(String(36), ForeignKey('vendors.id'), nullable=False, index=True)
 
 class VendorBrand(db.Model):
     __tablename__ = 'vendor_brands'
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     brand = Column(String(100), nullable=False)
-    vendor_id = Column(String(36), ForeignKey('vendors.id'), nullable=False)
+    vendor_id = Column(String(36), ForeignKey('vendors.id'), nullable=False, index=True)
 
 class Vendor(db.Model):
     __tablename__ = 'vendors'
@@ -95,6 +104,10 @@ class Vendor(db.Model):
     website = Column(String(255), nullable=True)
     email = Column(String(255), nullable=True)
     phone = Column(String(50), nullable=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)
+    # Bumped on any change to the vendor or its child rows; the vendor
+    # repository refreshes its snapshot from this watermark
+    updated_at = Column(DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow, index=True)
     
     location = relationship("Location", uselist=False, back_populates="vendor", cascade="all, delete-orphan")
     performance = relationship("VendorPerformance", uselist=False, back_populates="vendor", cascade="all, delete-orphan")
@@ -119,21 +132,32 @@ class EmailAttachment(db.Model):
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     file_path = Column(String(255), nullable=False)
-    email_id = Column(String(36), ForeignKey('emails.id'), nullable=False)
+    email_id = Column(String(36), ForeignKey('emails.id'), nullable=False, index=True)
 
 class Email(db.Model):
     __tablename__ = 'emails'
     
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
-    rfq_id = Column(String(36), ForeignKey('rfqs.id'), nullable=False)
-    vendor_id = Column(String(36), ForeignKey('vendors.id'), nullable=False)
+    rfq_id = Column(String(36), ForeignKey('rfqs.id'), nullable=False, index=True)
+    vendor_id = Column(String(36), ForeignKey('vendors.id'), nullable=False, index=True)
     subject = Column(Text, nullable=False)
     body = Column(Text, nullable=False)
     status = Column(SQLEnum(EmailStatus), default=EmailStatus.DRAFT)
     created_at = Column(DateTime, default=datetime.datetime.utcnow)
     sent_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
+    # Outbox: send attempts so far, when the next one is due, and the lease
+    # held by the sender worker that claimed the email
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    next_attempt_at = Column(DateTime, nullable=True)
+    locked_by = Column(String(64), nullable=True)
+    locked_until = Column(DateTime, nullable=True)
     
     rfq = relationship("RFQ", back_populates="emails")
     vendor = relationship("Vendor", back_populates="emails")
-    attachments = relationship("EmailAttachment", cascade="all, delete-orphan")
\ No newline at end of file
+    attachments = relationship("EmailAttachment", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Outbox workers claim due emails in next_attempt_at order
+        Index('ix_emails_status_next_attempt_at', status, next_attempt_at),
+    )
\ No newline at end of file
@@ -1,60 +1,491 @@
+import io
 import uuid
+import base64
+import re
+import time
+import threading
 import datetime
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional
 from flask import current_app
-from db_models import db, RFQ, ItemDetail
+from sqlalchemy import text, select, bindparam, func, tuple_
+from db_models import db, RFQ, ItemDetail, UploadedFile
 from models import RFQStatus
 from config import settings
+from services.tracing import tracer
+
+
+@contextmanager
+def app_context():
+    """Run inside the Flask app context, pushing one if the caller has none (e.g. FastAPI routes or worker threads)"""
+    from flask import has_app_context
+    if has_app_context():
+        yield
+    else:
+        from app import app
+        with app.app_context():
+            yield
+
+
+class RFQNumberAllocator:
+    """
+    Hands out RFQ numbers from a PostgreSQL sequence.
+
+    Each RFQ year gets its own sequence (rfq_number_seq_<year>), so numbering
+    restarts at 1 whenever settings.RFQ_YEAR changes. nextval() never blocks
+    and never hands the same value out twice, which keeps concurrent web
+    requests and email workers off the rfq_number unique constraint.
+
+    With block_size > 1 the allocator reserves that many numbers per round
+    trip and serves the rest from memory. Unused numbers in a block are lost
+    when the process exits, so numbers can have gaps but are never reused.
+    """
+
+    def __init__(self, block_size: int = 1):
+        self.block_size = max(1, block_size)
+        self._lock = threading.Lock()
+        self._blocks: Dict[str, List[int]] = {}
+        self._ready_sequences = set()
+
+    def next(self) -> str:
+        """Allocate a single RFQ number, e.g. INQ13QP-2025-00042"""
+        prefix, year = settings.RFQ_PREFIX, settings.RFQ_YEAR
+        with self._lock:
+            block = self._blocks.get(year)
+            if not block:
+                block = self._fetch(year, self.block_size)
+                self._blocks = {year: block}
+            return self._format(prefix, year, block.pop(0))
+
+    def reserve(self, count: int) -> List[str]:
+        """
+        Reserve a block of RFQ numbers for batch ingestion
+
+        Args:
+            count: Number of RFQ numbers to reserve
+
+        Returns:
+            List of allocated RFQ numbers in ascending order
+        """
+        prefix, year = settings.RFQ_PREFIX, settings.RFQ_YEAR
+        return [self._format(prefix, year, n) for n in self._fetch(year, count)]
+
+    @staticmethod
+    def _format(prefix: str, year: str, seq_num: int) -> str:
+        return f"{prefix}-{year}-{seq_num:05d}"
+
+    @staticmethod
+    def _sequence_name(year: str) -> str:
+        return "rfq_number_seq_" + re.sub(r"\W", "", str(year))
+
+    def _fetch(self, year: str, count: int) -> List[int]:
+        sequence = self._sequence_name(year)
+        if sequence not in self._ready_sequences:
+            self._ensure_sequence(sequence, year)
+            self._ready_sequences.add(sequence)
+
+        rows = db.session.execute(
+            text(f"SELECT nextval('{sequence}') FROM generate_series(1, :count)"),
+            {"count": count}
+        ).scalars().all()
+        return sorted(rows)
+
+    def _ensure_sequence(self, sequence: str, year: str):
+        """
+        Create the sequence for a year if needed. A fresh sequence continues
+        after the highest number already stored for that year, so switching
+        from the old ORDER BY ... LIMIT 1 scheme does not reuse numbers.
+        """
+        pattern = f"{settings.RFQ_PREFIX}-{year}-"
+        with db.engine.begin() as conn:
+            conn.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": sequence})
+            conn.execute(text(f"CREATE SEQUENCE IF NOT EXISTS {sequence} START WITH 1 MINVALUE 1"))
+            is_called = conn.execute(text(f"SELECT is_called FROM {sequence}")).scalar()
+            if not is_called:
+                conn.execute(
+                    text(
+                        f"SELECT setval('{sequence}', GREATEST(m, 1), m > 0) FROM ("
+                        "  SELECT COALESCE(MAX(CAST(SUBSTRING(rfq_number FROM :offset) AS INTEGER)), 0) AS m"
+                        "  FROM rfqs WHERE rfq_number LIKE :like AND SUBSTRING(rfq_number FROM :offset) ~ '^[0-9]+$'"
+                        ") AS existing"
+                    ),
+                    {"offset": len(pattern) + 1, "like": pattern + "%"}
+                )
+
+
+# Web requests take one number at a time; email ingestion reserves blocks
+rfq_numbers = RFQNumberAllocator()
+ingestion_rfq_numbers = RFQNumberAllocator(block_size=settings.RFQ_NUMBER_BLOCK_SIZE)
+
+
+# Largest number of rows sent in one multi-row INSERT statement
+BULK_INSERT_CHUNK_SIZE = 1000
+
+
+def _item_row(item: Any, rfq_id: str, keep_id: bool) -> Dict[str, Any]:
+    """Build an item_details row from an ItemDetail model or a request dict"""
+    get = item.get if isinstance(item, dict) else (lambda key: getattr(item, key, None))
+    return {
+        "id": (get("id") if keep_id else None) or str(uuid.uuid4()),
+        "name": get("name"),
+        "quantity": get("quantity"),
+        "description": get("description"),
+        "rfq_id": rfq_id
+    }
+
+
+def _copy_value(value: Any) -> str:
+    """Encode a value for COPY ... (FORMAT csv), where an unquoted empty field is NULL"""
+    if value is None:
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def insert_item_rows(rows: List[Dict[str, Any]]):
+    """
+    Insert item_details rows inside the current transaction.
+
+    Small batches go through multi-row INSERT statements; batches of at least
+    settings.BULK_COPY_THRESHOLD rows are streamed with PostgreSQL COPY.
+    """
+    if not rows:
+        return
+
+    columns = ["id", "name", "quantity", "description", "rfq_id"]
+    if len(rows) >= settings.BULK_COPY_THRESHOLD and db.engine.dialect.name == "postgresql":
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write(",".join(_copy_value(row[column]) for column in columns) + "\n")
+        buffer.seek(0)
+
+        cursor = db.session.connection().connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY item_details ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer
+            )
+        finally:
+            cursor.close()
+        return
+
+    table = ItemDetail.__table__
+    for start in range(0, len(rows), BULK_INSERT_CHUNK_SIZE):
+        db.session.execute(table.insert().values(rows[start:start + BULK_INSERT_CHUNK_SIZE]))
+
+
+def bulk_save_rfq(
+    rfq_id: str,
+    items: Iterable[Any],
+    new_rfq: Optional[Dict[str, Any]] = None,
+    rfq_updates: Optional[Dict[str, Any]] = None,
+    replace_items: bool = False,
+    keep_item_ids: bool = True
+) -> Dict[str, Any]:
+    """
+    Write an RFQ and all of its items in a single transaction.
+
+    Either everything is committed or nothing is: on any error the
+    transaction is rolled back and the exception re-raised, so a failed
+    save never leaves a half-written RFQ behind.
+
+    Args:
+        rfq_id: ID of the RFQ the items belong to
+        items: ItemDetail models or dicts with name, quantity and description
+        new_rfq: Column values for a new RFQ row to insert, or None if the RFQ exists
+        rfq_updates: Column values to update on the existing RFQ row
+        replace_items: Delete the RFQ's current items before inserting
+        keep_item_ids: Reuse item ids from the input instead of generating new ones
+
+    Returns:
+        Dictionary with rows written, elapsed seconds and rows per second
+    """
+    started = time.perf_counter()
+    rows = [_item_row(item, rfq_id, keep_item_ids) for item in items]
+    written = len(rows)
+
+    try:
+        if new_rfq is not None:
+            db.session.execute(RFQ.__table__.insert().values(id=rfq_id, **new_rfq))
+            written += 1
+        elif rfq_updates:
+            db.session.execute(
+                RFQ.__table__.update().where(RFQ.__table__.c.id == rfq_id).values(**rfq_updates)
+            )
+            written += 1
+
+        if replace_items:
+            db.session.execute(
+                ItemDetail.__table__.delete().where(ItemDetail.__table__.c.rfq_id == rfq_id)
+            )
+
+        insert_item_rows(rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    elapsed = time.perf_counter() - started
+    stats = {
+        "rows": written,
+        "seconds": elapsed,
+        "rows_per_second": written / elapsed if elapsed > 0 else float(written)
+    }
+    print(f"💾 Saved {written} rows for RFQ {rfq_id} in {elapsed * 1000:.1f} ms "
+          f"({stats['rows_per_second']:.0f} rows/s)")
+    return stats
+
+
+class StaleRFQError(Exception):
+    """Raised when an RFQ was modified after the client loaded it"""
+
+
+ITEM_FIELDS = ("name", "quantity", "description")
+
+
+def _item_values(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Item fields from a request body in the form they are stored: the item
+    editor sends "" for an empty description and may send the quantity as
+    a string
+    """
+    quantity = data.get("quantity")
+    if isinstance(quantity, str):
+        quantity = int(quantity) if quantity.strip() else None
+    return {
+        "name": data.get("name"),
+        "quantity": quantity,
+        "description": data.get("description") or None
+    }
+
+
+def _shown_quantity(quantity: Optional[int]) -> int:
+    return quantity if quantity is not None else 1
+
+
+def _item_changed(current: Dict[str, Any], values: Dict[str, Any]) -> bool:
+    """Whether submitted values differ from a stored item (an unset quantity is shown, and sent back, as 1)"""
+    return current["name"] != values["name"] \
+        or (current["description"] or None) != values["description"] \
+        or _shown_quantity(current["quantity"]) != _shown_quantity(values["quantity"])
+
+
+def diff_items(stored: Dict[str, Dict[str, Any]], submitted: List[Dict[str, Any]]):
+    """
+    Compare stored items with the items submitted by the client, by item id.
+
+    Submitted ids that are unknown for this RFQ (including the temporary
+    "new-..." ids created in data_extraction.js) are inserted under fresh
+    UUIDs.
+
+    Args:
+        stored: Current items of the RFQ keyed by item id
+        submitted: Items from the request body
+
+    Returns:
+        Tuple of (rows to insert, rows to update, ids to delete, client id -> new id map)
+    """
+    inserts, updates, id_map = [], [], {}
+    seen = set()
+
+    for data in submitted:
+        item_id = data.get("id")
+        values = _item_values(data)
+
+        if item_id in stored and item_id not in seen:
+            seen.add(item_id)
+            current = stored[item_id]
+            if _item_changed(current, values):
+                updates.append({"_id": item_id, **values})
+        else:
+            new_id = str(uuid.uuid4())
+            if item_id and item_id not in stored:
+                id_map[item_id] = new_id
+            inserts.append({"id": new_id, **values})
+
+    deletes = [item_id for item_id in stored if item_id not in seen]
+    return inserts, updates, deletes, id_map
+
+
+def apply_item_changes(
+    rfq_id: str,
+    submitted: List[Dict[str, Any]],
+    expected_updated_at: Optional[datetime.datetime] = None
+) -> Dict[str, Any]:
+    """
+    Save edited items by writing only what changed.
+
+    The RFQ row is locked for the duration of the transaction. When
+    expected_updated_at is given and no longer matches RFQ.updated_at,
+    StaleRFQError is raised and nothing is written.
+
+    Args:
+        rfq_id: ID of the RFQ being edited
+        submitted: Full list of items as submitted by the client
+        expected_updated_at: RFQ.updated_at the client's copy was based on
+
+    Returns:
+        Dictionary with insert/update/delete counts, the client id map and
+        the RFQ's new updated_at
+    """
+    rfqs = RFQ.__table__
+    items = ItemDetail.__table__
+
+    try:
+        current_version = db.session.execute(
+            select(rfqs.c.updated_at).where(rfqs.c.id == rfq_id).with_for_update()
+        ).scalar()
+        if expected_updated_at is not None and current_version != expected_updated_at:
+            raise StaleRFQError(f"RFQ {rfq_id} was modified at {current_version}")
+
+        stored = {
+            row.id: {"name": row.name, "quantity": row.quantity, "description": row.description}
+            for row in db.session.execute(
+                select(items.c.id, *(items.c[field] for field in ITEM_FIELDS))
+                .where(items.c.rfq_id == rfq_id)
+            )
+        }
+        inserts, updates, deletes, id_map = diff_items(stored, submitted)
+
+        if inserts or updates or deletes:
+            for start in range(0, len(deletes), BULK_INSERT_CHUNK_SIZE):
+                db.session.execute(
+                    items.delete().where(items.c.id.in_(deletes[start:start + BULK_INSERT_CHUNK_SIZE]))
+                )
+            if updates:
+                # executemany: the SET clause comes from the name/quantity/description keys
+                db.session.execute(items.update().where(items.c.id == bindparam("_id")), updates)
+            insert_item_rows([{**row, "rfq_id": rfq_id} for row in inserts])
+
+            current_version = datetime.datetime.utcnow()
+            db.session.execute(
+                rfqs.update().where(rfqs.c.id == rfq_id).values(updated_at=current_version)
+            )
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deletes),
+        "id_map": id_map,
+        "updated_at": current_version
+    }
+
+
+def encode_rfq_cursor(created_at: datetime.datetime, rfq_id: str) -> str:
+    """Encode the (created_at, id) keyset position of an RFQ as an opaque cursor"""
+    raw = f"{created_at.isoformat()}|{rfq_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_rfq_cursor(cursor: str):
+    """Decode a cursor from encode_rfq_cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, rfq_id = raw.split("|", 1)
+        return datetime.datetime.fromisoformat(created_at), rfq_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def rfq_dashboard_query(
+    status: Optional[RFQStatus] = None,
+    client: Optional[str] = None,
+    after: Optional[tuple] = None,
+    limit: int = 50
+):
+    """
+    Build the dashboard query: one page of RFQs, newest first, with item and
+    file counts computed as correlated subqueries in the same statement.
+
+    Args:
+        status: Only include RFQs with this status
+        client: Only include RFQs whose client name starts with this text (case-insensitive)
+        after: (created_at, id) of the last RFQ on the previous page
+        limit: Maximum number of rows to return
+
+    Returns:
+        SQLAlchemy select statement
+    """
+    item_count = (
+        select(func.count(ItemDetail.id))
+        .where(ItemDetail.rfq_id == RFQ.id)
+        .correlate(RFQ)
+        .scalar_subquery()
+        .label("item_count")
+    )
+    file_count = (
+        select(func.count(UploadedFile.id))
+        .where(UploadedFile.rfq_id == RFQ.id)
+        .correlate(RFQ)
+        .scalar_subquery()
+        .label("file_count")
+    )
+
+    query = select(
+        RFQ.id, RFQ.rfq_number, RFQ.client_name, RFQ.created_at, RFQ.status,
+        item_count, file_count
+    )
+    if status is not None:
+        query = query.where(RFQ.status == status)
+    if client:
+        query = query.where(func.lower(RFQ.client_name).startswith(client.lower(), autoescape=True))
+    if after is not None:
+        query = query.where(tuple_(RFQ.created_at, RFQ.id) < tuple_(*after))
+
+    return query.order_by(RFQ.created_at.desc(), RFQ.id.desc()).limit(limit)
+
+
+def fetch_rfq_dashboard_page(
+    status: Optional[RFQStatus] = None,
+    client: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50
+) -> Dict[str, Any]:
+    """
+    Fetch one keyset-paginated page of the RFQ dashboard
+
+    Returns:
+        Dictionary with the page rows and the cursor of the next page (or None)
+    """
+    after = decode_rfq_cursor(cursor) if cursor else None
+    rows = db.session.execute(rfq_dashboard_query(status, client, after, limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_rfq_cursor(rows[-1].created_at, rows[-1].id)
+
+    return {"rfqs": rows, "next_cursor": next_cursor}
+
 
 def store_rfq_items_in_db(items, email_subject, sender_name, sender_email, body=""):
     """
     Store RFQ items in the database.
-    Creates a new RFQ record and associated ItemDetail records.
+    Creates a new RFQ record and associated ItemDetail records in one transaction.
     Returns the created RFQ.
     """
-    # Generate RFQ number
-    prefix = settings.RFQ_PREFIX
-    year = settings.RFQ_YEAR
-    
-    # Get the latest RFQ number to increment
-    with current_app.app_context():
-        last_rfq = RFQ.query.order_by(RFQ.rfq_number.desc()).first()
-        if last_rfq and last_rfq.rfq_number.startswith(f"{prefix}-{year}-"):
-            try:
-                seq_num = int(last_rfq.rfq_number.split('-')[-1]) + 1
-            except:
-                seq_num = 1
-        else:
-            seq_num = 1
+    with current_app.app_context(), tracer.span("db.store_rfq_items", item_count=len(items)) as span:
+        # Generate RFQ number
+        rfq_number = ingestion_rfq_numbers.next()
+        rfq_id = str(uuid.uuid4())
+        span.set_attributes(rfq_id=rfq_id, rfq_number=rfq_number)
         
-        rfq_number = f"{prefix}-{year}-{seq_num:05d}"
-        
-        # Create new RFQ
-        new_rfq = RFQ(
-            id=str(uuid.uuid4()),
-            rfq_number=rfq_number,
-            client_name=sender_name if sender_name else sender_email,
-            notes=f"Auto-created from email: {email_subject}\n\nSender: {sender_email}\n\n{body[:500]}...",
-            status=RFQStatus.READY
+        # Write the RFQ and its items together
+        bulk_save_rfq(
+            rfq_id,
+            items,
+            new_rfq={
+                "rfq_number": rfq_number,
+                "client_name": sender_name if sender_name else sender_email,
+                "notes": f"Auto-created from email: {email_subject}\n\nSender: {sender_email}\n\n{body[:500]}...",
+                "status": RFQStatus.READY
+            },
+            keep_item_ids=False
         )
         
-        # Add to database
-        db.session.add(new_rfq)
-        db.session.commit()
-        
-        # Add items to database
-        for item in items:
-            # Create an item record with a new UUID
-            db_item = ItemDetail(
-                id=str(uuid.uuid4()),
-                name=item.name,
-                quantity=item.quantity,
-                description=item.description,
-                rfq_id=new_rfq.id
-            )
-            db.session.add(db_item)
-        
-        # Commit all items
-        db.session.commit()
-        
         print(f"✅ Created RFQ {rfq_number} with {len(items)} items in database")
-        return new_rfq 
\ No newline at end of file
+        return db.session.get(RFQ, rfq_id)
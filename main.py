@@ -26,12 +26,28 @@ if __name__ == "__main__":
                 print("❌ Unexpected error:")
                 print(traceback.format_exc())
                 sys.exit(1)
+        elif sys.argv[1] == "build-vendor-index":
+            from config import settings
+            from services.vendor_repository import vendor_repository
+            from services.shared_index import build_shared_index
+            
+            if not settings.VENDOR_INDEX_PATH:
+                print("❌ VENDOR_INDEX_PATH must be set to build the shared vendor index.")
+                sys.exit(1)
+            with app.app_context():
+                snapshot = vendor_repository.snapshot()
+            build_shared_index(settings.VENDOR_INDEX_PATH, snapshot.vendors, snapshot.watermark)
+        elif sys.argv[1] == "email-outbox":
+            from services.email_outbox import run_outbox
+            
+            print("Starting Email Outbox...")
+            run_outbox()
         elif sys.argv[1] == "test-whatsapp":
             print("Testing WhatsApp Notification...")
             # test_whatsapp()
         else:
             print(f"Unknown command: {sys.argv[1]}")
-            print("Available commands: email-service, test-whatsapp")
+            print("Available commands: email-service, build-vendor-index, email-outbox, test-whatsapp")
     else:
         print("Starting Web Application...")
         app.run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,30 @@
+-- Indexes for foreign keys and dashboard filters on the procurement tables.
+--
+-- db.create_all() creates these for new databases; this script adds them to
+-- an existing one. CONCURRENTLY avoids blocking writes while the indexes
+-- build, so run it outside a transaction:
+--
+--   psql "$DATABASE_URL" -f migrations/001_procurement_indexes.sql
+
+-- Foreign keys: relationship loads and ON DELETE cascades
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_item_details_rfq_id ON item_details (rfq_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_uploaded_files_rfq_id ON uploaded_files (rfq_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_emails_rfq_id ON emails (rfq_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_emails_vendor_id ON emails (vendor_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_email_attachments_email_id ON email_attachments (email_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_locations_vendor_id ON locations (vendor_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vendor_performances_vendor_id ON vendor_performances (vendor_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vendor_specializations_vendor_id ON vendor_specializations (vendor_id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vendor_brands_vendor_id ON vendor_brands (vendor_id);
+
+-- RFQ dashboard: newest first with keyset pagination, optionally by status
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_rfqs_created_at_id ON rfqs (created_at, id);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_rfqs_status_created_at_id ON rfqs (status, created_at, id);
+
+-- RFQ dashboard client filter: lower(client_name) LIKE 'prefix%'
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_rfqs_client_name_lower ON rfqs (lower(client_name) text_pattern_ops);
+
+ANALYZE rfqs;
+ANALYZE item_details;
+ANALYZE uploaded_files;
+ANALYZE emails;
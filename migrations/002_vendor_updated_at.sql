@@ -0,0 +1,11 @@
+-- Change tracking for vendors, used by the vendor repository to refresh its
+-- in-memory snapshot incrementally (services/vendor_repository.py).
+--
+--   psql "$DATABASE_URL" -f migrations/002_vendor_updated_at.sql
+
+ALTER TABLE vendors ADD COLUMN IF NOT EXISTS created_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc');
+ALTER TABLE vendors ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP DEFAULT (now() AT TIME ZONE 'utc');
+UPDATE vendors SET created_at = now() AT TIME ZONE 'utc' WHERE created_at IS NULL;
+UPDATE vendors SET updated_at = created_at WHERE updated_at IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_vendors_updated_at ON vendors (updated_at);
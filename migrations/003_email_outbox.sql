@@ -0,0 +1,16 @@
+-- Outbox columns for the emails table, used by the sender workers
+-- (services/email_outbox.py). ALTER TYPE ... ADD VALUE cannot run inside a
+-- transaction block on older PostgreSQL versions, so run the script with
+-- psql's default autocommit:
+--
+--   psql "$DATABASE_URL" -f migrations/003_email_outbox.sql
+
+ALTER TYPE emailstatus ADD VALUE IF NOT EXISTS 'QUEUED' BEFORE 'SENT';
+ALTER TYPE emailstatus ADD VALUE IF NOT EXISTS 'SENDING' BEFORE 'SENT';
+
+ALTER TABLE emails ADD COLUMN IF NOT EXISTS attempts INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE emails ADD COLUMN IF NOT EXISTS next_attempt_at TIMESTAMP;
+ALTER TABLE emails ADD COLUMN IF NOT EXISTS locked_by VARCHAR(64);
+ALTER TABLE emails ADD COLUMN IF NOT EXISTS locked_until TIMESTAMP;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_emails_status_next_attempt_at ON emails (status, next_attempt_at);
@@ -29,6 +29,10 @@ class ItemDetail(BaseModel):
     name: str
     quantity: Optional[int] = None
     description: Optional[str] = None
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    size: Optional[str] = None
+    type: Optional[str] = None
 
 
 class RFQ(BaseModel):
@@ -87,6 +91,8 @@ class EmailTemplate(BaseModel):
 class EmailStatus(str, Enum):
     DRAFT = "draft"
     READY = "ready"
+    QUEUED = "queued"
+    SENDING = "sending"
     SENT = "sent"
     FAILED = "failed"
 
@@ -101,3 +107,9 @@ class Email(BaseModel):
     created_at: datetime
     sent_at: Optional[datetime] = None
     error_message: Optional[str] = None
+    attempts: int = 0
+    next_attempt_at: Optional[datetime] = None
+
+class EmailBatchRequest(BaseModel):
+    vendor_ids: List[str]
+    serials: Optional[List[int]] = None
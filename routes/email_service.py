@@ -1,13 +1,18 @@
-from fastapi import APIRouter, Request, Form, Depends, HTTPException, BackgroundTasks
+from fastapi import APIRouter, Request, Form, Depends, HTTPException
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
 import uuid
-import datetime
+import asyncio
 
-from models import Email, EmailStatus, EmailTemplate
+from sqlalchemy.exc import IntegrityError
+
+from models import Email, EmailTemplate, EmailBatchRequest
 from config import settings
-from services.email_generator import generate_email_for_vendor, send_email
+from services.email_generator import generate_email_for_vendor
+from services.email_templates import template_engine
+from services.email_outbox import enqueue_email, outbox_status
 
 router = APIRouter(prefix="/emails", tags=["Email Services"])
 templates = Jinja2Templates(directory="templates")
@@ -106,6 +111,7 @@ ProcureIQ Team
         
         for template in templates:
             email_template_database[template.id] = template
+            template_engine.add(template)
 
 @router.get("/", response_class=HTMLResponse)
 async def get_emails_dashboard(request: Request):
@@ -127,49 +133,30 @@ async def get_email_template_by_country(country_code: str):
     """Get email template for a specific country"""
     initialize_email_templates()
     
-    for template in email_template_database.values():
-        if template.country_code.lower() == country_code.lower():
-            return template.dict()
-    
-    # If no specific template, return default (US)
-    for template in email_template_database.values():
-        if template.country_code == "US":
-            return template.dict()
+    template = template_engine.for_country(country_code)
+    if template is None:
+        raise HTTPException(status_code=404, detail="Email template not found")
     
-    raise HTTPException(status_code=404, detail="Email template not found")
+    return template.dict()
 
 @router.post("/generate/{rfq_id}/{vendor_id}", response_class=JSONResponse)
 async def generate_vendor_email(request: Request, rfq_id: str, vendor_id: str, serial: int = 1):
     """Generate email for a vendor based on RFQ items"""
     from routes.rfq import rfq_database
-    from routes.vendor import vendor_database, initialize_mock_vendors
+    from routes.vendor import initialize_mock_vendors
     
     initialize_email_templates()
-    initialize_mock_vendors()
+    vendor = (await run_in_threadpool(initialize_mock_vendors)).get(vendor_id)
     
     if rfq_id not in rfq_database:
         raise HTTPException(status_code=404, detail="RFQ not found")
     
-    if vendor_id not in vendor_database:
+    if vendor is None:
         raise HTTPException(status_code=404, detail="Vendor not found")
     
     rfq = rfq_database[rfq_id]
-    vendor = vendor_database[vendor_id]
-    
-    # Find appropriate template
-    template = None
-    for t in email_template_database.values():
-        if t.country_code == vendor.location.country:
-            template = t
-            break
-    
-    # If no country-specific template, use default (US)
-    if not template:
-        for t in email_template_database.values():
-            if t.country_code == "US":
-                template = t
-                break
     
+    template = template_engine.for_country(vendor.location.country)
     if not template:
         raise HTTPException(status_code=404, detail="Email template not found")
     
@@ -179,28 +166,92 @@ async def generate_vendor_email(request: Request, rfq_id: str, vendor_id: str, s
     
     return {"status": "success", "email_id": email.id, "email": email.dict()}
 
+@router.post("/generate/{rfq_id}", response_class=JSONResponse)
+async def generate_vendor_emails(request: Request, rfq_id: str, batch: EmailBatchRequest):
+    """
+    Generate emails for many vendors of an RFQ in one request
+    
+    The item list is rendered once (and cached for this RFQ version) and
+    shared by every email. serials[i] is the serial of vendor_ids[i];
+    without serials they are numbered from 1. Unknown vendor ids are
+    returned in "missing_vendor_ids", and vendors in a country without an
+    email template in "unsupported_vendor_ids".
+    """
+    from routes.rfq import rfq_database
+    from routes.vendor import initialize_mock_vendors
+    
+    if rfq_id not in rfq_database:
+        raise HTTPException(status_code=404, detail="RFQ not found")
+    
+    serials = batch.serials or list(range(1, len(batch.vendor_ids) + 1))
+    if len(serials) != len(batch.vendor_ids):
+        raise HTTPException(status_code=400, detail="serials must have one entry per vendor id")
+    
+    initialize_email_templates()
+    snapshot = await run_in_threadpool(initialize_mock_vendors)
+    rfq = rfq_database[rfq_id]
+    item_list = template_engine.item_list(rfq)
+    
+    emails = []
+    missing = []
+    unsupported = []
+    for vendor_id, serial in zip(batch.vendor_ids, serials):
+        vendor = snapshot.get(vendor_id)
+        if vendor is None:
+            missing.append(vendor_id)
+            continue
+        template = template_engine.for_country(vendor.location.country)
+        if not template:
+            unsupported.append(vendor_id)
+            continue
+        email = generate_email_for_vendor(rfq, vendor, template, serial, item_list=item_list)
+        email_database[email.id] = email
+        emails.append(email)
+    
+    return {
+        "status": "success",
+        "emails": [email.dict() for email in emails],
+        "missing_vendor_ids": missing,
+        "unsupported_vendor_ids": unsupported
+    }
+
 @router.post("/send/{email_id}", response_class=JSONResponse)
-async def send_email_to_vendor(request: Request, email_id: str, background_tasks: BackgroundTasks):
-    """Send an email to a vendor"""
+async def send_email_to_vendor(request: Request, email_id: str):
+    """
+    Queue an email for sending
+    
+    The email is stored in the emails table and sent by the outbox workers
+    (python main.py email-outbox); its status moves from queued to sending
+    to sent, or failed after the last retry.
+    """
     if email_id not in email_database:
         raise HTTPException(status_code=404, detail="Email not found")
     
+    from routes.rfq import rfq_database
+    
     email = email_database[email_id]
     
-    # Schedule email sending as a background task
-    background_tasks.add_task(send_email, email)
+    try:
+        # The RFQ is stored along with the email if it only exists in memory
+        status = await asyncio.get_running_loop().run_in_executor(
+            None, enqueue_email, email, rfq_database.get(email.rfq_id)
+        )
+    except IntegrityError:
+        raise HTTPException(status_code=409, detail="The email's RFQ or vendor is not stored in the database")
     
-    # Update email status
-    email.status = EmailStatus.SENT
-    email.sent_at = datetime.datetime.now()
+    email.status = status
     email_database[email_id] = email
     
-    return {"status": "success", "message": "Email scheduled for sending"}
+    return {"status": "success", "email_status": status, "message": f"Email {status.value}"}
 
 @router.get("/{email_id}", response_class=JSONResponse)
 async def get_email_details(request: Request, email_id: str):
-    """Get details of a specific email"""
+    """Get details of a specific email, with its delivery status once queued"""
     if email_id not in email_database:
         raise HTTPException(status_code=404, detail="Email not found")
     
-    return email_database[email_id].dict()
+    email = email_database[email_id]
+    delivery = await run_in_threadpool(outbox_status, email_id)
+    if delivery is not None:
+        email = email.copy(update=delivery)
+    return email.dict()
@@ -10,6 +10,7 @@ from pathlib import Path
 from models import RFQ, RFQStatus, UploadedFile, FileType, ItemDetail
 from config import settings
 from services.document_processor import process_document
+from services.match_cache import match_cache
 
 router = APIRouter(prefix="/rfq", tags=["RFQ Management"])
 templates = Jinja2Templates(directory="templates")
@@ -210,6 +211,8 @@ async def update_rfq_items(request: Request, rfq_id: str):
         # Try to parse JSON
         try:
             items_data = await request.json()
+            if isinstance(items_data, dict):
+                items_data = items_data.get("items") or []
             print(f"Successfully parsed JSON, received {len(items_data)} items")
         except Exception as e:
             print(f"Error parsing JSON: {str(e)}")
@@ -242,6 +245,7 @@ async def update_rfq_items(request: Request, rfq_id: str):
         rfq.items = items
         rfq.updated_at = datetime.datetime.now()
         rfq_database[rfq_id] = rfq
+        match_cache.invalidate(rfq_id)
         
         print(f"Successfully updated RFQ with {len(items)} items")
         return {"status": "success", "message": f"RFQ items updated successfully. Saved {len(items)} items."}
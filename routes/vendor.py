@@ -1,102 +1,169 @@
 from fastapi import APIRouter, Request, Form, Query, HTTPException, Depends
 from fastapi.responses import HTMLResponse, JSONResponse
 from fastapi.templating import Jinja2Templates
-from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from typing import Any, Dict, List, Optional, Tuple
 import uuid
 import datetime
+import threading
 
-from models import Vendor, VendorType, Location, VendorPerformance
+from models import Vendor, VendorType, ItemDetail, RFQ
 from config import settings
-from services.vendor_matcher import find_vendors_for_items, search_vendors_by_criteria
+from services.vendor_matcher import find_vendors_for_items, vendor_table
+from services.vendor_index import VendorIndex
+from services.geo_index import GeoIndex
+from services.vendor_search import VendorSearchIndex
+from services.vendor_repository import vendor_repository, VendorSnapshot
+from services.demo_vendors import demo_vendors
+from services.shared_index import refresh_shared_index, serving_shared_index, shared_vendor_index
+from services.match_cache import match_cache, items_fingerprint, catalog_version
 
 router = APIRouter(prefix="/vendors", tags=["Vendor Management"])
 templates = Jinja2Templates(directory="templates")
 
-# In-memory vendor database for demo
-vendor_database = {}
+# Match index over the vendor snapshot
+vendor_index = VendorIndex()
+
+# Postcode-centroid index over the vendor snapshot for radius searches
+vendor_geo_index = GeoIndex()
+
+# Attribute and keyword index over the vendor snapshot for /vendors/search
+vendor_search_index = VendorSearchIndex()
+
+# The indexes above are updated in place by snapshot refreshes, which run on
+# threadpool threads; every update and every read holds this lock. They stay
+# empty when requests are served from a shared index file (VENDOR_INDEX_PATH)
+_indexes_lock = threading.Lock()
+
+# Snapshot the per-process indexes were last brought up to date with
+_indexed_snapshot: Optional[VendorSnapshot] = None
+
+def _sync_indexes(changed: List[Vendor], removed: List[str]):
+    """
+    Apply a vendor snapshot refresh to the in-memory indexes
+    
+    With a shared index file (settings.VENDOR_INDEX_PATH) every process
+    serves the file instead, so none keeps its own copy of the indexes.
+    """
+    global _indexed_snapshot
+    if settings.VENDOR_INDEX_PATH:
+        return
+    with _indexes_lock:
+        for index in (vendor_search_index, vendor_index, vendor_geo_index):
+            for vendor_id in removed:
+                index.remove_vendor(vendor_id)
+            for vendor in changed:
+                index.add_vendor(vendor)
+        # Listeners run for the snapshot that was just published
+        _indexed_snapshot = vendor_repository.published()
+        # Start building the semantic index now rather than on the first match
+        if settings.VENDOR_SEMANTIC_MATCHING and len(vendor_index):
+            vendor_index.semantic_index()
+
+vendor_repository.subscribe(_sync_indexes)
+
+# Catalog version the match cache was last purged for in this process
+_match_catalog: Optional[str] = None
+
+_demo_vendors_seeded = False
 
 # Mock vendor data for demonstration purposes
 def initialize_mock_vendors():
-    # Only initialize if empty and not in production
-    if not vendor_database:
-        vendors = [
-            Vendor(
-                id=str(uuid.uuid4()),
-                name="TechSupplies Inc.",
-                vendor_type=VendorType.AUTHORIZED_DISTRIBUTOR,
-                location=Location(country="USA", city="New York", zip_code="11040"),
-                website="https://techsupplies.example.com",
-                email="contact@techsupplies.example.com",
-                specializations=["Electronics", "IT Equipment"],
-                brands_carried=["Dell", "HP", "Cisco"], # not such  needed
-                performance=VendorPerformance(
-                    response_time_avg=24.5,
-                    quality_rating=4.8,
-                    pricing_consistency=4.6,
-                    reliability_score=4.7
-                )
-            ),
-            Vendor(
-                id=str(uuid.uuid4()),
-                name="GlobalParts Ltd.",
-                vendor_type=VendorType.RESELLER,
-                location=Location(country="UK", city="London", zip_code="EC1A 1BB"),
-                website="https://globalparts.example.com",
-                email="sales@globalparts.example.com",
-                specializations=["Mechanical Components", "Industrial Supplies"],
-                brands_carried=["Bosch", "Siemens", "ABB"],
-                performance=VendorPerformance(
-                    response_time_avg=36.2,
-                    quality_rating=4.5,
-                    pricing_consistency=4.2,
-                    reliability_score=4.4
-                )
-            ),
-            Vendor(
-                id=str(uuid.uuid4()),
-                name="Asian Electronics Co.",
-                vendor_type=VendorType.MANUFACTURER,
-                location=Location(country="China", city="Shenzhen", zip_code="518000"),
-                website="https://asianelec.example.com",
-                email="info@asianelec.example.com",
-                specializations=["Electronic Components", "PCB Assembly"],
-                brands_carried=["Own Brand", "OEM Services"],
-                performance=VendorPerformance(
-                    response_time_avg=18.7,
-                    quality_rating=4.3,
-                    pricing_consistency=4.8,
-                    reliability_score=4.2
-                )
-            ),
-            Vendor(
-                id=str(uuid.uuid4()),
-                name="Indian Industrial Supplies",
-                vendor_type=VendorType.STOCKIST,
-                location=Location(country="India", city="Mumbai", zip_code="400001"),
-                website="https://indiansupplies.example.com",
-                email="business@indiansupplies.example.com",
-                specializations=["Industrial Equipment", "Machinery Parts"],
-                brands_carried=["Larsen & Toubro", "Tata", "Kirloskar"],
-                performance=VendorPerformance(
-                    response_time_avg=29.5,
-                    quality_rating=4.1,
-                    pricing_consistency=4.4,
-                    reliability_score=4.0
-                )
-            )
-        ]
-        
-        for vendor in vendors:
-            vendor_database[vendor.id] = vendor
+    """
+    Return the current vendor snapshot, seeding the demo vendors into an
+    empty vendors table the first time (unless SEED_DEMO_VENDORS is off)
+    
+    Blocks on the database; async routes call it through run_in_threadpool.
+    A shared index file that is behind the snapshot is rebuilt in the
+    background.
+    """
+    global _demo_vendors_seeded
+    snapshot = vendor_repository.snapshot()
+    if not len(snapshot) and settings.SEED_DEMO_VENDORS and not _demo_vendors_seeded:
+        _demo_vendors_seeded = True
+        # Only one of several processes starting together inserts them
+        vendor_repository.seed(demo_vendors())
+        snapshot = vendor_repository.snapshot()
+    refresh_shared_index(snapshot)
+    return snapshot
+
+
+def _search(snapshot: VendorSnapshot, **criteria) -> Tuple[List[Vendor], int]:
+    """Run a vendor search against the shared or per-process indexes (in a threadpool thread)"""
+    shared = serving_shared_index(snapshot)
+    if shared is not None:
+        return shared.search.search(snapshot.by_id, **criteria)
+    with _indexes_lock:
+        return vendor_search_index.search(geo_index=vendor_geo_index, **criteria)
+
+
+def _match_items(snapshot: VendorSnapshot, items: List[ItemDetail], top_k: Optional[int],
+                 min_score: Optional[float]) -> Tuple[Dict[str, Any], str]:
+    """
+    Match items against the shared or per-process index (in a threadpool thread)
+    
+    Returns:
+        Tuple of (matches with their vendor table, catalog version of the index scored)
+    """
+    shared = serving_shared_index(snapshot)
+    if shared is not None:
+        vendors_for_items = find_vendors_for_items(items, top_k=top_k, min_score=min_score, shared=shared)
+        # A file built from an older snapshot can still list removed vendors
+        vendors_for_items = {
+            item_id: [match for match in matches if match["vendor_id"] in snapshot.by_id]
+            for item_id, matches in vendors_for_items.items()
+        }
+        return {
+            "vendors": vendor_table(vendors_for_items, snapshot.by_id),
+            "item_vendor_matches": vendors_for_items
+        }, catalog_version(shared)
+    with _indexes_lock:
+        vendors_for_items = find_vendors_for_items(items, index=vendor_index, top_k=top_k, min_score=min_score)
+        return {
+            "vendors": vendor_table(vendors_for_items, _indexed_snapshot.by_id),
+            "item_vendor_matches": vendors_for_items
+        }, catalog_version(_indexed_snapshot)
+
+
+def _cached_matches(snapshot: VendorSnapshot, rfq: RFQ, top_k: Optional[int], min_score: Optional[float]) -> Dict[str, Any]:
+    """
+    Matches for an RFQ's items from the match cache, or scored and cached
+    
+    Blocks on the cache database and on scoring; the match route calls it
+    through run_in_threadpool.
+    """
+    # Repeat views with the same items and vendor catalog come from the cache.
+    # Entries are keyed by the version of the index that is scored, and
+    # results for older catalogs are purged once per catalog change
+    global _match_catalog
+    if settings.VENDOR_INDEX_PATH:
+        shared = shared_vendor_index()
+        catalog = catalog_version(shared) if shared is not None else None
+    else:
+        catalog = catalog_version(_indexed_snapshot)
+    if catalog is not None and catalog != _match_catalog:
+        _match_catalog = catalog
+        match_cache.purge_catalog(catalog)
+    cache_key = match_cache.key(rfq.id, items_fingerprint(rfq.items), catalog, (top_k, min_score))
+    matches = match_cache.get(cache_key) if catalog is not None else None
+    
+    if matches is None:
+        # Find vendors matching the items in the RFQ
+        matches, scored = _match_items(snapshot, rfq.items, top_k, min_score)
+        # Only results from an index that has caught up with the snapshot are
+        # cached; a shared file that is behind is still served
+        if scored == catalog == catalog_version(snapshot):
+            match_cache.put(cache_key, matches)
+    return matches
 
 
 @router.get("/", response_class=HTMLResponse)
 async def get_vendors_dashboard(request: Request):
     """Main vendors dashboard view"""
-    initialize_mock_vendors()
+    snapshot = await run_in_threadpool(initialize_mock_vendors)
     return templates.TemplateResponse(
         "vendor_matching.html",
-        {"request": request, "title": "Vendor Matching", "vendors": list(vendor_database.values())}
+        {"request": request, "title": "Vendor Matching", "vendors": list(snapshot.vendors)}
     )
 
 @router.get("/search", response_class=JSONResponse)
@@ -107,29 +174,48 @@ async def search_vendors(
     city: Optional[str] = Query(None),
     zip_code: Optional[str] = Query(None),
     vendor_type: Optional[VendorType] = Query(None),
-    radius_miles: Optional[int] = Query(None)
+    radius_miles: Optional[int] = Query(None),
+    limit: int = Query(settings.VENDOR_SEARCH_PAGE_SIZE, ge=1, le=settings.VENDOR_SEARCH_MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0)
 ):
-    """Search vendors based on various criteria"""
-    initialize_mock_vendors()
+    """Search vendors based on various criteria, one page at a time"""
+    snapshot = await run_in_threadpool(initialize_mock_vendors)
     
-    # Use the vendor matcher service to find matching vendors
-    matching_vendors = search_vendors_by_criteria(
-        list(vendor_database.values()),
+    matching_vendors, total = await run_in_threadpool(
+        _search,
+        snapshot,
         keywords=keywords,
         country=country,
         city=city,
         zip_code=zip_code,
         vendor_type=vendor_type,
-        radius_miles=radius_miles
+        radius_miles=radius_miles,
+        limit=limit,
+        offset=offset
     )
     
-    return {"vendors": [vendor.dict() for vendor in matching_vendors]}
+    return {
+        "vendors": [vendor.dict() for vendor in matching_vendors],
+        "total": total,
+        "limit": limit,
+        "offset": offset
+    }
 
 @router.post("/match/{rfq_id}", response_class=JSONResponse)
-async def match_vendors_to_rfq(request: Request, rfq_id: str):
-    """Find suitable vendors for items in an RFQ"""
+async def match_vendors_to_rfq(
+    request: Request,
+    rfq_id: str,
+    top_k: Optional[int] = Query(None, ge=0),
+    min_score: Optional[float] = Query(None, ge=0)
+):
+    """
+    Find suitable vendors for items in an RFQ
+    
+    Matches list vendor ids and scores per item; every matched vendor
+    appears once in the "vendors" table.
+    """
     from routes.rfq import rfq_database
-    initialize_mock_vendors()
+    snapshot = await run_in_threadpool(initialize_mock_vendors)
     
     if rfq_id not in rfq_database:
         raise HTTPException(status_code=404, detail="RFQ not found")
@@ -138,35 +224,33 @@ async def match_vendors_to_rfq(request: Request, rfq_id: str):
     if not rfq.items:
         raise HTTPException(status_code=400, detail="No items in RFQ to match vendors")
     
-    # Find vendors matching the items in the RFQ
-    vendors_for_items = find_vendors_for_items(
-        rfq.items,
-        list(vendor_database.values())
-    )
+    matches = await run_in_threadpool(_cached_matches, snapshot, rfq, top_k, min_score)
     
     return {
         "status": "success",
         "rfq_number": rfq.rfq_number,
-        "item_vendor_matches": vendors_for_items
+        "items": {item.id: {"name": item.name, "description": item.description} for item in rfq.items},
+        "vendors": matches["vendors"],
+        "item_vendor_matches": matches["item_vendor_matches"]
     }
 
 @router.get("/{vendor_id}", response_class=JSONResponse)
 async def get_vendor_details(request: Request, vendor_id: str):
     """Get details of a specific vendor"""
-    initialize_mock_vendors()
+    vendor = (await run_in_threadpool(initialize_mock_vendors)).get(vendor_id)
     
-    if vendor_id not in vendor_database:
+    if vendor is None:
         raise HTTPException(status_code=404, detail="Vendor not found")
     
-    return vendor_database[vendor_id].dict()
+    return vendor.dict()
 
 @router.post("/", response_class=JSONResponse)
 async def create_vendor(request: Request, vendor: Vendor):
     """Create a new vendor"""
-    initialize_mock_vendors()
+    await run_in_threadpool(initialize_mock_vendors)
     
     vendor_id = str(uuid.uuid4())
     vendor.id = vendor_id
-    vendor_database[vendor_id] = vendor
+    await run_in_threadpool(vendor_repository.save, [vendor])
     
     return {"status": "success", "vendor_id": vendor_id, "message": "Vendor created successfully"}
@@ -1,17 +1,17 @@
 import os
 import json
 from typing import Dict, Any
-import openai
 from dotenv import load_dotenv
+from services.providers import chat_client, provider_router
 
 
 class RFQGenerator:
     def __init__(self):
         load_dotenv()
         api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        if not api_key and not provider_router().offline:
             raise ValueError("OpenAI API key not found in environment variables")
-        self.client = openai.OpenAI(api_key=api_key)
+        self.client = chat_client(api_key)
 
     def generate_rfq(self, text_content):
         """Generates RFQ from text content using OpenAI"""
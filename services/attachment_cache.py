@@ -0,0 +1,182 @@
+import os
+import base64
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+from email.mime.nonmultipart import MIMENonMultipart
+from typing import Dict, Optional, Tuple
+
+from config import settings
+
+# Read size for hashing and encoding; a multiple of 57 bytes, so every chunk
+# encodes to whole 76-character base64 lines
+_CHUNK = 57 * 16384
+
+
+def _encode_file(path: str, out) -> int:
+    """
+    Base64-encode a file into out exactly as email.encoders.encode_base64
+    does, without holding the raw file in memory
+
+    Returns:
+        Number of encoded bytes written
+    """
+    written = 0
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(_CHUNK), b""):
+            encoded = base64.encodebytes(chunk)
+            out.write(encoded)
+            written += len(encoded)
+    return written
+
+
+class AttachmentCache:
+    """
+    Base64-encoded attachment bodies keyed by the SHA-256 of the file.
+
+    A file is hashed once per (path, mtime, size) and encoded once per
+    content. Encoded bodies are kept in an in-memory LRU bounded by
+    max_bytes and spooled to disk_dir, which other processes (e.g. the
+    outbox workers) share; a body evicted from memory is read back from
+    disk instead of encoded again. Sending one drawing pack to many
+    vendors therefore reads and encodes it once.
+    """
+
+    def __init__(
+        self,
+        max_bytes: Optional[int] = None,
+        disk_dir: Optional[str] = None,
+        disk_max_bytes: Optional[int] = None
+    ):
+        self.max_bytes = settings.ATTACHMENT_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.disk_dir = settings.ATTACHMENT_CACHE_DIR if disk_dir is None else disk_dir
+        self.disk_max_bytes = settings.ATTACHMENT_CACHE_DISK_MAX_BYTES if disk_max_bytes is None else disk_max_bytes
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._encoding: Dict[str, threading.Lock] = {}
+        self.encodes = 0
+
+    def content_hash(self, path: str) -> str:
+        """SHA-256 of a file, recomputed only when its mtime or size changes"""
+        stat = os.stat(path)
+        cached = self._hashes.get(path)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            return cached[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as source:
+            for chunk in iter(lambda: source.read(_CHUNK), b""):
+                digest.update(chunk)
+        sha = digest.hexdigest()
+        with self._lock:
+            if len(self._hashes) >= 4096:
+                self._hashes.clear()
+            self._hashes[path] = (stat.st_mtime_ns, stat.st_size, sha)
+        return sha
+
+    def _disk_path(self, sha: str) -> Optional[str]:
+        return os.path.join(self.disk_dir, f"{sha}.b64") if self.disk_dir else None
+
+    def _remember(self, sha: str, encoded: str):
+        if len(encoded) > self.max_bytes:
+            return
+        with self._lock:
+            if sha in self._memory:
+                return
+            self._memory[sha] = encoded
+            self._memory_bytes += len(encoded)
+            while self._memory_bytes > self.max_bytes:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_bytes -= len(evicted)
+
+    def _prune_disk(self, keep: Optional[str] = None):
+        """Delete the least recently used spooled bodies beyond disk_max_bytes, except keep"""
+        stats = []
+        try:
+            for entry in os.scandir(self.disk_dir):
+                if entry.name.endswith(".b64"):
+                    stat = entry.stat()
+                    stats.append((entry.path == keep, stat.st_atime, stat.st_size, entry.path))
+        except OSError:
+            # Another process may prune the same directory at the same time
+            pass
+        total = 0
+        for kept, _, size, path in sorted(stats, reverse=True):
+            total += size
+            if total > self.disk_max_bytes and not kept:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _read_spooled(spooled: str) -> Optional[str]:
+        """A spooled body, or None if it was never spooled or another process pruned it"""
+        try:
+            with open(spooled, "r", encoding="ascii") as source:
+                return source.read()
+        except FileNotFoundError:
+            return None
+
+    def encoded(self, path: str) -> str:
+        """Base64 body of a file, encoded at most once per content"""
+        sha = self.content_hash(path)
+        with self._lock:
+            body = self._memory.get(sha)
+            if body is not None:
+                self._memory.move_to_end(sha)
+                return body
+            encoding = self._encoding.setdefault(sha, threading.Lock())
+
+        # One thread encodes a given file; the others wait and reuse its result
+        with encoding:
+            with self._lock:
+                body = self._memory.get(sha)
+            if body is not None:
+                return body
+
+            spooled = self._disk_path(sha)
+            body = self._read_spooled(spooled) if spooled else None
+            if body is None and spooled:
+                os.makedirs(self.disk_dir, exist_ok=True)
+                handle, temp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+                try:
+                    with os.fdopen(handle, "w+b") as out:
+                        _encode_file(path, out)
+                        # Read the body back before the file is visible to pruning
+                        out.seek(0)
+                        body = out.read().decode("ascii")
+                    os.replace(temp_path, spooled)
+                except BaseException:
+                    os.unlink(temp_path)
+                    raise
+                self.encodes += 1
+                self._prune_disk(keep=spooled)
+            elif body is None:
+                with tempfile.SpooledTemporaryFile(max_size=self.max_bytes) as out:
+                    _encode_file(path, out)
+                    out.seek(0)
+                    body = out.read().decode("ascii")
+                self.encodes += 1
+
+            self._remember(sha, body)
+        with self._lock:
+            self._encoding.pop(sha, None)
+        return body
+
+    def part(self, path: str, filename: Optional[str] = None) -> MIMENonMultipart:
+        """
+        MIME attachment part for a file, with the same headers as
+        MIMEApplication(data, Name=filename) and the cached base64 body
+        """
+        filename = filename or os.path.basename(path)
+        part = MIMENonMultipart("application", "octet-stream", Name=filename)
+        part["Content-Transfer-Encoding"] = "base64"
+        part.set_payload(self.encoded(path))
+        part["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return part
+
+
+attachment_cache = AttachmentCache()
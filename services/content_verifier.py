@@ -2,9 +2,11 @@ from typing import List, Dict
 import os
 import json
 import uuid
-import openai
 from dotenv import load_dotenv
 from models import ItemDetail
+from services.metrics import stage, record_llm_usage
+from services.tracing import tracer, record_llm_attributes
+from services.providers import chat_client, provider_router
 
 class ContentVerifier:
     def __init__(self):
@@ -13,9 +15,9 @@ class ContentVerifier:
         '''
         load_dotenv()
         api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
+        if not api_key and not provider_router().offline:
             raise ValueError("❌ Missing OpenAI API Key")
-        self.client = openai.OpenAI(api_key=api_key)
+        self.client = chat_client(api_key)
 
     def verify_rfq(self, text_content: str) -> bool:
         '''
@@ -30,17 +32,22 @@ class ContentVerifier:
             "Return exactly 'True' or 'False'. Keywords: RFQ, Request for Quotation, Quotation request, Pricing request."
         )
 
-        verification_resp = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": rfq_filter},
-                {"role": "user", "content": text_content}
-            ],
-            temperature=0,
-            max_tokens=10
-        )
+        with tracer.span("llm.classify", model="gpt-4", text_chars=len(text_content)) as span:
+            with stage("llm_classify", "gpt-4"):
+                verification_resp = self.client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": rfq_filter},
+                        {"role": "user", "content": text_content}
+                    ],
+                    temperature=0,
+                    max_tokens=10
+                )
+            record_llm_usage("classify", verification_resp, "gpt-4")
+            record_llm_attributes(span, verification_resp)
 
-        verification = verification_resp.choices[0].message.content.strip()
+            verification = verification_resp.choices[0].message.content.strip()
+            span.set_attribute("is_rfq", verification == "True")
         return verification == "True"
 
     def generate_rfq(self, text_content: str) -> tuple[List[ItemDetail], bool]:
@@ -70,32 +77,38 @@ class ContentVerifier:
         if not verification_status:
             return [], False
 
-        rfq_response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
-                {"role": "system", "content": extraction_rules},
-                {"role": "user", "content": text_content}
-            ],
-            temperature=0.5,
-            max_tokens=1000
-        )
+        with tracer.span("llm.extract", model="gpt-4", text_chars=len(text_content)) as span:
+            with stage("llm_extract", "gpt-4"):
+                rfq_response = self.client.chat.completions.create(
+                    model="gpt-4",
+                    messages=[
+                        {"role": "system", "content": extraction_rules},
+                        {"role": "user", "content": text_content}
+                    ],
+                    temperature=0.5,
+                    max_tokens=1000
+                )
+            record_llm_usage("extract", rfq_response, "gpt-4")
+            record_llm_attributes(span, rfq_response)
 
-        rfq_json = rfq_response.choices[0].message.content.strip()
+            rfq_json = rfq_response.choices[0].message.content.strip()
 
-        try:
-            rfq_data = json.loads(rfq_json)
-            items_list = []
-            for item in rfq_data.get("items", []):
-                if item.get("name", "").startswith("Wrong Request") or not item.get("name"):
-                    continue
-                item_detail = ItemDetail(
-                    id=str(uuid.uuid4()),
-                    name=item.get("name", "Unknown Item"),
-                    quantity=item.get("quantity", 1),
-                    description=item.get("description", "")
-                )
-                items_list.append(item_detail)
-            return (items_list, verification_status)
-        except json.JSONDecodeError:
-            print("❌ JSON decoding failed.")
-        return ([], verification_status)
+            try:
+                rfq_data = json.loads(rfq_json)
+                items_list = []
+                for item in rfq_data.get("items", []):
+                    if item.get("name", "").startswith("Wrong Request") or not item.get("name"):
+                        continue
+                    item_detail = ItemDetail(
+                        id=str(uuid.uuid4()),
+                        name=item.get("name", "Unknown Item"),
+                        quantity=item.get("quantity", 1),
+                        description=item.get("description", "")
+                    )
+                    items_list.append(item_detail)
+                span.set_attribute("item_count", len(items_list))
+                return (items_list, verification_status)
+            except json.JSONDecodeError:
+                print("❌ JSON decoding failed.")
+                span.set_attribute("json_error", True)
+            return ([], verification_status)
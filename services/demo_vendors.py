@@ -0,0 +1,75 @@
+"""Demo vendors seeded into an empty vendors table (see routes/vendor.py)"""
+import uuid
+from typing import List
+
+from models import Vendor, VendorType, Location, VendorPerformance
+
+
+def demo_vendors() -> List[Vendor]:
+    """The four demo vendors, with fresh ids"""
+    return [
+        Vendor(
+            id=str(uuid.uuid4()),
+            name="TechSupplies Inc.",
+            vendor_type=VendorType.AUTHORIZED_DISTRIBUTOR,
+            location=Location(country="USA", city="New York", zip_code="11040"),
+            website="https://techsupplies.example.com",
+            email="contact@techsupplies.example.com",
+            specializations=["Electronics", "IT Equipment"],
+            brands_carried=["Dell", "HP", "Cisco"], # not such  needed
+            performance=VendorPerformance(
+                response_time_avg=24.5,
+                quality_rating=4.8,
+                pricing_consistency=4.6,
+                reliability_score=4.7
+            )
+        ),
+        Vendor(
+            id=str(uuid.uuid4()),
+            name="GlobalParts Ltd.",
+            vendor_type=VendorType.RESELLER,
+            location=Location(country="UK", city="London", zip_code="EC1A 1BB"),
+            website="https://globalparts.example.com",
+            email="sales@globalparts.example.com",
+            specializations=["Mechanical Components", "Industrial Supplies"],
+            brands_carried=["Bosch", "Siemens", "ABB"],
+            performance=VendorPerformance(
+                response_time_avg=36.2,
+                quality_rating=4.5,
+                pricing_consistency=4.2,
+                reliability_score=4.4
+            )
+        ),
+        Vendor(
+            id=str(uuid.uuid4()),
+            name="Asian Electronics Co.",
+            vendor_type=VendorType.MANUFACTURER,
+            location=Location(country="China", city="Shenzhen", zip_code="518000"),
+            website="https://asianelec.example.com",
+            email="info@asianelec.example.com",
+            specializations=["Electronic Components", "PCB Assembly"],
+            brands_carried=["Own Brand", "OEM Services"],
+            performance=VendorPerformance(
+                response_time_avg=18.7,
+                quality_rating=4.3,
+                pricing_consistency=4.8,
+                reliability_score=4.2
+            )
+        ),
+        Vendor(
+            id=str(uuid.uuid4()),
+            name="Indian Industrial Supplies",
+            vendor_type=VendorType.STOCKIST,
+            location=Location(country="India", city="Mumbai", zip_code="400001"),
+            website="https://indiansupplies.example.com",
+            email="business@indiansupplies.example.com",
+            specializations=["Industrial Equipment", "Machinery Parts"],
+            brands_carried=["Larsen & Toubro", "Tata", "Kirloskar"],
+            performance=VendorPerformance(
+                response_time_avg=29.5,
+                quality_rating=4.1,
+                pricing_consistency=4.4,
+                reliability_score=4.0
+            )
+        )
+    ]
@@ -10,11 +10,14 @@ from services.read_pdf import AzureAIPDFReader
 from config import settings
 from models import ItemDetail, FileType
 from services.content_verifier import ContentVerifier
+from services.metrics import stage
+from services.tracing import tracer
+from services.providers import detect_text
 
 class DocumentProcessor:
     def __init__(self):
         """Initialize document processor with necessary clients and configurations"""
-        self.vision_client = vision.ImageAnnotatorClient()
+        self._vision_client = None
         self.azure_endpoint = settings.AZURE_DOCUMENT_INTELLIGENCE_ENDPOINT
         self.azure_key = settings.AZURE_DOCUMENT_INTELLIGENCE_KEY
 
@@ -37,11 +40,14 @@ class DocumentProcessor:
             if file_type == 'pdf':
                 return self._extract_pdf(file_path)
             elif file_type == 'docx':
-                return self._extract_docx(file_path)
+                with stage("extraction", "docx"):
+                    return self._extract_docx(file_path)
             elif file_type == 'excel':
-                return self._extract_excel(file_path)
+                with stage("extraction", "excel"):
+                    return self._extract_excel(file_path)
             elif file_type == 'image':
-                return self._extract_image(file_path)
+                with stage("extraction", "vision_ocr"):
+                    return self._extract_image(file_path)
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
         except Exception as e:
@@ -66,10 +72,12 @@ class DocumentProcessor:
         """Extract text from PDF using Azure AI or PyPDF2 fallback"""
         if self.azure_endpoint and self.azure_key:
             try:
-                return self._extract_pdf_azure(file_path)
+                with stage("extraction", "azure"):
+                    return self._extract_pdf_azure(file_path)
             except Exception as e:
                 print(f"Azure extraction failed: {e}, using fallback")
-        return self._extract_pdf_fallback(file_path)
+        with stage("extraction", "pypdf2"):
+            return self._extract_pdf_fallback(file_path)
 
     def _extract_pdf_azure(self, file_path: str) -> str:
         """Extract text using Azure Document Intelligence"""
@@ -119,12 +127,25 @@ class DocumentProcessor:
         return "\n".join(text)
 
     def _extract_excel(self, file_path: str) -> str:
-        """Extract text from Excel files"""
-        df = pd.read_excel(file_path)
+        """Extract text from Excel and CSV files"""
+        if file_path.lower().endswith('.csv'):
+            df = pd.read_csv(file_path)
+        else:
+            df = pd.read_excel(file_path)
         return df.to_csv(index=False)
 
+    @property
+    def vision_client(self):
+        # Created on first use, so replaying recorded OCR needs no Google credentials
+        if self._vision_client is None:
+            self._vision_client = vision.ImageAnnotatorClient()
+        return self._vision_client
+
     def _extract_image(self, file_path: str) -> str:
         """Extract text from images using Google Vision OCR"""
+        return detect_text(file_path, lambda: self._ocr_image(file_path))
+
+    def _ocr_image(self, file_path: str) -> str:
         with open(file_path, "rb") as image_file:
             content = image_file.read()
 
@@ -148,21 +169,27 @@ async def process_document(file_path: str, file_type: FileType) -> List[ItemDeta
         List of extracted item details
     """
     try:
-        # Initialize the document processor
-        processor = DocumentProcessor()
-        
-        # Extract text content
-        extracted_text = processor.extract_content(file_path)
-        
-        if not extracted_text:
-            print(f"No text could be extracted from {file_path}")
-            return []
-        
-        # Use content verifier to extract items from the text
-        content_verifier = ContentVerifier()
-        items, is_rfq = content_verifier.generate_rfq(extracted_text)
-        
-        return items
+        with tracer.span("process_document", file_type=str(getattr(file_type, "value", file_type)),
+                         file_name=os.path.basename(file_path)) as span:
+            # Initialize the document processor
+            processor = DocumentProcessor()
+            
+            # Extract text content
+            with tracer.span("extract_content"):
+                extracted_text = processor.extract_content(file_path)
+            
+            if not extracted_text:
+                print(f"No text could be extracted from {file_path}")
+                span.set_attribute("item_count", 0)
+                return []
+            span.set_attribute("text_chars", len(extracted_text))
+            
+            # Use content verifier to extract items from the text
+            content_verifier = ContentVerifier()
+            items, is_rfq = content_verifier.generate_rfq(extracted_text)
+            span.set_attributes(is_rfq=is_rfq, item_count=len(items))
+            
+            return items
     except Exception as e:
         print(f"Error in process_document: {str(e)}")
         raise Exception(f"Error processing document: {str(e)}")
\ No newline at end of file
@@ -1,16 +1,23 @@
 import os
-import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
 import uuid
 import datetime
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 from models import RFQ, Vendor, EmailTemplate, Email, EmailStatus
 from config import settings
+from services.email_templates import template_engine
+from services.smtp_transport import smtp_transport
+from services.attachment_cache import attachment_cache
 
-def generate_email_for_vendor(rfq: RFQ, vendor: Vendor, template: EmailTemplate, serial: int = 1) -> Email:
+def generate_email_for_vendor(
+    rfq: RFQ,
+    vendor: Vendor,
+    template: EmailTemplate,
+    serial: int = 1,
+    item_list: Optional[str] = None
+) -> Email:
     """
     Generate an email for a vendor based on an RFQ and template
     
@@ -19,53 +26,22 @@ def generate_email_for_vendor(rfq: RFQ, vendor: Vendor, template: EmailTemplate,
         vendor: The vendor to generate email for
         template: The email template to use
         serial: Serial number for the email
+        item_list: Pre-rendered item list; defaults to the engine's cached
+            item list for this version of the RFQ
         
     Returns:
         Generated Email object
     """
-    # Create item list text
-    item_list = ""
-    for i, item in enumerate(rfq.items, 1):
-        item_text = f"{i}. {item.name}"
-        if item.quantity:
-            item_text += f", Qty: {item.quantity}"
-        if item.brand:
-            item_text += f", Brand: {item.brand}"
-        if item.model:
-            item_text += f", Model: {item.model}"
-        if item.size:
-            item_text += f", Size: {item.size}"
-        if item.type:
-            item_text += f", Type: {item.type}"
-        
-        item_list += item_text + "\n"
-    
-    # Format subject
-    subject = template.subject_template.format(
-        rfq_number=rfq.rfq_number,
-        serial=f"{serial:02d}",
-        vendor_name=vendor.name,
-        country=vendor.location.country
-    )
-    
-    # Format body
-    body = template.body_template.format(
-        vendor_name=vendor.name,
-        item_list=item_list,
-        rfq_number=rfq.rfq_number
-    )
+    if item_list is None:
+        item_list = template_engine.item_list(rfq)
     
-    # Add signature and additional notes based on country
-    body += "\n\n" + template.signature
-    
-    if template.additional_notes:
-        body += "\n\n" + template.additional_notes
-    
-    if template.incoterms:
-        body += f"\n\nIncoterms: {template.incoterms}"
-    
-    if template.currency:
-        body += f"\nCurrency: {template.currency}"
+    subject, body = template_engine.compile(template).render({
+        "rfq_number": rfq.rfq_number,
+        "serial": f"{serial:02d}",
+        "vendor_name": vendor.name,
+        "country": vendor.location.country,
+        "item_list": item_list
+    })
     
     # Create email object
     email = Email(
@@ -81,6 +57,34 @@ def generate_email_for_vendor(rfq: RFQ, vendor: Vendor, template: EmailTemplate,
     
     return email
 
+def build_message(subject: str, body: str, recipient: str, attachments: List[str]) -> MIMEMultipart:
+    """
+    Build the MIME message for an email
+    
+    Args:
+        subject: Email subject
+        body: Plain-text body
+        recipient: Recipient address
+        attachments: Paths of files to attach (missing files are skipped)
+        
+    Returns:
+        MIME message ready to send
+    """
+    msg = MIMEMultipart()
+    msg['From'] = settings.EMAIL_FROM
+    msg['To'] = recipient
+    msg['Subject'] = subject
+    
+    # Attach body
+    msg.attach(MIMEText(body, 'plain'))
+    
+    # Attach files; each file is read and base64-encoded once however many
+    # emails it is attached to
+    for attachment_path in attachments:
+        if os.path.exists(attachment_path):
+            msg.attach(attachment_cache.part(attachment_path))
+    return msg
+
 async def send_email(email: Email):
     """
     Send an email using SMTP
@@ -90,13 +94,13 @@ async def send_email(email: Email):
     """
     try:
         # Get vendor email
-        from routes.vendor import vendor_database
-        if email.vendor_id not in vendor_database:
+        from services.vendor_repository import vendor_repository
+        vendor = vendor_repository.get(email.vendor_id)
+        if vendor is None:
             email.status = EmailStatus.FAILED
             email.error_message = "Vendor not found"
             return
         
-        vendor = vendor_database[email.vendor_id]
         recipient_email = vendor.email
         
         if not recipient_email:
@@ -104,38 +108,17 @@ async def send_email(email: Email):
             email.error_message = "Vendor email not available"
             return
         
-        # Create MIME message
-        msg = MIMEMultipart()
-        msg['From'] = settings.EMAIL_FROM
-        msg['To'] = recipient_email
-        msg['Subject'] = email.subject
-        
-        # Attach body
-        msg.attach(MIMEText(email.body, 'plain'))
-        
-        # Attach files
-        for attachment_path in email.attachments:
-            if os.path.exists(attachment_path):
-                with open(attachment_path, 'rb') as file:
-                    part = MIMEApplication(file.read(), Name=os.path.basename(attachment_path))
-                    part['Content-Disposition'] = f'attachment; filename="{os.path.basename(attachment_path)}"'
-                    msg.attach(part)
+        msg = build_message(email.subject, email.body, recipient_email, email.attachments)
         
-        # Send email using SMTP
+        # Send email over a pooled SMTP connection
         try:
             print(f"📧 Attempting to send email to {recipient_email}")
-            # Check if SMTP settings are configured
-            if not hasattr(settings, 'SMTP_HOST') or not settings.SMTP_HOST:
+            transport = smtp_transport()
+            if transport is None:
                 print("⚠️ SMTP settings not configured, simulating email send")
-                # Simulate sending if SMTP settings are not available
-                pass
             else:
-                # Use actual SMTP to send email
-                with smtplib.SMTP(settings.SMTP_HOST, settings.SMTP_PORT) as server:
-                    server.starttls()
-                    server.login(settings.SMTP_USERNAME, settings.SMTP_PASSWORD)
-                    server.send_message(msg)
-                    print(f"✅ Email sent successfully to {recipient_email}")
+                await transport.send(msg)
+                print(f"✅ Email sent successfully to {recipient_email}")
         except Exception as smtp_error:
             print(f"❌ SMTP error: {smtp_error}")
             email.status = EmailStatus.FAILED
@@ -0,0 +1,358 @@
+import os
+import time
+import random
+import socket
+import smtplib
+import datetime
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.dialects.postgresql import insert
+
+from config import settings
+from models import Email, EmailStatus, RFQ
+import db_models
+from db_utils import app_context, insert_item_rows
+from services.email_generator import build_message
+from services.rate_limit import RateLimiter
+from services.smtp_transport import SmtpTransport, smtp_transport
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before retry number attempts: exponential backoff with jitter, capped"""
+    delay = min(settings.OUTBOX_RETRY_MAX_SECONDS, settings.OUTBOX_RETRY_BASE_SECONDS * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def is_permanent(error: Exception) -> bool:
+    """Whether retrying a failed send is pointless (5xx replies, refused recipients, bad data)"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500
+    return isinstance(error, (ValueError, smtplib.SMTPNotSupportedError))
+
+
+def _store_rfq(session, rfq: RFQ):
+    """Insert an RFQ and its items unless the database already has it"""
+    inserted = session.execute(
+        insert(db_models.RFQ.__table__).values(
+            id=rfq.id,
+            rfq_number=rfq.rfq_number,
+            client_name=rfq.client_name,
+            created_at=rfq.created_at,
+            updated_at=rfq.updated_at,
+            status=rfq.status,
+            notes=rfq.notes
+        ).on_conflict_do_nothing()
+    ).rowcount
+    if inserted:
+        insert_item_rows([
+            {"id": item.id, "name": item.name, "quantity": item.quantity,
+             "description": item.description, "rfq_id": rfq.id}
+            for item in rfq.items
+        ])
+
+
+def enqueue_email(email: Email, rfq: Optional[RFQ] = None) -> EmailStatus:
+    """
+    Store an email in the emails table and queue it for the sender workers
+
+    Queuing is idempotent: an email that is already queued, being sent or
+    sent keeps its status. A failed email is queued again with a fresh
+    attempt count.
+
+    Args:
+        email: Generated email (its vendor must exist in the database)
+        rfq: RFQ the email was generated from, stored with its items in the
+            same transaction if the database does not have it yet (RFQs
+            created through the FastAPI routes live only in memory)
+
+    Returns:
+        Status of the email after the call
+    """
+    with app_context():
+        session = db_models.db.session
+        try:
+            row = session.get(db_models.Email, email.id)
+            if row is None:
+                if rfq is not None:
+                    _store_rfq(session, rfq)
+                row = db_models.Email(
+                    id=email.id,
+                    rfq_id=email.rfq_id,
+                    vendor_id=email.vendor_id,
+                    subject=email.subject,
+                    body=email.body,
+                    created_at=email.created_at
+                )
+                row.attachments = [db_models.EmailAttachment(file_path=path) for path in email.attachments]
+                session.add(row)
+            elif row.status in (EmailStatus.QUEUED, EmailStatus.SENDING, EmailStatus.SENT):
+                return row.status
+
+            row.status = EmailStatus.QUEUED
+            row.attempts = 0
+            row.next_attempt_at = datetime.datetime.utcnow()
+            row.error_message = None
+            row.locked_by = None
+            row.locked_until = None
+            session.commit()
+            return EmailStatus.QUEUED
+        except Exception:
+            session.rollback()
+            raise
+
+
+def outbox_status(email_id: str) -> Optional[Dict]:
+    """Delivery status of a queued email, or None if it was never queued"""
+    with app_context():
+        row = db_models.db.session.execute(
+            select(
+                db_models.Email.status, db_models.Email.attempts, db_models.Email.next_attempt_at,
+                db_models.Email.sent_at, db_models.Email.error_message
+            ).where(db_models.Email.id == email_id)
+        ).one_or_none()
+    if row is None:
+        return None
+    return {
+        "status": row.status,
+        "attempts": row.attempts,
+        "next_attempt_at": row.next_attempt_at,
+        "sent_at": row.sent_at,
+        "error_message": row.error_message
+    }
+
+
+_limiter: Optional[RateLimiter] = None
+
+
+def outbox_rate_limiter() -> RateLimiter:
+    """
+    Send rate limiter shared by the outbox threads of this process: an
+    overall bucket plus one bucket per recipient domain. Other outbox
+    processes have their own, so the limits apply per process.
+    """
+    global _limiter
+    if _limiter is None:
+        _limiter = RateLimiter(
+            settings.EMAIL_RATE_PER_SECOND,
+            settings.EMAIL_RATE_BURST,
+            key_rate=settings.EMAIL_DOMAIN_RATE_PER_SECOND,
+            key_burst=settings.EMAIL_DOMAIN_RATE_BURST
+        )
+    return _limiter
+
+
+class _Claimed:
+    __slots__ = ("id", "recipient", "subject", "body", "attempts", "attachments")
+
+    def __init__(self, row, recipient: Optional[str], attachments: List[str]):
+        self.id = row.id
+        self.recipient = recipient
+        self.subject = row.subject
+        self.body = row.body
+        self.attempts = row.attempts
+        self.attachments = attachments
+
+
+class OutboxWorker:
+    """
+    Sends queued emails from the emails table.
+
+    Each round claims up to batch_size due emails with
+    SELECT ... FOR UPDATE SKIP LOCKED, so any number of workers (threads or
+    processes) share the queue without sending an email twice. A claim is
+    a lease: the email moves to SENDING until locked_until, and an email
+    whose worker died becomes due again when the lease expires.
+
+    Claimed emails are sent concurrently through the SMTP pool, each
+    waiting for a token from the process's rate limiter (overall and per
+    recipient domain). An email that would wait too long goes back to the
+    queue without using an attempt. Failures are retried with exponential
+    backoff until max_attempts; permanent SMTP errors fail at once. Every
+    outcome records error_message.
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        transport: Optional[SmtpTransport] = None,
+        limiter: Optional[RateLimiter] = None,
+        batch_size: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        lease_seconds: Optional[float] = None,
+        max_attempts: Optional[int] = None
+    ):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+        self.transport = transport if transport is not None else smtp_transport()
+        self.limiter = limiter or outbox_rate_limiter()
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+        self.concurrency = concurrency or settings.SMTP_POOL_SIZE
+        self.lease_seconds = lease_seconds or settings.OUTBOX_LEASE_SECONDS
+        self.max_attempts = max_attempts or settings.OUTBOX_MAX_ATTEMPTS
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="outbox-send")
+
+    def claim(self) -> List[_Claimed]:
+        """Lease up to batch_size due emails to this worker"""
+        Outbox = db_models.Email
+        session = db_models.db.session
+        now = datetime.datetime.utcnow()
+        due = select(Outbox.id).where(or_(
+            and_(Outbox.status == EmailStatus.QUEUED, Outbox.next_attempt_at <= now),
+            and_(Outbox.status == EmailStatus.SENDING, Outbox.locked_until < now)
+        )).order_by(Outbox.next_attempt_at).limit(self.batch_size).with_for_update(skip_locked=True)
+        try:
+            rows = session.execute(
+                update(Outbox)
+                .where(Outbox.id.in_(due))
+                .values(
+                    status=EmailStatus.SENDING,
+                    attempts=Outbox.attempts + 1,
+                    locked_by=self.worker_id,
+                    locked_until=now + datetime.timedelta(seconds=self.lease_seconds)
+                )
+                .returning(Outbox.id, Outbox.vendor_id, Outbox.subject, Outbox.body, Outbox.attempts)
+                .execution_options(synchronize_session=False)
+            ).all()
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        if not rows:
+            return []
+
+        recipients = dict(session.execute(
+            select(db_models.Vendor.id, db_models.Vendor.email)
+            .where(db_models.Vendor.id.in_({row.vendor_id for row in rows}))
+        ).all())
+        attachments: Dict[str, List[str]] = {}
+        for email_id, path in session.execute(
+            select(db_models.EmailAttachment.email_id, db_models.EmailAttachment.file_path)
+            .where(db_models.EmailAttachment.email_id.in_([row.id for row in rows]))
+        ):
+            attachments.setdefault(email_id, []).append(path)
+        session.commit()
+        return [_Claimed(row, recipients.get(row.vendor_id), attachments.get(row.id, [])) for row in rows]
+
+    def _deliver(self, email: _Claimed, deadline: float) -> Tuple[str, Optional[str], float]:
+        """
+        Send one claimed email
+
+        Returns:
+            Tuple of (outcome, error message, seconds until the next attempt)
+            where outcome is "sent", "retry", "deferred" or "failed"
+        """
+        try:
+            recipient = email.recipient
+            if not recipient:
+                raise ValueError("Vendor email not available")
+            domain = recipient.rsplit("@", 1)[-1]
+
+            while True:
+                wait = self.limiter.try_acquire(domain)
+                if wait == 0:
+                    break
+                if time.monotonic() + wait > deadline:
+                    return "deferred", None, wait
+                time.sleep(wait)
+
+            message = build_message(email.subject, email.body, recipient, email.attachments)
+            if self.transport is None:
+                print(f"⚠️ SMTP settings not configured, simulating email send to {recipient}")
+            else:
+                self.transport.send_sync(message)
+            return "sent", None, 0.0
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if is_permanent(e) or email.attempts >= self.max_attempts:
+                return "failed", error, 0.0
+            return "retry", error, retry_delay(email.attempts)
+
+    def _record(self, results: List[Tuple[_Claimed, Tuple[str, Optional[str], float]]]):
+        """Write the outcome of a batch, only for emails this worker still holds"""
+        Outbox = db_models.Email
+        session = db_models.db.session
+        now = datetime.datetime.utcnow()
+        released = {"locked_by": None, "locked_until": None}
+        try:
+            for email, (outcome, error, delay) in results:
+                if outcome == "sent":
+                    values = dict(released, status=EmailStatus.SENT, sent_at=now, error_message=None)
+                elif outcome == "failed":
+                    values = dict(released, status=EmailStatus.FAILED, error_message=error)
+                elif outcome == "deferred":
+                    # Rate limited before sending: give the attempt back
+                    values = dict(released, status=EmailStatus.QUEUED, attempts=Outbox.attempts - 1,
+                                  next_attempt_at=now + datetime.timedelta(seconds=delay))
+                else:
+                    values = dict(released, status=EmailStatus.QUEUED, error_message=error,
+                                  next_attempt_at=now + datetime.timedelta(seconds=delay))
+                session.execute(
+                    update(Outbox)
+                    .where(Outbox.id == email.id, Outbox.locked_by == self.worker_id)
+                    .values(**values)
+                    .execution_options(synchronize_session=False)
+                )
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    def run_once(self) -> int:
+        """
+        Claim and send one batch
+
+        Returns:
+            Number of emails claimed
+        """
+        claimed = self.claim()
+        if not claimed:
+            return 0
+        # Leave a margin so results are recorded before the lease runs out
+        deadline = time.monotonic() + self.lease_seconds / 2
+        outcomes = list(self._executor.map(lambda email: self._deliver(email, deadline), claimed))
+        results = list(zip(claimed, outcomes))
+        self._record(results)
+
+        counts: Dict[str, int] = {}
+        for outcome, _, _ in outcomes:
+            counts[outcome] = counts.get(outcome, 0) + 1
+        print(f"📤 Outbox {self.worker_id}: " + ", ".join(f"{count} {outcome}" for outcome, count in sorted(counts.items())))
+        return len(claimed)
+
+    def run(self, stop: threading.Event, poll_seconds: Optional[float] = None):
+        """Send batches until stop is set, polling while the queue is empty"""
+        poll_seconds = settings.OUTBOX_POLL_SECONDS if poll_seconds is None else poll_seconds
+        with app_context():
+            while not stop.is_set():
+                try:
+                    if self.run_once():
+                        continue
+                except Exception as e:
+                    print(f"❌ Outbox worker {self.worker_id} error: {str(e)}")
+                stop.wait(poll_seconds)
+        self._executor.shutdown(wait=True)
+
+
+def run_outbox(workers: Optional[int] = None):
+    """Run sender workers in this process until interrupted"""
+    workers = workers or settings.OUTBOX_WORKERS
+    stop = threading.Event()
+    threads = []
+    for number in range(workers):
+        worker = OutboxWorker(worker_id=f"{socket.gethostname()}:{os.getpid()}:{number}")
+        thread = threading.Thread(target=worker.run, args=(stop,), name=f"outbox-{number}", daemon=True)
+        thread.start()
+        threads.append(thread)
+    print(f"🚀 Email outbox running with {workers} workers")
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        print("🛑 Stopping email outbox...")
+        stop.set()
+        for thread in threads:
+            thread.join()
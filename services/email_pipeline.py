@@ -1,13 +1,25 @@
 from typing import List, Tuple, Dict, Optional
 from services.content_verifier import ContentVerifier
 from services.send_notification import WhatsAppSender
+from services.notification_dispatcher import NotificationDispatcher
 from services.document_processor import process_document
 from services.email_modifier import EmailModifier
 from db_utils import store_rfq_items_in_db
+from services.metrics import stage, EMAILS_PROCESSED
+from services.tracing import tracer
 
 import os
 from models import FileType 
 
+# Attachment extensions the document processor can read
+ATTACHMENT_FILE_TYPES = {
+    "pdf": FileType.PDF,
+    "docx": FileType.DOCX,
+    "xlsx": FileType.EXCEL, "xls": FileType.EXCEL, "csv": FileType.EXCEL,
+    "png": FileType.IMAGE, "jpg": FileType.IMAGE, "jpeg": FileType.IMAGE,
+    "gif": FileType.IMAGE, "bmp": FileType.IMAGE, "tiff": FileType.IMAGE
+}
+
 
 class RFQPipeline:
     def __init__(self):
@@ -27,7 +39,22 @@ class RFQPipeline:
             print(f"⚠️ WhatsApp initialization failed: {str(e)}")
             self.whatsapp_sender = None
 
+        # Notifications are queued and sent (as digests) by a background thread
+        self.notifications = NotificationDispatcher(self.whatsapp_sender.send_message) if self.whatsapp_sender else None
+
+    def close(self, timeout: Optional[float] = None):
+        """Send any queued notifications and stop the notification thread"""
+        if self.notifications:
+            self.notifications.close(timeout)
+
     async def process(self, body: str, attachment_path: Optional[str] = None, email_metadata: Optional[Dict] = None):
+        with tracer.span("rfq.pipeline", body_chars=len(body),
+                         attachment=os.path.basename(attachment_path) if attachment_path else None) as span:
+            items = await self._process(body, attachment_path, email_metadata)
+            span.set_attribute("item_count", len(items))
+            return items
+
+    async def _process(self, body: str, attachment_path: Optional[str] = None, email_metadata: Optional[Dict] = None):
         print("🔄 RFQPipeline processing started...")
         text_content = body
         print(f"📝 Email body length: {len(body)} characters")
@@ -38,7 +65,9 @@ class RFQPipeline:
             try:
                 file_ext = os.path.splitext(attachment_path)[1].lower().replace('.', '')
                 print(f"📄 File extension detected: {file_ext}")
-                file_type = FileType(file_ext)
+                file_type = ATTACHMENT_FILE_TYPES.get(file_ext)
+                if file_type is None:
+                    raise ValueError(f"Unsupported attachment type: {file_ext}")
                 extracted_items = await process_document(attachment_path, file_type)
                 if extracted_items:
                     print(f"✅ Extracted {len(extracted_items)} items from attachment")
@@ -63,7 +92,9 @@ class RFQPipeline:
 
         if not is_rfq or not items:
             print("📭 Not an RFQ or no valid items found.")
+            EMAILS_PROCESSED.inc(result="not_rfq")
             return []
+        EMAILS_PROCESSED.inc(result="rfq")
 
         # Log extracted items
         print("📋 Items extracted from RFQ:")
@@ -72,18 +103,16 @@ class RFQPipeline:
             print(f"     Description: {item.description or 'No description'}")
 
         # Format and send WhatsApp message
-        if self.whatsapp_sender:
+        if self.notifications:
             print("🔄 Preparing WhatsApp message...")
             message = "🧾 *RFQ Detected*\n" + "\n".join(
                 [f"- {item.name} (Qty: {item.quantity or 'N/A'})\n  {item.description or 'No description'}"
                  for item in items]
             )
-            print("📱 Sending WhatsApp notification...")
-            success = self.whatsapp_sender.send_message(message)
-            if success:
-                print("✅ WhatsApp notification sent successfully")
+            if self.notifications.notify(message):
+                print("📱 WhatsApp notification queued")
             else:
-                print("⚠️ Failed to send WhatsApp notification")
+                print("⚠️ Failed to queue WhatsApp notification")
         else:
             print("⚠️ WhatsApp notification skipped: sender not initialized")
 
@@ -91,13 +120,14 @@ class RFQPipeline:
         if email_metadata and is_rfq and items:
             try:
                 print("💾 Storing RFQ items in database...")
-                store_rfq_items_in_db(
-                    items=items,
-                    email_subject=email_metadata.get("subject", "No Subject"),
-                    sender_name=email_metadata.get("sender_name", ""),
-                    sender_email=email_metadata.get("sender_email", "Unknown Sender"),
-                    body=email_metadata.get("body", "")
-                )
+                with stage("db_persist"):
+                    store_rfq_items_in_db(
+                        items=items,
+                        email_subject=email_metadata.get("subject", "No Subject"),
+                        sender_name=email_metadata.get("sender_name", ""),
+                        sender_email=email_metadata.get("sender_email", "Unknown Sender"),
+                        body=email_metadata.get("body", "")
+                    )
                 print("✅ RFQ items stored in database successfully")
             except Exception as e:
                 print(f"❌ Error storing items in database: {str(e)}")
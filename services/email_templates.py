@@ -0,0 +1,178 @@
+import string
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from models import RFQ, EmailTemplate
+from services.geo_index import country_code
+
+DEFAULT_TEMPLATE_COUNTRY = "US"
+
+_formatter = string.Formatter()
+
+# A compiled template is a list of literal strings and (field, conversion, spec) tuples
+Segment = Union[str, Tuple[str, Optional[str], str]]
+
+
+def format_item_list(items) -> str:
+    """
+    Numbered item list used in RFQ emails, one line per item
+
+    Args:
+        items: RFQ items
+
+    Returns:
+        Item list text ending with a newline
+    """
+    lines = []
+    for i, item in enumerate(items, 1):
+        parts = [f"{i}. {item.name}"]
+        if item.quantity:
+            parts.append(f"Qty: {item.quantity}")
+        if item.brand:
+            parts.append(f"Brand: {item.brand}")
+        if item.model:
+            parts.append(f"Model: {item.model}")
+        if item.size:
+            parts.append(f"Size: {item.size}")
+        if item.type:
+            parts.append(f"Type: {item.type}")
+        lines.append(", ".join(parts) + "\n")
+    return "".join(lines)
+
+
+def parse_format(text: str) -> List[Segment]:
+    """Split a str.format template into literal text and replacement fields"""
+    segments: List[Segment] = []
+    for literal, field, spec, conversion in _formatter.parse(text):
+        if literal:
+            segments.append(literal)
+        if field is not None:
+            segments.append((field, conversion, spec or ""))
+    return segments
+
+
+def _merge_literals(segments: Iterable[Segment]) -> List[Segment]:
+    merged: List[Segment] = []
+    for segment in segments:
+        if isinstance(segment, str) and merged and isinstance(merged[-1], str):
+            merged[-1] += segment
+        else:
+            merged.append(segment)
+    return merged
+
+
+def _render(segments: List[Segment], values: Dict[str, Any]) -> str:
+    parts = []
+    for segment in segments:
+        if isinstance(segment, str):
+            parts.append(segment)
+            continue
+        field, conversion, spec = segment
+        if "." in field or "[" in field:
+            value = _formatter.get_field(field, (), values)[0]
+        else:
+            value = values[field]
+        if conversion:
+            value = _formatter.convert_field(value, conversion)
+        parts.append(value if not spec and isinstance(value, str) else format(value, spec))
+    return "".join(parts)
+
+
+class CompiledTemplate:
+    """
+    An EmailTemplate parsed once into segments.
+
+    The body segments already include the signature, additional notes,
+    incoterms and currency as literal text, so rendering an email is one
+    join per subject and body.
+    """
+
+    __slots__ = ("template", "subject", "body")
+
+    def __init__(self, template: EmailTemplate):
+        self.template = template
+        self.subject = _merge_literals(parse_format(template.subject_template))
+        trailer = "\n\n" + template.signature
+        if template.additional_notes:
+            trailer += "\n\n" + template.additional_notes
+        if template.incoterms:
+            trailer += f"\n\nIncoterms: {template.incoterms}"
+        if template.currency:
+            trailer += f"\nCurrency: {template.currency}"
+        self.body = _merge_literals(parse_format(template.body_template) + [trailer])
+
+    def render(self, values: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        Render the subject and body
+
+        Args:
+            values: Field values (rfq_number, serial, vendor_name, country, item_list)
+
+        Returns:
+            Tuple of (subject, body)
+        """
+        return _render(self.subject, values), _render(self.body, values)
+
+
+def _template_key(template: EmailTemplate) -> tuple:
+    return (template.id, template.subject_template, template.body_template, template.signature,
+            template.additional_notes, template.incoterms, template.currency)
+
+
+class TemplateEngine:
+    """
+    Precompiled email templates indexed by ISO country code, plus a cache
+    of rendered item lists.
+
+    A template edited in place is recompiled the next time it is used. The
+    item list of an RFQ is rendered once per RFQ version (id, updated_at
+    and item count), so a fan-out to many vendors reuses it.
+    """
+
+    def __init__(self, templates: Iterable[EmailTemplate] = (), item_list_cache_size: int = 256):
+        self.by_country: Dict[str, EmailTemplate] = {}
+        self._compiled: Dict[tuple, CompiledTemplate] = {}
+        self._item_lists: "OrderedDict[tuple, str]" = OrderedDict()
+        self.item_list_cache_size = item_list_cache_size
+        self._lock = threading.Lock()
+        for template in templates:
+            self.add(template)
+
+    def __len__(self) -> int:
+        return len(self.by_country)
+
+    def add(self, template: EmailTemplate):
+        """Index a template under its country code, replacing the previous one"""
+        self.by_country[template.country_code.upper()] = template
+        self.compile(template)
+
+    def compile(self, template: EmailTemplate) -> CompiledTemplate:
+        """Compiled form of a template, parsed on first use"""
+        key = _template_key(template)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = self._compiled[key] = CompiledTemplate(template)
+        return compiled
+
+    def for_country(self, country: Optional[str]) -> Optional[EmailTemplate]:
+        """Template for a country name or code, falling back to the US template"""
+        return self.by_country.get(country_code(country)) or self.by_country.get(DEFAULT_TEMPLATE_COUNTRY)
+
+    def item_list(self, rfq: RFQ) -> str:
+        """Rendered item list of an RFQ, cached per RFQ version"""
+        key = (rfq.id, rfq.updated_at, len(rfq.items))
+        with self._lock:
+            rendered = self._item_lists.get(key)
+            if rendered is not None:
+                self._item_lists.move_to_end(key)
+                return rendered
+        rendered = format_item_list(rfq.items)
+        with self._lock:
+            self._item_lists[key] = rendered
+            while len(self._item_lists) > self.item_list_cache_size:
+                self._item_lists.popitem(last=False)
+        return rendered
+
+
+template_engine = TemplateEngine()
@@ -0,0 +1,271 @@
+import os
+import io
+import re
+import math
+import zipfile
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from models import Vendor
+from config import settings
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LATITUDE = 69.0
+
+US_ZIP = re.compile(r'^(\d{5})(?:-\d{4})?$')
+UK_POSTCODE = re.compile(r'^([A-Z]{1,2}[0-9][A-Z0-9]?) ?([0-9][A-Z]{2})$', re.IGNORECASE)
+
+# Country names used in vendor locations -> ISO 3166 alpha-2 codes used by GeoNames
+COUNTRY_CODES = {
+    "usa": "US", "us": "US", "united states": "US", "united states of america": "US",
+    "uk": "GB", "gb": "GB", "united kingdom": "GB", "great britain": "GB", "england": "GB",
+    "china": "CN", "india": "IN", "germany": "DE", "france": "FR", "canada": "CA",
+    "japan": "JP", "australia": "AU", "italy": "IT", "spain": "ES", "netherlands": "NL",
+}
+
+
+def country_code(country: Optional[str]) -> Optional[str]:
+    """ISO alpha-2 code for a country name or code, or None if unknown"""
+    if not country:
+        return None
+    country = country.strip()
+    code = COUNTRY_CODES.get(country.lower())
+    if code:
+        return code
+    return country.upper() if len(country) == 2 else None
+
+
+def postcode_country(postcode: str) -> Optional[str]:
+    """Guess the country of a postcode from its format (US ZIP or UK postcode)"""
+    postcode = postcode.strip()
+    if US_ZIP.match(postcode):
+        return "US"
+    if UK_POSTCODE.match(postcode):
+        return "GB"
+    return None
+
+
+def normalize_postcode(code: str, postcode: str) -> str:
+    """Canonical postcode form used as a lookup key"""
+    postcode = postcode.strip().upper()
+    if code == "US":
+        match = US_ZIP.match(postcode)
+        return match.group(1) if match else postcode
+    if code == "GB":
+        match = UK_POSTCODE.match(postcode)
+        return f"{match.group(1)} {match.group(2)}".upper() if match else postcode
+    return postcode
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in miles"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+class PostcodeCentroids:
+    """
+    Postcode -> (latitude, longitude) lookups from a GeoNames postal code dump.
+
+    The GeoNames files (https://download.geonames.org/export/zip/, e.g.
+    allCountries.zip, US.zip, GB_full.csv.zip) are tab separated with the
+    country code, postal code, place name, three admin levels, latitude,
+    longitude and accuracy. Zipped dumps are read directly. UK postcodes
+    that are not listed fall back to the centroid of their outward code.
+    """
+
+    def __init__(self):
+        self.centroids: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._outward: Dict[str, List[float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.centroids)
+
+    def add(self, code: str, postcode: str, latitude: float, longitude: float):
+        key = normalize_postcode(code, postcode)
+        self.centroids[(code, key)] = (latitude, longitude)
+        if code == "GB":
+            outward = key.split(" ")[0]
+            totals = self._outward.setdefault(outward, [0.0, 0.0, 0])
+            totals[0] += latitude
+            totals[1] += longitude
+            totals[2] += 1
+
+    def load(self, path: str) -> int:
+        """
+        Load a GeoNames postal code file (.txt/.csv or .zip)
+
+        Returns:
+            Number of postcodes loaded
+        """
+        before = len(self.centroids)
+        if path.endswith(".zip"):
+            with zipfile.ZipFile(path) as archive:
+                for name in archive.namelist():
+                    if name.endswith((".txt", ".csv")) and not name.lower().startswith("readme"):
+                        with archive.open(name) as raw:
+                            self._load_lines(io.TextIOWrapper(raw, encoding="utf-8"))
+        else:
+            with open(path, encoding="utf-8") as lines:
+                self._load_lines(lines)
+        return len(self.centroids) - before
+
+    def _load_lines(self, lines: Iterable[str]):
+        for line in lines:
+            fields = line.rstrip("\n").split("\t")
+            if len(fields) < 11:
+                continue
+            try:
+                latitude, longitude = float(fields[9]), float(fields[10])
+            except ValueError:
+                continue
+            self.add(fields[0].upper(), fields[1], latitude, longitude)
+
+    def lookup(self, country: Optional[str], postcode: Optional[str]) -> Optional[Tuple[float, float]]:
+        """Centroid of a postcode, or None if it is not in the dataset"""
+        code = country_code(country)
+        if not code or not postcode:
+            return None
+        key = normalize_postcode(code, postcode)
+        centroid = self._exact(code, key)
+        if centroid is None and code == "GB":
+            centroid = self._outward_centroid(key.split(" ")[0])
+        return centroid
+
+    def _exact(self, code: str, key: str) -> Optional[Tuple[float, float]]:
+        return self.centroids.get((code, key))
+
+    def _outward_centroid(self, outward: str) -> Optional[Tuple[float, float]]:
+        totals = self._outward.get(outward)
+        if not totals:
+            return None
+        return totals[0] / totals[2], totals[1] / totals[2]
+
+
+_centroids: Optional[PostcodeCentroids] = None
+
+
+def load_postcode_centroids() -> PostcodeCentroids:
+    """Load the centroid dataset from settings.POSTCODE_CENTROIDS_PATH (not cached)"""
+    centroids = PostcodeCentroids()
+    path = settings.POSTCODE_CENTROIDS_PATH
+    if path and os.path.exists(path):
+        count = centroids.load(path)
+        print(f"✅ Loaded {count} postcode centroids from {path}")
+    else:
+        print(f"⚠️ Postcode centroid file not found ({path}); radius search uses postcode heuristics")
+    return centroids
+
+
+def postcode_centroids() -> PostcodeCentroids:
+    """Process-wide centroid dataset, loaded once from settings.POSTCODE_CENTROIDS_PATH"""
+    global _centroids
+    if _centroids is None:
+        _centroids = load_postcode_centroids()
+    return _centroids
+
+
+class GeoIndex:
+    """
+    Grid of vendor locations for radius queries.
+
+    Vendors are bucketed into cells of cell_degrees x cell_degrees. A radius
+    query only visits the cells overlapping the circle's bounding box and
+    measures exact haversine distances for the vendors in them.
+    """
+
+    def __init__(self, centroids: Optional[PostcodeCentroids] = None, cell_degrees: float = 0.5):
+        self._centroids = centroids
+        self.cell_degrees = cell_degrees
+        self.cells: Dict[Tuple[int, int], Dict[str, Tuple[float, float]]] = {}
+        self.locations: Dict[str, Tuple[float, float]] = {}
+        # Vendors whose postcode is not in the dataset
+        self.unlocated: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self.locations)
+
+    @property
+    def centroids(self) -> PostcodeCentroids:
+        """Centroid dataset, loaded on first use so importing a module that builds an index stays cheap"""
+        if self._centroids is None:
+            self._centroids = postcode_centroids()
+        return self._centroids
+
+    def __contains__(self, vendor_id: str) -> bool:
+        return vendor_id in self.locations
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return int(math.floor(latitude / self.cell_degrees)), int(math.floor(longitude / self.cell_degrees))
+
+    def add_vendor(self, vendor: Vendor) -> bool:
+        """
+        Index a vendor at its postcode centroid, replacing any previous entry
+
+        Returns:
+            True if the vendor's postcode was found in the dataset
+        """
+        self.remove_vendor(vendor.id)
+        centroid = self.centroids.lookup(vendor.location.country, vendor.location.zip_code)
+        if centroid is None:
+            self.unlocated.add(vendor.id)
+            return False
+        self.locations[vendor.id] = centroid
+        self.cells.setdefault(self._cell(*centroid), {})[vendor.id] = centroid
+        return True
+
+    def remove_vendor(self, vendor_id: str):
+        self.unlocated.discard(vendor_id)
+        centroid = self.locations.pop(vendor_id, None)
+        if centroid is not None:
+            cell = self.cells.get(self._cell(*centroid))
+            if cell is not None:
+                cell.pop(vendor_id, None)
+                if not cell:
+                    del self.cells[self._cell(*centroid)]
+
+    def _cell_members(self, cell: Tuple[int, int]) -> Iterable[Tuple[str, Tuple[float, float]]]:
+        return self.cells.get(cell, {}).items()
+
+    def within(self, latitude: float, longitude: float, radius_miles: float) -> Dict[str, float]:
+        """
+        Vendors within a radius of a point
+
+        Returns:
+            Dictionary mapping vendor IDs to distance in miles
+        """
+        lat_span = radius_miles / MILES_PER_DEGREE_LATITUDE
+        min_lat, max_lat = max(-90.0, latitude - lat_span), min(90.0, latitude + lat_span)
+        widest = max(abs(min_lat), abs(max_lat))
+        cos_lat = math.cos(math.radians(widest))
+        if widest >= 89.0 or cos_lat * 180 * MILES_PER_DEGREE_LATITUDE <= radius_miles:
+            lon_ranges = [(-180.0, 180.0)]
+        else:
+            lon_span = radius_miles / (MILES_PER_DEGREE_LATITUDE * cos_lat)
+            lon_ranges = [(longitude - lon_span, longitude + lon_span)]
+
+        row_start, row_end = self._cell(min_lat, 0)[0], self._cell(max_lat, 0)[0]
+        visited: Set[Tuple[int, int]] = set()
+        found = {}
+        for min_lon, max_lon in lon_ranges:
+            col_start, col_end = self._cell(0, min_lon)[1], self._cell(0, max_lon)[1]
+            for row in range(row_start, row_end + 1):
+                for col in range(col_start, col_end + 1):
+                    # Wrap columns across the antimeridian
+                    wrapped = (row, self._cell(0, ((col * self.cell_degrees + 180) % 360) - 180)[1])
+                    if wrapped in visited:
+                        continue
+                    visited.add(wrapped)
+                    for vendor_id, (lat, lon) in self._cell_members(wrapped):
+                        distance = haversine_miles(latitude, longitude, lat, lon)
+                        if distance <= radius_miles:
+                            found[vendor_id] = distance
+        return found
+
+    def within_postcode(self, country: Optional[str], postcode: str, radius_miles: float) -> Optional[Dict[str, float]]:
+        """Vendors within a radius of a postcode, or None if the postcode is unknown"""
+        centroid = self.centroids.lookup(country or postcode_country(postcode), postcode)
+        if centroid is None:
+            return None
+        return self.within(centroid[0], centroid[1], radius_miles)
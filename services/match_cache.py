@@ -0,0 +1,185 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from models import ItemDetail
+from config import settings
+
+# Item fields that affect vendor matching
+_FINGERPRINT_FIELDS = ("id", "name", "quantity", "description", "brand", "model", "size", "type")
+
+
+def items_fingerprint(items: Iterable[ItemDetail]) -> str:
+    """Hash of the matching-relevant fields of an RFQ's items"""
+    rows = [[getattr(item, field, None) for field in _FINGERPRINT_FIELDS] for item in items]
+    return hashlib.sha1(json.dumps(rows, default=str).encode("utf-8")).hexdigest()
+
+
+def catalog_version(snapshot) -> str:
+    """
+    Version of the vendor catalog: the snapshot watermark and vendor count
+
+    Works for anything with a watermark and a length, such as a
+    VendorSnapshot or a SharedVendorIndex.
+    """
+    watermark = snapshot.watermark.isoformat() if snapshot.watermark is not None else ""
+    return f"{watermark}/{len(snapshot)}"
+
+
+def _catalog_watermark(catalog: str) -> str:
+    # ISO timestamps of the same form sort in time order as strings
+    return catalog.rpartition("/")[0]
+
+
+class MatchCache:
+    """
+    Vendor match results per RFQ, shared between worker processes.
+
+    Results live in a SQLite database in WAL mode, so any number of workers
+    read it concurrently while one writes. Each process keeps the most
+    recently used entries in an in-memory LRU in front of it, so a repeat
+    view is a dictionary lookup.
+
+    Keys combine the RFQ id, a fingerprint of its items, the vendor catalog
+    version of the index that produced the result and the match parameters.
+    An item edit or vendor change therefore never returns a stale result,
+    even in a worker that missed the invalidation; invalidate() and
+    purge_catalog() only free the space.
+    """
+
+    def __init__(self, path: Optional[str] = None, max_entries: Optional[int] = None,
+                 memory_entries: Optional[int] = None):
+        self.path = settings.MATCH_CACHE_PATH if path is None else path
+        self.max_entries = settings.MATCH_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.memory_entries = settings.MATCH_CACHE_MEMORY_ENTRIES if memory_entries is None else memory_entries
+        self._memory: "OrderedDict[Tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(rfq_id: str, fingerprint: str, catalog: str, params: Tuple) -> Tuple:
+        return (rfq_id, fingerprint, catalog) + tuple(params)
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Per-thread connection to the shared database, or None when disabled"""
+        if not self.path:
+            return None
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS match_cache ("
+                "key TEXT PRIMARY KEY, rfq_id TEXT NOT NULL, catalog TEXT NOT NULL, "
+                "watermark TEXT NOT NULL DEFAULT '', value TEXT NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(match_cache)")}
+            if "watermark" not in columns:
+                connection.execute("ALTER TABLE match_cache ADD COLUMN watermark TEXT NOT NULL DEFAULT ''")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_match_cache_rfq ON match_cache (rfq_id)")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_match_cache_accessed ON match_cache (accessed_at)")
+            self._local.connection = connection
+        return connection
+
+    def _remember(self, key: Tuple, value: Dict[str, Any]):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: Tuple) -> Optional[Dict[str, Any]]:
+        """Cached result for a key, from memory or the shared database"""
+        with self._lock:
+            value = self._memory.get(key)
+            if value is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return value
+
+        value = None
+        try:
+            connection = self._connection()
+            if connection is not None:
+                disk_key = json.dumps(key, default=str)
+                row = connection.execute("SELECT value FROM match_cache WHERE key = ?", (disk_key,)).fetchone()
+                if row is not None:
+                    value = json.loads(row[0])
+                    connection.execute("UPDATE match_cache SET accessed_at = ? WHERE key = ?", (time.time(), disk_key))
+        except sqlite3.Error as e:
+            print(f"⚠️ Match cache read failed: {str(e)}")
+
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(key, value)
+        return value
+
+    def put(self, key: Tuple, value: Dict[str, Any]):
+        """Store a JSON-serialisable result, evicting the least recently used entries past max_entries"""
+        self._remember(key, value)
+        try:
+            connection = self._connection()
+            if connection is None:
+                return
+            connection.execute(
+                "INSERT OR REPLACE INTO match_cache (key, rfq_id, catalog, watermark, value, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (json.dumps(key, default=str), key[0], key[2], _catalog_watermark(key[2]),
+                 json.dumps(value, default=str), time.time())
+            )
+            self._writes += 1
+            # Trimming needs a count, so only do it every few writes
+            if self._writes % 32 == 0:
+                connection.execute(
+                    "DELETE FROM match_cache WHERE key IN (SELECT key FROM match_cache "
+                    "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+        except sqlite3.Error as e:
+            print(f"⚠️ Match cache write failed: {str(e)}")
+
+    def invalidate(self, rfq_id: str):
+        """Drop every cached result for an RFQ (call after its items change)"""
+        with self._lock:
+            for key in [key for key in self._memory if key[0] == rfq_id]:
+                del self._memory[key]
+        try:
+            connection = self._connection()
+            if connection is not None:
+                connection.execute("DELETE FROM match_cache WHERE rfq_id = ?", (rfq_id,))
+        except sqlite3.Error as e:
+            print(f"⚠️ Match cache invalidation failed: {str(e)}")
+
+    def purge_catalog(self, current: str):
+        """
+        Drop results computed against vendor catalogs older than current
+
+        Workers whose snapshots lag behind keep reading their own version,
+        so results for the same or a later watermark are left alone.
+        """
+        watermark = _catalog_watermark(current)
+        with self._lock:
+            for key in [key for key in self._memory if _catalog_watermark(key[2]) < watermark]:
+                del self._memory[key]
+        try:
+            connection = self._connection()
+            if connection is not None:
+                connection.execute("DELETE FROM match_cache WHERE watermark < ?", (watermark,))
+        except sqlite3.Error as e:
+            print(f"⚠️ Match cache purge failed: {str(e)}")
+
+
+match_cache = MatchCache()
@@ -0,0 +1,300 @@
+import os
+import time
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, from cache hits to slow LLM and OCR calls
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) - set(self.labelnames):
+            raise ValueError(f"Unknown labels for {self.name}: {sorted(set(labels) - set(self.labelnames))}")
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {_escape(self.help_text)}", f"# TYPE {self.name} {self.type_name}"]
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, one series per label combination"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Tuple[Tuple[str, ...], float]]:
+        """(label values, count) for every series"""
+        with self._lock:
+            return sorted(self._values.items())
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        for key, value in self.samples():
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (e.g. latencies) in cumulative buckets,
+    with the sum and count Prometheus needs for rates and averages
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # Per series: [count per bucket (not cumulative)..., sum, count]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+            series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with block in seconds (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return int(series[-1]) if series else 0
+
+    def total(self, **labels) -> float:
+        series = self._series.get(self._key(labels))
+        return series[-2] if series else 0.0
+
+    def quantile(self, q: float, **labels) -> Optional[float]:
+        """Estimate a quantile by interpolating within its bucket, as histogram_quantile() does"""
+        with self._lock:
+            series = list(self._series.get(self._key(labels)) or [])
+        if not series or not series[-1]:
+            return None
+        rank = q * series[-1]
+        seen = 0
+        for index, bound in enumerate(self.buckets):
+            in_bucket = series[index]
+            if seen + in_bucket >= rank and in_bucket:
+                lower = self.buckets[index - 1] if index else 0.0
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / in_bucket
+            seen += in_bucket
+        return self.buckets[-2]
+
+    def series(self) -> List[Tuple[str, ...]]:
+        with self._lock:
+            return sorted(self._series)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            series = sorted((key, list(values)) for key, values in self._series.items())
+        for key, values in series:
+            cumulative = 0
+            for bound, in_bucket in zip(self.buckets, values):
+                cumulative += in_bucket
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{labels} {int(values[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The process's metrics, rendered in the Prometheus text exposition format.
+
+    Metrics live in process memory: under a multi-process server each worker
+    reports its own numbers, and Prometheus sums them across scrape targets.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labelnames != metric.labelnames:
+                    raise ValueError(f"Metric {metric.name} is already registered differently")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: str):
+        """
+        Write render() to path atomically, e.g. for the node_exporter
+        textfile collector when the process has no HTTP endpoint
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as out:
+                out.write(self.render())
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+metrics = MetricsRegistry()
+
+# RFQ ingestion metrics, shared by the email worker and the web app
+STAGE_SECONDS = metrics.histogram(
+    "rfq_stage_duration_seconds",
+    "Time spent in each RFQ ingestion stage",
+    ("stage", "backend")
+)
+STAGE_ERRORS = metrics.counter(
+    "rfq_stage_errors_total",
+    "RFQ ingestion stage runs that raised an error",
+    ("stage", "backend")
+)
+LLM_TOKENS = metrics.counter(
+    "rfq_llm_tokens_total",
+    "Tokens used by LLM calls, by call and token kind (prompt or completion)",
+    ("call", "model", "kind")
+)
+EMAILS_PROCESSED = metrics.counter(
+    "rfq_emails_processed_total",
+    "Emails run through the RFQ pipeline, by result (rfq, not_rfq or error)",
+    ("result",)
+)
+NOTIFICATIONS = metrics.counter(
+    "rfq_notifications_total",
+    "WhatsApp notifications by outcome (queued, dropped, sent or failed)",
+    ("outcome",)
+)
+
+
+@contextmanager
+def stage(name: str, backend: str = ""):
+    """
+    Time an ingestion stage into rfq_stage_duration_seconds and count it in
+    rfq_stage_errors_total if it raises
+
+    Args:
+        name: Stage name (imap_fetch, mime_parse, extraction, llm_classify, ...)
+        backend: Implementation that ran the stage, where there are several
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.inc(stage=name, backend=backend)
+        raise
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - start, stage=name, backend=backend)
+
+
+def record_llm_usage(call: str, response, model: str = ""):
+    """Count the prompt and completion tokens of an OpenAI chat completion response"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    model = model or getattr(response, "model", "") or ""
+    LLM_TOKENS.inc(getattr(usage, "prompt_tokens", 0) or 0, call=call, model=model, kind="prompt")
+    LLM_TOKENS.inc(getattr(usage, "completion_tokens", 0) or 0, call=call, model=model, kind="completion")
+
+
+def stage_summary() -> str:
+    """Human-readable per-stage latency and token summary, for the email worker's log"""
+    lines = ["📊 Stage latency (count, total, p50, p95, errors):"]
+    for name, backend in STAGE_SECONDS.series():
+        label = f"{name}[{backend}]" if backend else name
+        p50 = STAGE_SECONDS.quantile(0.5, stage=name, backend=backend) or 0.0
+        p95 = STAGE_SECONDS.quantile(0.95, stage=name, backend=backend) or 0.0
+        lines.append(
+            f"  {label:<28} {STAGE_SECONDS.count(stage=name, backend=backend):>6} "
+            f"{STAGE_SECONDS.total(stage=name, backend=backend):>9.2f}s "
+            f"{p50 * 1000:>9.1f}ms {p95 * 1000:>9.1f}ms "
+            f"{int(STAGE_ERRORS.value(stage=name, backend=backend)):>4}"
+        )
+    tokens = LLM_TOKENS.samples()
+    if tokens:
+        lines.append("🪙 LLM tokens:")
+        for (call, model, kind), count in tokens:
+            lines.append(f"  {call} ({model}) {kind}: {int(count)}")
+    return "\n".join(lines)
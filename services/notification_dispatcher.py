@@ -0,0 +1,186 @@
+import time
+import queue
+import random
+import threading
+from typing import Callable, List, Optional
+
+from config import settings
+from services.metrics import stage, NOTIFICATIONS, STAGE_ERRORS
+from services.rate_limit import RateLimiter
+
+DIGEST_SEPARATOR = "\n\n"
+
+
+def split_message(text: str, max_chars: int) -> List[str]:
+    """Split text into chunks of at most max_chars, preferring line breaks"""
+    chunks = []
+    while len(text) > max_chars:
+        cut = text.rfind("\n", 0, max_chars + 1)
+        if cut <= 0:
+            cut = max_chars
+        chunks.append(text[:cut].rstrip("\n"))
+        text = text[cut:].lstrip("\n")
+    if text:
+        chunks.append(text)
+    return chunks
+
+
+def build_digests(messages: List[str], max_chars: int) -> List[str]:
+    """
+    Coalesce queued notifications into as few messages as fit in max_chars
+
+    A single notification is sent unchanged. Several are packed in order
+    under a "n notifications" header; a notification too long for one
+    message is split across several.
+
+    Args:
+        messages: Notification texts in the order they were queued
+        max_chars: Longest message the channel accepts
+
+    Returns:
+        Message texts to send
+    """
+    if len(messages) == 1:
+        return split_message(messages[0], max_chars)
+
+    header = f"📬 *{len(messages)} notifications*"
+    digests: List[str] = []
+    current = header
+    for message in messages:
+        for part in split_message(message, max_chars - len(header) - len(DIGEST_SEPARATOR)):
+            if len(current) + len(DIGEST_SEPARATOR) + len(part) > max_chars:
+                digests.append(current)
+                current = part
+            else:
+                current += DIGEST_SEPARATOR + part
+    digests.append(current)
+    return digests
+
+
+class NotificationDispatcher:
+    """
+    Sends notifications from a background thread so callers never wait on
+    the messaging API.
+
+    notify() only appends to a bounded in-memory queue. The worker thread
+    waits for the first message, collects everything that arrives within
+    window_seconds and sends it as digest messages of at most max_chars.
+    Sends go through a token bucket (rate_per_second) and failed sends are
+    retried with exponential backoff up to max_attempts.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], bool],
+        window_seconds: Optional[float] = None,
+        max_chars: Optional[int] = None,
+        limiter: Optional[RateLimiter] = None,
+        max_attempts: Optional[int] = None,
+        retry_base_seconds: Optional[float] = None,
+        queue_size: Optional[int] = None
+    ):
+        self.send = send
+        self.window_seconds = settings.WHATSAPP_DIGEST_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self.max_chars = max_chars or settings.WHATSAPP_MAX_MESSAGE_CHARS
+        self.limiter = limiter or RateLimiter(settings.WHATSAPP_RATE_PER_SECOND, settings.WHATSAPP_RATE_BURST)
+        self.max_attempts = max_attempts or settings.WHATSAPP_MAX_ATTEMPTS
+        self.retry_base_seconds = settings.WHATSAPP_RETRY_BASE_SECONDS if retry_base_seconds is None else retry_base_seconds
+        self._queue: "queue.Queue[Optional[str]]" = queue.Queue(maxsize=queue_size or settings.WHATSAPP_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        # Set by close(); None in the queue only wakes an idle worker
+        self._closing = threading.Event()
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._closing.clear()
+                self._thread = threading.Thread(target=self._run, name="notification-dispatcher", daemon=True)
+                self._thread.start()
+
+    def notify(self, text: str) -> bool:
+        """
+        Queue a notification without blocking
+
+        Returns:
+            False if the queue is full and the notification was dropped
+        """
+        self.start()
+        try:
+            self._queue.put_nowait(text)
+            NOTIFICATIONS.inc(outcome="queued")
+            return True
+        except queue.Full:
+            self.dropped += 1
+            NOTIFICATIONS.inc(outcome="dropped")
+            print("⚠️ Notification queue full, dropping notification")
+            return False
+
+    def close(self, timeout: Optional[float] = None):
+        """Send everything still queued (without waiting for the window), then stop the worker"""
+        with self._lock:
+            thread = self._thread
+        if thread is None:
+            return
+        self._closing.set()
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            # The worker is busy draining the queue and will see the flag
+            pass
+        thread.join(timeout)
+
+    def _finished(self) -> bool:
+        return self._closing.is_set() and self._queue.empty()
+
+    def _collect(self, first: str) -> List[str]:
+        batch = [first]
+        deadline = time.monotonic() + self.window_seconds
+        while True:
+            # After close() the window is skipped and only what is queued is taken
+            remaining = 0 if self._closing.is_set() else deadline - time.monotonic()
+            try:
+                message = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return batch
+            if message is not None:
+                batch.append(message)
+
+    def _deliver(self, text: str) -> bool:
+        for attempt in range(1, self.max_attempts + 1):
+            self.limiter.acquire()
+            try:
+                with stage("notification", "whatsapp"):
+                    delivered = self.send(text)
+                if delivered:
+                    return True
+                STAGE_ERRORS.inc(stage="notification", backend="whatsapp")
+            except Exception as e:
+                print(f"❌ Notification send error: {str(e)}")
+            if attempt < self.max_attempts:
+                time.sleep(self.retry_base_seconds * 2 ** (attempt - 1) * random.uniform(0.5, 1.0))
+        return False
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                if self._finished():
+                    return
+                continue
+            batch = self._collect(first)
+            for digest in build_digests(batch, self.max_chars):
+                if self._deliver(digest):
+                    self.sent += 1
+                    NOTIFICATIONS.inc(outcome="sent")
+                else:
+                    self.failed += 1
+                    NOTIFICATIONS.inc(outcome="failed")
+                    print(f"❌ Notification dropped after {self.max_attempts} attempts")
+            if len(batch) > 1:
+                print(f"📱 Sent {len(batch)} notifications as a digest")
+            if self._finished():
+                return
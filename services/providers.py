@@ -0,0 +1,381 @@
+import os
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import tempfile
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+
+MODES = ("live", "record", "replay")
+
+
+class ProviderFixtureMissing(LookupError):
+    """Replay mode found no recorded response for a request"""
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def request_key(service: str, request: Dict[str, Any]) -> str:
+    """Fixture key: stable hash of a service name and a JSON-serializable request"""
+    payload = json.dumps(dict(request, service=service), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LatencyModel:
+    """
+    Simulated service latency in replay mode, parsed from a spec:
+
+        recorded                the latency measured when the fixture was recorded
+        none                    no delay
+        fixed:S                 S seconds
+        uniform:LOW,HIGH        uniformly distributed
+        normal:MEAN,SD          normally distributed, clipped at 0
+        lognormal:MEDIAN,SIGMA  log-normal (long tail, like real API latency)
+
+    Every delay is multiplied by scale.
+    """
+
+    def __init__(self, spec: str, scale: float = 1.0, rng: Optional[random.Random] = None):
+        self.spec = (spec or "recorded").strip().lower()
+        self.scale = scale
+        self.rng = rng or random.Random()
+        self._lock = threading.Lock()
+        name, _, args = self.spec.partition(":")
+        self.kind = name
+        self.args = [float(arg) for arg in args.split(",") if arg.strip()]
+        expected = {"recorded": 0, "none": 0, "fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if name not in expected or len(self.args) != expected[name]:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+
+    def sample(self, recorded: Optional[float] = None) -> float:
+        """Seconds to wait for one call"""
+        with self._lock:
+            if self.kind == "recorded":
+                delay = recorded or 0.0
+            elif self.kind == "none":
+                delay = 0.0
+            elif self.kind == "fixed":
+                delay = self.args[0]
+            elif self.kind == "uniform":
+                delay = self.rng.uniform(self.args[0], self.args[1])
+            elif self.kind == "normal":
+                delay = self.rng.gauss(self.args[0], self.args[1])
+            else:
+                delay = self.args[0] * math.exp(self.rng.gauss(0.0, self.args[1]))
+        return max(0.0, delay) * self.scale
+
+
+class FixtureStore:
+    """Recorded responses as <root>/<service>/<request key>.json"""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, service: str, key: str) -> str:
+        return os.path.join(self.root, service, f"{key}.json")
+
+    def get(self, service: str, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(service, key), "r", encoding="utf-8") as source:
+                return json.load(source)
+        except FileNotFoundError:
+            return None
+
+    def put(self, service: str, key: str, fixture: Dict[str, Any]):
+        path = self._path(service, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(handle, "w", encoding="utf-8") as out:
+                json.dump(fixture, out, indent=2, default=str)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+class ProviderRouter:
+    """
+    Routes calls to the external AI services (OpenAI, Azure Document
+    Intelligence, Google Vision) according to the mode:
+
+        live    call the service
+        record  call the service and save each response as a fixture
+        replay  answer from the fixtures without network access, after a
+                simulated latency
+
+    Fixtures are keyed by a hash of the request (model, prompt and
+    parameters, or the SHA-256 of the input file), so the same input
+    replays the same response. A replayed request without a fixture raises
+    ProviderFixtureMissing, or with replay_missing="synthetic" gets a
+    deterministic local answer (keyword RFQ classification, line-based item
+    extraction, PyPDF2 text for PDFs) that is enough to drive benchmarks
+    on synthetic input.
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        fixtures_dir: Optional[str] = None,
+        replay_missing: Optional[str] = None,
+        latencies: Optional[Dict[str, str]] = None,
+        latency_scale: Optional[float] = None,
+        seed: Optional[int] = None
+    ):
+        self.mode = (mode or settings.PROVIDER_MODE).lower()
+        if self.mode not in MODES:
+            raise ValueError(f"PROVIDER_MODE must be one of {', '.join(MODES)}, not {self.mode!r}")
+        self.store = FixtureStore(fixtures_dir or settings.PROVIDER_FIXTURES_DIR)
+        self.replay_missing = (replay_missing or settings.PROVIDER_REPLAY_MISSING).lower()
+        rng = random.Random(settings.PROVIDER_SEED if seed is None else seed)
+        scale = settings.PROVIDER_LATENCY_SCALE if latency_scale is None else latency_scale
+        specs = {
+            "openai": settings.PROVIDER_LATENCY_OPENAI,
+            "azure": settings.PROVIDER_LATENCY_AZURE,
+            "vision": settings.PROVIDER_LATENCY_VISION
+        }
+        specs.update(latencies or {})
+        self.latency = {service: LatencyModel(spec, scale, rng) for service, spec in specs.items()}
+        self.replayed = 0
+        self.synthesized = 0
+        self.recorded = 0
+
+    @property
+    def offline(self) -> bool:
+        return self.mode == "replay"
+
+    def call(
+        self,
+        service: str,
+        request: Dict[str, Any],
+        live: Callable[[], Any],
+        synthetic: Optional[Callable[[], Any]] = None
+    ) -> Any:
+        """
+        Make one provider call
+
+        Args:
+            service: "openai", "azure" or "vision"
+            request: JSON-serializable description of the call; its hash is the fixture key
+            live: Makes the real call and returns a JSON-serializable response
+            synthetic: Computes a local response when replay finds no fixture
+
+        Returns:
+            The (live, recorded or synthetic) response
+        """
+        if self.mode == "live":
+            return live()
+
+        key = request_key(service, request)
+        if self.mode == "record":
+            start = time.perf_counter()
+            response = live()
+            self.store.put(service, key, {
+                "service": service,
+                "request": request,
+                "response": response,
+                "latency_seconds": time.perf_counter() - start,
+                "recorded_at": time.time()
+            })
+            self.recorded += 1
+            return response
+
+        fixture = self.store.get(service, key)
+        if fixture is not None:
+            response, recorded_latency = fixture["response"], fixture.get("latency_seconds")
+            self.replayed += 1
+        elif self.replay_missing == "synthetic" and synthetic is not None:
+            response, recorded_latency = synthetic(), None
+            self.synthesized += 1
+        else:
+            raise ProviderFixtureMissing(f"No {service} fixture for request {key[:12]} in {self.store.root}")
+        time.sleep(self.latency[service].sample(recorded_latency))
+        return response
+
+
+_router: Optional[ProviderRouter] = None
+_router_lock = threading.Lock()
+
+
+def provider_router() -> ProviderRouter:
+    """Process-wide router configured from settings"""
+    global _router
+    if _router is None:
+        with _router_lock:
+            if _router is None:
+                _router = ProviderRouter()
+    return _router
+
+
+def set_provider_router(router: Optional[ProviderRouter]):
+    """Replace the process-wide router (None: rebuild it from settings on next use)"""
+    global _router
+    with _router_lock:
+        _router = router
+
+
+# OpenAI chat completions
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _chat_response(response: Dict[str, Any]) -> SimpleNamespace:
+    """OpenAI-shaped response object for a stored chat response"""
+    return SimpleNamespace(
+        model=response.get("model"),
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=response["content"]))],
+        usage=SimpleNamespace(
+            prompt_tokens=response.get("prompt_tokens"),
+            completion_tokens=response.get("completion_tokens"),
+            total_tokens=(response.get("prompt_tokens") or 0) + (response.get("completion_tokens") or 0)
+        )
+    )
+
+
+_RFQ_KEYWORDS = re.compile(r"\b(rfq|request for quotation|quotation|quote|pricing|price list)\b", re.I)
+_ITEM_PATTERNS = [
+    # Table rows as extracted from DOCX/Azure tables and spreadsheets: "name | 5 | description", "name,5,description"
+    re.compile(r"^\s*(?P<name>[^,|\s][^,|]*?)\s*[,|]\s*(?P<qty>\d+)\s*[,|]\s*(?P<desc>.*?)\s*$"),
+    # "- Item name (Qty: 5)"
+    re.compile(r"^\s*[-*•]?\s*(?P<name>[^()]+?)\s*\(Qty:\s*(?P<qty>\d+)\)", re.I),
+    # "5 x Item name", "5 pcs Item name"
+    re.compile(r"^\s*[-*•]?\s*(?P<qty>\d+)\s*(?:x|pcs|nos|units?)\s+(?P<name>.+?)\s*$", re.I),
+    # "Item name - 5 pcs", "Item name: 5"
+    re.compile(r"^\s*[-*•]?\s*(?P<name>[^\s*•-].+?)\s*[-–:|]\s*(?P<qty>\d+)\s*(?:x|pcs|nos|units?)?\s*$", re.I)
+]
+
+
+def synthetic_items(text: str) -> List[Dict[str, Any]]:
+    """Items found in lines that look like "<qty> x <name>" or "<name> (Qty: n)" """
+    items = []
+    lines = text.splitlines()
+    for number, line in enumerate(lines):
+        for pattern in _ITEM_PATTERNS:
+            match = pattern.match(line)
+            if match:
+                description = match.groupdict().get("desc")
+                if description is None:
+                    following = lines[number + 1].strip() if number + 1 < len(lines) else ""
+                    description = following if following and not any(p.match(following) for p in _ITEM_PATTERNS) else ""
+                items.append({
+                    "name": match.group("name").strip(),
+                    "quantity": int(match.group("qty")),
+                    "description": description
+                })
+                break
+    return items
+
+
+def _synthetic_chat(request: Dict[str, Any]) -> Dict[str, Any]:
+    messages = request.get("messages", [])
+    system = " ".join(m["content"] for m in messages if m.get("role") == "system")
+    user = " ".join(m["content"] for m in messages if m.get("role") == "user")
+    if "'True' or 'False'" in system:
+        content = "True" if _RFQ_KEYWORDS.search(user) else "False"
+    else:
+        items = synthetic_items(user)
+        if '"id"' in system:
+            for number, item in enumerate(items, start=1):
+                item["id"] = f"item{number}"
+        content = json.dumps({"items": items})
+    return {
+        "model": request.get("model"),
+        "content": content,
+        "prompt_tokens": _estimate_tokens(system + user),
+        "completion_tokens": _estimate_tokens(content)
+    }
+
+
+class _ProviderCompletions:
+    def __init__(self, client):
+        self._client = client
+
+    def create(self, **request):
+        def live():
+            response = self._client.chat.completions.create(**request)
+            usage = getattr(response, "usage", None)
+            return {
+                "model": response.model,
+                "content": response.choices[0].message.content,
+                "prompt_tokens": getattr(usage, "prompt_tokens", None),
+                "completion_tokens": getattr(usage, "completion_tokens", None)
+            }
+
+        router = provider_router()
+        return _chat_response(router.call("openai", request, live, lambda: _synthetic_chat(request)))
+
+
+class ProviderChatClient:
+    """Stand-in for openai.OpenAI exposing chat.completions.create through the router"""
+
+    def __init__(self, client=None):
+        self.chat = SimpleNamespace(completions=_ProviderCompletions(client))
+
+
+def chat_client(api_key: Optional[str]):
+    """
+    OpenAI client for the current PROVIDER_MODE: the SDK client itself when
+    live, otherwise a client that records or replays completions
+
+    Raises:
+        ValueError: If api_key is missing outside replay mode
+    """
+    router = provider_router()
+    if router.offline:
+        return ProviderChatClient()
+    if not api_key:
+        raise ValueError("Missing OpenAI API Key")
+    import openai
+    client = openai.OpenAI(api_key=api_key)
+    return client if router.mode == "live" else ProviderChatClient(client)
+
+
+# Azure Document Intelligence layout and Google Vision OCR
+
+def _synthetic_layout(pdf_path: str) -> Dict[str, Any]:
+    """Layout-shaped result from the PDF's own text layer (PyPDF2)"""
+    import PyPDF2
+    pages = []
+    with open(pdf_path, "rb") as source:
+        for number, page in enumerate(PyPDF2.PdfReader(source).pages, start=1):
+            lines = [line for line in (page.extract_text() or "").splitlines() if line.strip()]
+            pages.append({"page_number": number, "lines": lines})
+    paragraphs = [{"text": line, "role": "body"} for page in pages for line in page["lines"]]
+    return {"pages": pages, "tables": [], "paragraphs": paragraphs}
+
+
+def layout_request(model_id: str, pdf_path: str) -> Dict[str, Any]:
+    return {"model_id": model_id, "file_sha256": file_sha256(pdf_path)}
+
+
+def vision_request(image_path: str) -> Dict[str, Any]:
+    return {"feature": "text_detection", "file_sha256": file_sha256(image_path)}
+
+
+def analyze_layout(model_id: str, pdf_path: str, live: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+    """Structured Azure layout result for a PDF (see AzureAIPDFReader)"""
+    router = provider_router()
+    if router.mode == "live":
+        return live()
+    return router.call("azure", layout_request(model_id, pdf_path), live, lambda: _synthetic_layout(pdf_path))
+
+
+def detect_text(image_path: str, live: Callable[[], str]) -> str:
+    """OCR text of an image (see DocumentProcessor._extract_image)"""
+    router = provider_router()
+    if router.mode == "live":
+        return live()
+    return router.call("vision", vision_request(image_path), live, lambda: "")
@@ -0,0 +1,111 @@
+import time
+import threading
+from typing import Dict, Optional
+
+
+class TokenBucket:
+    """
+    Token bucket: capacity tokens refilled at rate tokens per second.
+
+    Not thread-safe on its own; RateLimiter serializes access.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float, tokens: float = 1.0) -> float:
+        """Seconds until tokens are available (0 if they are now)"""
+        self._refill(now)
+        if self.tokens >= tokens:
+            return 0.0
+        if self.rate <= 0:
+            return float("inf")
+        return (tokens - self.tokens) / self.rate
+
+    def take(self, tokens: float = 1.0):
+        self.tokens -= tokens
+
+
+class RateLimiter:
+    """
+    A global token bucket combined with one bucket per key (e.g. recipient
+    domain). A send needs a token from both, and takes neither unless both
+    are available, so a slow domain never uses up the global budget.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        key_rate: Optional[float] = None,
+        key_burst: Optional[float] = None,
+        key_overrides: Optional[Dict[str, tuple]] = None,
+        max_keys: int = 10000
+    ):
+        self.global_bucket = TokenBucket(rate, burst)
+        self.key_rate = key_rate
+        self.key_burst = key_burst if key_burst is not None else burst
+        self.key_overrides = {key.lower(): limits for key, limits in (key_overrides or {}).items()}
+        self.max_keys = max_keys
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: str) -> Optional[TokenBucket]:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rate, burst = self.key_overrides.get(key, (self.key_rate, self.key_burst))
+            if rate is None:
+                return None
+            if len(self._buckets) >= self.max_keys:
+                # Forget full (idle) buckets; they would start full again anyway
+                now = time.monotonic()
+                for idle in [k for k, b in self._buckets.items() if b.wait_time(now, b.capacity) == 0]:
+                    del self._buckets[idle]
+            bucket = self._buckets[key] = TokenBucket(rate, burst)
+        return bucket
+
+    def try_acquire(self, key: Optional[str] = None) -> float:
+        """
+        Take one token for key if possible
+
+        Returns:
+            0 if the token was taken, otherwise seconds to wait before retrying
+        """
+        with self._lock:
+            now = time.monotonic()
+            buckets = [self.global_bucket]
+            if key:
+                bucket = self._bucket(key.lower())
+                if bucket is not None:
+                    buckets.append(bucket)
+            wait = max(bucket.wait_time(now) for bucket in buckets)
+            if wait == 0:
+                for bucket in buckets:
+                    bucket.take()
+            return wait
+
+    def acquire(self, key: Optional[str] = None, timeout: Optional[float] = None) -> bool:
+        """
+        Block until a token for key is taken
+
+        Returns:
+            False if that would take longer than timeout seconds
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = self.try_acquire(key)
+            if wait == 0:
+                return True
+            if deadline is not None and time.monotonic() + wait > deadline:
+                return False
+            time.sleep(wait)
@@ -2,6 +2,8 @@ import os
 from azure.core.credentials import AzureKeyCredential
 from azure.ai.formrecognizer import DocumentAnalysisClient
 from dotenv import load_dotenv
+from services.tracing import tracer
+from services.providers import analyze_layout, provider_router
 
 class AzureAIPDFReader:
     def __init__(self, endpoint: str, key: str, model_id="prebuilt-layout"):
@@ -15,7 +17,8 @@ class AzureAIPDFReader:
         self.endpoint = endpoint
         self.key = key
         self.model_id = model_id
-        self.client = DocumentAnalysisClient(
+        # No client (and no credentials) needed when replaying recorded results
+        self.client = None if provider_router().offline else DocumentAnalysisClient(
             endpoint=self.endpoint,
             credential=AzureKeyCredential(self.key)
         )
@@ -31,18 +34,24 @@ class AzureAIPDFReader:
         if not os.path.exists(pdf_path):
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
 
-        try:
-            with open(pdf_path, "rb") as f:
-                poller = self.client.begin_analyze_document(
-                    self.model_id,
-                    document=f
-                )
-                result = poller.result()
+        with tracer.span("azure.extract_text", model_id=self.model_id, file_bytes=os.path.getsize(pdf_path)) as span:
+            try:
+                structured = analyze_layout(self.model_id, pdf_path, lambda: self._analyze(pdf_path))
+                span.set_attributes(page_count=len(structured["pages"]), table_count=len(structured["tables"]))
+                return structured
+            
+            except Exception as e:
+                raise RuntimeError(f"Error processing PDF: {str(e)}")
 
-            return self._structure_result(result)
-        
-        except Exception as e:
-            raise RuntimeError(f"Error processing PDF: {str(e)}")
+    def _analyze(self, pdf_path: str) -> dict:
+        """Run the layout model on a PDF and structure the result"""
+        with open(pdf_path, "rb") as f:
+            poller = self.client.begin_analyze_document(
+                self.model_id,
+                document=f
+            )
+            result = poller.result()
+        return self._structure_result(result)
 
     def _structure_result(self, result) -> dict:
         """Structure the Azure Document Intelligence result into a organized format"""
@@ -0,0 +1,728 @@
+import os
+import json
+import mmap
+import time
+import fcntl
+import struct
+import datetime
+import threading
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Set, Tuple
+import numpy as np
+
+from config import settings
+from models import Vendor, VendorType
+from services.vendor_index import VendorIndex, SubstringIndex, _trigrams
+from services.vendor_scoring import VendorScoringEngine
+from services.geo_index import GeoIndex, PostcodeCentroids, load_postcode_centroids
+
+MAGIC = b"PQVIDX01"
+FORMAT_VERSION = 2
+ALIGNMENT = 64
+# Cell keys pack (row, column) of the geo grid into one int64
+CELL_OFFSET = 1 << 20
+
+
+def _string_array(values: Iterable[str]) -> np.ndarray:
+    """Fixed-width UTF-8 byte strings (byte order equals code point order)"""
+    encoded = [value.encode("utf-8") for value in values]
+    width = max((len(value) for value in encoded), default=1) or 1
+    return np.array(encoded, dtype=f"S{width}") if encoded else np.empty(0, dtype="S1")
+
+
+def _sorted_keys(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Sorted copy of a string array plus the original position of each key"""
+    order = np.argsort(values, kind="stable")
+    return values[order], order.astype(np.int64)
+
+
+def _cell_key(row: np.ndarray, column: np.ndarray) -> np.ndarray:
+    return (row.astype(np.int64) + CELL_OFFSET) * (2 * CELL_OFFSET) + (column.astype(np.int64) + CELL_OFFSET)
+
+
+class StringArray(Sequence):
+    """Read-only sequence of str over a fixed-width byte string array"""
+
+    def __init__(self, values: np.ndarray):
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [value.decode("utf-8") for value in self.values[position]]
+        return self.values[position].decode("utf-8")
+
+    def __iter__(self) -> Iterator[str]:
+        return (value.decode("utf-8") for value in self.values)
+
+
+class SortedStringMap(Mapping):
+    """Read-only str -> int mapping over sorted keys, looked up by binary search"""
+
+    def __init__(self, keys: np.ndarray, values: np.ndarray):
+        self.keys_array = keys
+        self.values = values
+        self.width = keys.dtype.itemsize
+
+    def __len__(self) -> int:
+        return len(self.keys_array)
+
+    def __iter__(self) -> Iterator[str]:
+        return (key.decode("utf-8") for key in self.keys_array)
+
+    def __getitem__(self, key: str) -> int:
+        encoded = key.encode("utf-8")
+        if len(encoded) <= self.width and len(self.keys_array):
+            position = int(np.searchsorted(self.keys_array, encoded))
+            if position < len(self.keys_array) and self.keys_array[position] == encoded:
+                return int(self.values[position])
+        raise KeyError(key)
+
+    def lookup_many(self, keys: List[bytes]) -> np.ndarray:
+        """Values for the encoded keys that exist (missing keys are skipped)"""
+        keys = [key for key in keys if len(key) <= self.width]
+        if not keys or not len(self.keys_array):
+            return np.empty(0, dtype=np.int64)
+        queries = np.array(keys, dtype=self.keys_array.dtype)
+        positions = np.minimum(np.searchsorted(self.keys_array, queries), len(self.keys_array) - 1)
+        found = self.keys_array[positions] == queries
+        return self.values[positions[found]]
+
+
+class MappedSubstringIndex:
+    """
+    Read-only SubstringIndex backed by arrays, with the same containing()
+    and contained_in() results.
+    """
+
+    def __init__(self, strings: np.ndarray, ids: SortedStringMap, trigrams: SortedStringMap,
+                 trigram_indptr: np.ndarray, trigram_indices: np.ndarray, max_length: int):
+        self.strings = StringArray(strings)
+        self.ids = ids
+        self._raw = strings
+        self._trigrams = trigrams
+        self._indptr = trigram_indptr
+        self._indices = trigram_indices
+        self._max_length = max_length
+
+    def __len__(self) -> int:
+        return len(self.strings)
+
+    def containing(self, needle: str) -> Set[int]:
+        needle = needle.lower()
+        if len(needle) < 3:
+            hits = np.char.find(self._raw, needle.encode("utf-8")) >= 0 if len(self._raw) else []
+            return {int(i) for i in np.flatnonzero(hits)}
+
+        postings = []
+        for gram in _trigrams(needle):
+            row = self._trigrams.get(gram)
+            if row is None:
+                return set()
+            postings.append(self._indices[self._indptr[row]:self._indptr[row + 1]])
+        postings.sort(key=len)
+
+        candidates = postings[0]
+        for ids in postings[1:]:
+            candidates = np.intersect1d(candidates, ids, assume_unique=True)
+            if not len(candidates):
+                return set()
+        return {int(i) for i in candidates if needle in self.strings[int(i)]}
+
+    def contained_in(self, text: str) -> Set[int]:
+        text = text.lower()
+        substrings = [
+            text[start:end].encode("utf-8")
+            for start in range(len(text))
+            for end in range(start + 1, min(len(text), start + self._max_length) + 1)
+        ]
+        found = {int(i) for i in self.ids.lookup_many(substrings)}
+        if "" in self.ids:
+            found.add(self.ids[""])
+        return found
+
+
+class MappedPostcodeCentroids(PostcodeCentroids):
+    """Read-only postcode centroids backed by sorted "CC\\tPOSTCODE" keys"""
+
+    def __init__(self, keys: SortedStringMap, coordinates: np.ndarray,
+                 outward: SortedStringMap, outward_coordinates: np.ndarray):
+        super().__init__()
+        self._keys = keys
+        self._coordinates = coordinates
+        self._outward_keys = outward
+        self._outward_coordinates = outward_coordinates
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def add(self, code: str, postcode: str, latitude: float, longitude: float):
+        raise TypeError("Mapped postcode centroids are read-only")
+
+    def _exact(self, code: str, key: str) -> Optional[Tuple[float, float]]:
+        row = self._keys.get(f"{code}\t{key}")
+        return None if row is None else tuple(self._coordinates[row].tolist())
+
+    def _outward_centroid(self, outward: str) -> Optional[Tuple[float, float]]:
+        row = self._outward_keys.get(outward)
+        return None if row is None else tuple(self._outward_coordinates[row].tolist())
+
+
+class MappedGeoIndex(GeoIndex):
+    """Read-only GeoIndex whose vendor locations and grid cells are arrays"""
+
+    def __init__(self, centroids: PostcodeCentroids, cell_degrees: float, vendor_ids: StringArray,
+                 vendor_columns: SortedStringMap, coordinates: np.ndarray,
+                 cell_keys: np.ndarray, cell_indptr: np.ndarray, cell_indices: np.ndarray):
+        super().__init__(centroids, cell_degrees)
+        self.vendor_ids = vendor_ids
+        self.vendor_columns = vendor_columns
+        self.coordinates = coordinates
+        self.cell_keys = cell_keys
+        self.cell_indptr = cell_indptr
+        self.cell_indices = cell_indices
+        self.unlocated = {vendor_ids[int(column)] for column in np.flatnonzero(np.isnan(coordinates[:, 0]))}
+
+    def __len__(self) -> int:
+        return int(len(self.cell_indices))
+
+    def __contains__(self, vendor_id: str) -> bool:
+        column = self.vendor_columns.get(vendor_id)
+        return column is not None and not np.isnan(self.coordinates[column, 0])
+
+    def add_vendor(self, vendor: Vendor) -> bool:
+        raise TypeError("Mapped geo index is read-only")
+
+    def remove_vendor(self, vendor_id: str):
+        raise TypeError("Mapped geo index is read-only")
+
+    def _cell_members(self, cell: Tuple[int, int]) -> Iterable[Tuple[str, Tuple[float, float]]]:
+        key = _cell_key(np.array([cell[0]]), np.array([cell[1]]))[0]
+        position = int(np.searchsorted(self.cell_keys, key))
+        if position >= len(self.cell_keys) or self.cell_keys[position] != key:
+            return ()
+        columns = self.cell_indices[self.cell_indptr[position]:self.cell_indptr[position + 1]]
+        return [(self.vendor_ids[int(c)], tuple(self.coordinates[c].tolist())) for c in columns]
+
+
+class MappedPostings:
+    """Read-only str -> sorted vendor columns mapping (a hash index of VendorSearchIndex)"""
+
+    def __init__(self, keys: SortedStringMap, indptr: np.ndarray, indices: np.ndarray):
+        self.keys = keys
+        self.indptr = indptr
+        self.indices = indices
+
+    def get(self, key: str) -> np.ndarray:
+        row = self.keys.get(key)
+        if row is None:
+            return self.indices[:0]
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+
+class MappedVendorSearchIndex:
+    """
+    Read-only VendorSearchIndex over vendor columns of the index file, with
+    the same filters. Matches are resolved to Vendor objects through the
+    caller's snapshot, so vendors removed since the file was built are left
+    out; vendors added since then are found once the file is rebuilt.
+    """
+
+    def __init__(self, vendor_ids: StringArray, vendor_columns: SortedStringMap, geo: MappedGeoIndex,
+                 by_country: MappedPostings, by_city: MappedPostings, by_zip: MappedPostings,
+                 by_type: MappedPostings, terms: MappedSubstringIndex,
+                 term_indptr: np.ndarray, term_indices: np.ndarray):
+        self.vendor_ids = vendor_ids
+        self.vendor_columns = vendor_columns
+        self.geo = geo
+        self.by_country = by_country
+        self.by_city = by_city
+        self.by_zip = by_zip
+        self.by_type = by_type
+        self.terms = terms
+        self.term_indptr = term_indptr
+        self.term_indices = term_indices
+
+    def __len__(self) -> int:
+        return len(self.vendor_ids)
+
+    def keyword_matches(self, keywords: str) -> np.ndarray:
+        """Columns of vendors with a name, specialization or brand containing any comma-separated keyword"""
+        found = [self.term_indices[:0]]
+        for keyword in {k.strip().lower() for k in keywords.split(',')}:
+            for term_id in self.terms.containing(keyword):
+                found.append(self.term_indices[self.term_indptr[term_id]:self.term_indptr[term_id + 1]])
+        return np.unique(np.concatenate(found))
+
+    def search(
+        self,
+        vendors: Mapping[str, Vendor],
+        keywords: Optional[str] = None,
+        country: Optional[str] = None,
+        city: Optional[str] = None,
+        zip_code: Optional[str] = None,
+        vendor_type: Optional[VendorType] = None,
+        radius_miles: Optional[int] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> Tuple[List[Vendor], int]:
+        """
+        Search vendors (same filters and order as VendorSearchIndex.search)
+
+        Args:
+            vendors: Vendors by ID from the current snapshot
+
+        Returns:
+            Tuple of (page of matching vendors, total number of matches)
+        """
+        # vendor_search and vendor_matcher import this module
+        from services.vendor_search import country_key
+        from services.vendor_matcher import is_within_zip_radius
+
+        # Without filters every vendor of the snapshot matches, in catalog order
+        if not (keywords or country or city or zip_code or vendor_type):
+            end = offset + limit if limit is not None else None
+            return list(islice(vendors.values(), offset, end)), len(vendors)
+
+        filters: List[np.ndarray] = []
+        if vendor_type:
+            filters.append(self.by_type.get(VendorType(vendor_type).value))
+        if country:
+            filters.append(self.by_country.get(country_key(country)))
+        if city:
+            filters.append(self.by_city.get(city.lower()))
+        if zip_code and not radius_miles:
+            filters.append(self.by_zip.get(zip_code))
+        if keywords:
+            filters.append(self.keyword_matches(keywords))
+
+        in_radius = None
+        if zip_code and radius_miles:
+            in_radius = self.geo.within_postcode(country, zip_code, radius_miles)
+            if in_radius is not None:
+                # Only vendors found in the grid or left unlocated by it can be in range
+                nearby = self.vendor_columns.lookup_many([vendor_id.encode("utf-8") for vendor_id in in_radius])
+                filters.append(np.union1d(nearby, np.flatnonzero(np.isnan(self.geo.coordinates[:, 0]))))
+
+        filters.sort(key=len)
+        matches = filters[0] if filters else np.arange(len(self.vendor_ids))
+        for columns in filters[1:]:
+            if not len(matches):
+                break
+            matches = np.intersect1d(matches, columns, assume_unique=True)
+
+        # Columns are in catalog order, as of the snapshot the file was built from
+        found = []
+        for column in matches:
+            vendor = vendors.get(self.vendor_ids[int(column)])
+            if vendor is None:
+                continue
+            if zip_code and radius_miles:
+                # Vendors located by the geo index are checked by distance; the
+                # rest fall back to the postcode heuristic
+                if in_radius is not None and not np.isnan(self.geo.coordinates[column, 0]):
+                    if vendor.id not in in_radius:
+                        continue
+                elif not (vendor.location.zip_code
+                          and is_within_zip_radius(zip_code, vendor.location.zip_code, radius_miles)):
+                    continue
+            found.append(vendor)
+        page = found[offset:offset + limit] if limit is not None else found[offset:]
+        return page, len(found)
+
+
+def _csr_from_lists(postings: List[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(p) for p in postings])
+    indices = np.concatenate(postings).astype(np.int32) if postings else np.empty(0, dtype=np.int32)
+    return indptr, indices
+
+
+def _substring_arrays(prefix: str, index: SubstringIndex) -> Dict[str, np.ndarray]:
+    """Strings of a SubstringIndex (by id) with sorted keys and trigram postings"""
+    arrays: Dict[str, np.ndarray] = {}
+    strings = _string_array(index.strings)
+    arrays[f"{prefix}_strings"] = strings
+    arrays[f"{prefix}_keys"], arrays[f"{prefix}_ids"] = _sorted_keys(strings)
+    grams = sorted(index._trigrams)
+    arrays[f"{prefix}_trigram_keys"], order = _sorted_keys(_string_array(grams))
+    postings = [np.array(sorted(index._trigrams[grams[i]]), dtype=np.int32) for i in order]
+    arrays[f"{prefix}_trigram_rows"] = np.arange(len(grams), dtype=np.int64)
+    arrays[f"{prefix}_trigram_indptr"], arrays[f"{prefix}_trigram_indices"] = _csr_from_lists(postings)
+    return arrays
+
+
+def _mapped_substring_index(a: Dict[str, np.ndarray], prefix: str, max_length: int) -> MappedSubstringIndex:
+    return MappedSubstringIndex(
+        a[f"{prefix}_strings"],
+        SortedStringMap(a[f"{prefix}_keys"], a[f"{prefix}_ids"]),
+        SortedStringMap(a[f"{prefix}_trigram_keys"], a[f"{prefix}_trigram_rows"]),
+        a[f"{prefix}_trigram_indptr"], a[f"{prefix}_trigram_indices"], max_length
+    )
+
+
+def _postings_arrays(prefix: str, postings: Mapping[Any, Set[str]], column: Dict[str, int]) -> Dict[str, np.ndarray]:
+    """Key -> vendor ids postings as sorted keys plus sorted vendor columns"""
+    keys = [str(getattr(key, "value", key)) for key in postings]
+    arrays: Dict[str, np.ndarray] = {}
+    arrays[f"{prefix}_keys"], order = _sorted_keys(_string_array(keys))
+    arrays[f"{prefix}_rows"] = np.arange(len(keys), dtype=np.int64)
+    lists = list(postings.values())
+    arrays[f"{prefix}_indptr"], arrays[f"{prefix}_indices"] = _csr_from_lists(
+        [np.array(sorted(column[vendor_id] for vendor_id in lists[i]), dtype=np.int32) for i in order]
+    )
+    return arrays
+
+
+def _mapped_postings(a: Dict[str, np.ndarray], prefix: str) -> MappedPostings:
+    return MappedPostings(
+        SortedStringMap(a[f"{prefix}_keys"], a[f"{prefix}_rows"]), a[f"{prefix}_indptr"], a[f"{prefix}_indices"]
+    )
+
+
+def build_index_arrays(vendors: Sequence[Vendor], centroids: PostcodeCentroids,
+                       cell_degrees: float = 0.5) -> Tuple[Dict[str, np.ndarray], Dict[str, Any]]:
+    """
+    Flatten the match engine, search index, geo index and postcode centroids into arrays
+
+    Returns:
+        Tuple of (named arrays, metadata)
+    """
+    from services.vendor_search import VendorSearchIndex
+
+    index = VendorIndex(vendors)
+    engine = VendorScoringEngine.from_index(index)
+    specializations = index.specializations
+    arrays: Dict[str, np.ndarray] = {}
+
+    vendor_ids = _string_array(engine.vendor_ids)
+    arrays["vendor_ids"] = vendor_ids
+    arrays["vendor_id_keys"], arrays["vendor_id_columns"] = _sorted_keys(vendor_ids)
+    arrays["performance"] = engine.performance
+
+    brands = _string_array(list(engine.brand_ids))
+    arrays["brand_keys"], order = _sorted_keys(brands)
+    arrays["brand_values"] = np.array([engine.brand_ids[b] for b in list(engine.brand_ids)], dtype=np.int64)[order]
+    arrays["brand_indptr"], arrays["brand_indices"] = engine.brand_indptr, engine.brand_indices
+    arrays["spec_indptr"], arrays["spec_indices"] = engine.spec_indptr, engine.spec_indices
+
+    arrays.update(_substring_arrays("spec", specializations))
+
+    # Search postings by engine column; columns follow catalog order like the search index
+    search = VendorSearchIndex(vendors)
+    column = {vendor_id: i for i, vendor_id in enumerate(engine.vendor_ids)}
+    arrays.update(_postings_arrays("country", search.by_country, column))
+    arrays.update(_postings_arrays("city", search.by_city, column))
+    arrays.update(_postings_arrays("zip", search.by_zip, column))
+    arrays.update(_postings_arrays("type", search.by_type, column))
+    arrays.update(_substring_arrays("term", search.terms))
+    arrays["term_postings_indptr"], arrays["term_postings_indices"] = _csr_from_lists([
+        np.array(sorted(column[vendor_id] for vendor_id in search.term_vendors[term_id]), dtype=np.int32)
+        for term_id in range(len(search.terms.strings))
+    ])
+
+    # Vendor locations by engine column (NaN when the postcode is unknown)
+    geo = GeoIndex(centroids, cell_degrees)
+    coordinates = np.full((len(engine.vendor_ids), 2), np.nan)
+    for column, vendor_id in enumerate(engine.vendor_ids):
+        if geo.add_vendor(index.vendors[vendor_id]):
+            coordinates[column] = geo.locations[vendor_id]
+    arrays["coordinates"] = coordinates
+    located = np.flatnonzero(~np.isnan(coordinates[:, 0]))
+    keys = _cell_key(np.floor(coordinates[located, 0] / cell_degrees), np.floor(coordinates[located, 1] / cell_degrees))
+    order = np.argsort(keys, kind="stable")
+    cell_keys, starts = np.unique(keys[order], return_index=True)
+    arrays["cell_keys"] = cell_keys
+    arrays["cell_indptr"] = np.append(starts, len(order)).astype(np.int64)
+    arrays["cell_indices"] = located[order].astype(np.int32)
+
+    # Postcode centroids, so the search origin can be resolved without loading the dump
+    postcode_keys = _string_array(f"{code}\t{key}" for code, key in centroids.centroids)
+    arrays["postcode_keys"], order = _sorted_keys(postcode_keys)
+    arrays["postcode_rows"] = np.arange(len(order), dtype=np.int64)
+    arrays["postcode_coordinates"] = np.array(list(centroids.centroids.values()), dtype=np.float64).reshape(-1, 2)[order]
+    outward_keys = _string_array(centroids._outward)
+    arrays["outward_keys"], order = _sorted_keys(outward_keys)
+    arrays["outward_rows"] = np.arange(len(order), dtype=np.int64)
+    arrays["outward_coordinates"] = np.array(
+        [(lat / n, lon / n) for lat, lon, n in centroids._outward.values()], dtype=np.float64
+    ).reshape(-1, 2)[order]
+
+    meta = {"max_length": specializations._max_length, "term_max_length": search.terms._max_length,
+            "cell_degrees": cell_degrees, "vendors": len(vendors)}
+    return arrays, meta
+
+
+def write_index_file(path: str, arrays: Dict[str, np.ndarray], meta: Dict[str, Any]):
+    """
+    Write arrays to path atomically: a temporary file is written, fsynced
+    and renamed over the old one, so readers see either file in full.
+
+    Layout: MAGIC, header length (uint64), JSON header, then each array's
+    raw bytes aligned to ALIGNMENT.
+    """
+    specs, offset = {}, 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        offset = -(-offset // ALIGNMENT) * ALIGNMENT
+        specs[name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+        offset += array.nbytes
+    header = json.dumps({"format": FORMAT_VERSION, "meta": meta, "arrays": specs}).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp-{os.getpid()}"
+    with open(temp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, array in arrays.items():
+            f.seek(data_start + specs[name]["offset"])
+            f.write(array.tobytes())
+        # Empty arrays at the end still need their aligned offset inside the file
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class SharedVendorIndex:
+    """
+    Vendor match engine, search index, geo index and postcode centroids
+    mapped read-only from an index file. Every process that maps the same file shares its
+    pages through the OS page cache.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a vendor index file")
+        (header_length,) = struct.unpack("<Q", self._map[len(MAGIC):len(MAGIC) + 8])
+        header = json.loads(self._map[len(MAGIC) + 8:len(MAGIC) + 8 + header_length])
+        if header["format"] != FORMAT_VERSION:
+            raise ValueError(f"{path} has index format {header['format']}, expected {FORMAT_VERSION}")
+        data_start = -(-(len(MAGIC) + 8 + header_length) // ALIGNMENT) * ALIGNMENT
+
+        self.path = path
+        self.meta = header["meta"]
+        a = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+            a[name] = np.frombuffer(self._map, dtype=dtype, count=count,
+                                    offset=data_start + spec["offset"]).reshape(spec["shape"])
+
+        vendor_ids = StringArray(a["vendor_ids"])
+        vendor_columns = SortedStringMap(a["vendor_id_keys"], a["vendor_id_columns"])
+        specializations = _mapped_substring_index(a, "spec", self.meta["max_length"])
+        self.engine = VendorScoringEngine(
+            vendor_ids=vendor_ids,
+            performance=a["performance"],
+            brand_ids=SortedStringMap(a["brand_keys"], a["brand_values"]),
+            brand_indptr=a["brand_indptr"],
+            brand_indices=a["brand_indices"],
+            specializations=specializations,
+            spec_indptr=a["spec_indptr"],
+            spec_indices=a["spec_indices"]
+        )
+        self.centroids = MappedPostcodeCentroids(
+            SortedStringMap(a["postcode_keys"], a["postcode_rows"]), a["postcode_coordinates"],
+            SortedStringMap(a["outward_keys"], a["outward_rows"]), a["outward_coordinates"]
+        )
+        self.geo = MappedGeoIndex(
+            self.centroids, self.meta["cell_degrees"], vendor_ids, vendor_columns,
+            a["coordinates"], a["cell_keys"], a["cell_indptr"], a["cell_indices"]
+        )
+        self.search = MappedVendorSearchIndex(
+            vendor_ids, vendor_columns, self.geo,
+            _mapped_postings(a, "country"), _mapped_postings(a, "city"),
+            _mapped_postings(a, "zip"), _mapped_postings(a, "type"),
+            _mapped_substring_index(a, "term", self.meta["term_max_length"]),
+            a["term_postings_indptr"], a["term_postings_indices"]
+        )
+
+    def __len__(self) -> int:
+        return len(self.engine)
+
+    @property
+    def watermark(self) -> Optional[datetime.datetime]:
+        """Watermark of the vendor snapshot the file was built from"""
+        built = self.meta.get("watermark")
+        return datetime.datetime.fromisoformat(built) if built else None
+
+    def is_current(self, watermark: Optional[datetime.datetime], count: int) -> bool:
+        """True if the file was built from a vendor snapshot with this watermark and count"""
+        return self.meta.get("watermark") == (watermark.isoformat() if watermark else None) \
+            and self.meta.get("count") == count
+
+    def is_newer(self, watermark: Optional[datetime.datetime]) -> bool:
+        """True if the file was built from a later vendor snapshot than one with this watermark"""
+        return self.watermark is not None and watermark is not None and self.watermark > watermark
+
+
+_shared: Optional[SharedVendorIndex] = None
+_shared_stat: Optional[Tuple[int, int, int]] = None
+_checked_at = 0.0
+_rebuild_lock = threading.Lock()
+_rebuilding = False
+
+
+def shared_vendor_index() -> Optional[SharedVendorIndex]:
+    """
+    The mapped index at settings.VENDOR_INDEX_PATH, or None if disabled or not built yet
+
+    The file is re-checked every VENDOR_INDEX_CHECK_SECONDS; after a rebuild
+    the new file is mapped and the old mapping is released once its last
+    user drops it.
+    """
+    global _shared, _shared_stat, _checked_at
+    path = settings.VENDOR_INDEX_PATH
+    if not path:
+        return None
+    now = time.monotonic()
+    if _shared is not None and now - _checked_at < settings.VENDOR_INDEX_CHECK_SECONDS:
+        return _shared
+    _checked_at = now
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return _shared
+    key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    if key != _shared_stat:
+        try:
+            _shared = SharedVendorIndex(path)
+        except ValueError as e:
+            # A file from an older release is rebuilt like a missing one
+            print(f"⚠️ Ignoring shared vendor index: {e}")
+            return _shared
+        _shared_stat = key
+    return _shared
+
+
+def build_shared_index(path: str, vendors: Sequence[Vendor], watermark: Optional[datetime.datetime],
+                       centroids: Optional[PostcodeCentroids] = None):
+    """
+    Build the index file for a vendor snapshot
+
+    The postcode centroids are loaded for the build only (unless given), so
+    the process that builds the file does not keep the dump in memory.
+    """
+    started = time.perf_counter()
+    arrays, meta = build_index_arrays(vendors, centroids if centroids is not None else load_postcode_centroids())
+    meta.update({
+        "watermark": watermark.isoformat() if watermark else None,
+        "count": len(vendors),
+        "built_at": datetime.datetime.utcnow().isoformat()
+    })
+    write_index_file(path, arrays, meta)
+    print(f"✅ Built shared vendor index for {len(vendors)} vendors in {time.perf_counter() - started:.2f}s: {path}")
+
+
+def ensure_shared_index(snapshot, wait: bool = False) -> Optional[SharedVendorIndex]:
+    """
+    Make sure the shared index file matches a vendor snapshot
+
+    Only one process rebuilds at a time (an exclusive lock file); others keep
+    using the current file until the new one is swapped in. A file built from
+    a later snapshot is left alone.
+
+    Args:
+        snapshot: VendorSnapshot from the vendor repository
+        wait: Wait for another process's rebuild instead of returning at once
+
+    Returns:
+        The mapped index, or None if shared indexes are disabled or the file
+        is not built yet
+    """
+    global _checked_at
+    path = settings.VENDOR_INDEX_PATH
+    if not path:
+        return None
+    current = shared_vendor_index()
+    if current is not None and (current.is_current(snapshot.watermark, len(snapshot))
+                                or current.is_newer(snapshot.watermark)):
+        return current
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX if wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return current
+        # Another process may have finished a rebuild while we waited
+        _checked_at = 0.0
+        current = shared_vendor_index()
+        if current is None or not (current.is_current(snapshot.watermark, len(snapshot))
+                                   or current.is_newer(snapshot.watermark)):
+            build_shared_index(path, snapshot.vendors, snapshot.watermark)
+            _checked_at = 0.0
+            current = shared_vendor_index()
+    return current
+
+
+def refresh_shared_index(snapshot):
+    """
+    Bring the shared index file up to date with a vendor snapshot in a
+    background thread, so requests never wait for a rebuild
+
+    At most one rebuild runs per process; it waits for a rebuild in another
+    process rather than giving up. Until the new file is swapped in, callers
+    keep using the previous one (see serving_shared_index).
+
+    Args:
+        snapshot: VendorSnapshot from the vendor repository
+    """
+    global _rebuilding
+    if not settings.VENDOR_INDEX_PATH or current_shared_index(snapshot) is not None:
+        return
+    with _rebuild_lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+
+    def rebuild():
+        global _rebuilding
+        try:
+            ensure_shared_index(snapshot, wait=True)
+        except Exception as e:
+            print(f"⚠️ Could not build the shared vendor index: {e}")
+        finally:
+            with _rebuild_lock:
+                _rebuilding = False
+
+    threading.Thread(target=rebuild, name="shared-vendor-index", daemon=True).start()
+
+
+def current_shared_index(snapshot) -> Optional[SharedVendorIndex]:
+    """
+    The mapped index if it was built from exactly this vendor snapshot, else None
+
+    Args:
+        snapshot: VendorSnapshot from the vendor repository
+    """
+    shared = shared_vendor_index()
+    if shared is not None and shared.is_current(snapshot.watermark, len(snapshot)):
+        return shared
+    return None
+
+
+def serving_shared_index(snapshot) -> Optional[SharedVendorIndex]:
+    """
+    The mapped index to serve a request from, or None if shared indexes are disabled
+
+    This is the last mapped file, even if it was built from an older vendor
+    snapshot (refresh_shared_index swaps in a new one). Before any file
+    exists the caller waits for the first build.
+
+    Args:
+        snapshot: VendorSnapshot from the vendor repository
+    """
+    if not settings.VENDOR_INDEX_PATH:
+        return None
+    shared = shared_vendor_index()
+    return shared if shared is not None else ensure_shared_index(snapshot, wait=True)
@@ -0,0 +1,210 @@
+import ssl
+import time
+import asyncio
+import smtplib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from email.message import Message
+from typing import Deque, Dict, Optional, Sequence, Tuple
+
+from config import settings
+
+# Errors after which a pooled connection is dropped and the message retried
+# once on a new connection
+_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, ConnectionError, TimeoutError)
+
+
+class SmtpPool:
+    """
+    Pool of connected, authenticated SMTP connections to one server.
+
+    At most size connections exist at a time; callers beyond that wait for
+    a free one. A connection idle for longer than health_check_seconds is
+    checked with NOOP before reuse and replaced if the server dropped it.
+    A send that fails because the connection died is retried once on a
+    new connection.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int = 587,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = True,
+        size: int = 4,
+        timeout: float = 30,
+        health_check_seconds: float = 30
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.size = size
+        self.timeout = timeout
+        self.health_check_seconds = health_check_seconds
+        self._idle: Deque[Tuple[smtplib.SMTP, float]] = deque()
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.use_tls:
+                server.starttls(context=ssl.create_default_context())
+                server.ehlo()
+            if self.username:
+                server.login(self.username, self.password or "")
+        except Exception:
+            self._close(server)
+            raise
+        self.connections_opened += 1
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    @staticmethod
+    def _healthy(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _take_idle(self) -> Optional[smtplib.SMTP]:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    return None
+                server, last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.health_check_seconds or self._healthy(server):
+                return server
+            self._close(server)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection, waiting while size connections are in use"""
+        self._slots.acquire()
+        server = None
+        try:
+            server = self._take_idle() or self._connect()
+            yield server
+        except _CONNECTION_ERRORS:
+            if server is not None:
+                self._close(server)
+                server = None
+            raise
+        except smtplib.SMTPException:
+            # The server refused this message; the session itself can be reused
+            if server is not None:
+                try:
+                    server.rset()
+                except Exception:
+                    self._close(server)
+                    server = None
+            raise
+        except Exception:
+            if server is not None:
+                self._close(server)
+                server = None
+            raise
+        finally:
+            if server is not None:
+                with self._lock:
+                    self._idle.append((server, time.monotonic()))
+            self._slots.release()
+
+    def send(self, message: Message, from_addr: Optional[str] = None, to_addrs: Optional[Sequence[str]] = None):
+        """Send a message over a pooled connection (blocking)"""
+        for attempt in range(2):
+            try:
+                with self.connection() as server:
+                    server.send_message(message, from_addr, to_addrs)
+                return
+            except _CONNECTION_ERRORS:
+                if attempt:
+                    raise
+
+    def close(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle, self._idle = list(self._idle), deque()
+        for server, _ in idle:
+            self._close(server)
+
+
+class SmtpTransport:
+    """
+    Sends messages from async code through per-server SMTP pools.
+
+    Each server gets its own thread pool with one thread per connection, so
+    blocking smtplib calls never run on the event loop and a server never
+    sees more than its pool size of concurrent sessions.
+    """
+
+    def __init__(self):
+        self._pools: Dict[str, SmtpPool] = {}
+        self._executors: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def add_server(self, pool: SmtpPool, name: str = "default"):
+        with self._lock:
+            self._pools[name] = pool
+            self._executors[name] = ThreadPoolExecutor(max_workers=pool.size, thread_name_prefix=f"smtp-{name}")
+
+    def pool(self, name: str = "default") -> SmtpPool:
+        return self._pools[name]
+
+    def send_sync(self, message: Message, server: str = "default"):
+        """Send from a worker thread or script"""
+        self._pools[server].send(message)
+
+    async def send(self, message: Message, server: str = "default"):
+        """Send without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executors[server], self._pools[server].send, message)
+
+    def close(self):
+        with self._lock:
+            for executor in self._executors.values():
+                executor.shutdown(wait=True)
+            for pool in self._pools.values():
+                pool.close()
+            self._pools.clear()
+            self._executors.clear()
+
+
+_transport: Optional[SmtpTransport] = None
+_transport_lock = threading.Lock()
+
+
+def smtp_transport() -> Optional[SmtpTransport]:
+    """Process-wide transport for the configured SMTP server, or None if SMTP_HOST is not set"""
+    global _transport
+    if not settings.SMTP_HOST:
+        return None
+    if _transport is None:
+        with _transport_lock:
+            if _transport is None:
+                transport = SmtpTransport()
+                transport.add_server(SmtpPool(
+                    settings.SMTP_HOST,
+                    settings.SMTP_PORT,
+                    settings.SMTP_USERNAME,
+                    settings.SMTP_PASSWORD,
+                    use_tls=settings.SMTP_USE_TLS,
+                    size=settings.SMTP_POOL_SIZE,
+                    timeout=settings.SMTP_TIMEOUT_SECONDS,
+                    health_check_seconds=settings.SMTP_HEALTH_CHECK_SECONDS
+                ))
+                _transport = transport
+    return _transport
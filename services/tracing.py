@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import uuid
+import random
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from config import settings
+
+# Spans kept per trace; a runaway loop must not hold the whole trace in memory
+_MAX_SPANS_PER_TRACE = 1000
+
+
+class Span:
+    """One timed operation in a trace. Attributes are plain JSON values."""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "start", "end", "attributes", "error")
+
+    def __init__(self, trace: "_Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attributes = dict(attributes)
+        self.error: Optional[str] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "duration_ms": round(self.duration * 1000, 3),
+            "attributes": self.attributes,
+            "error": self.error
+        }
+
+
+class _Trace:
+    __slots__ = ("trace_id", "spans", "dropped")
+
+    def __init__(self):
+        self.trace_id = uuid.uuid4().hex
+        self.spans: List[Span] = []
+        self.dropped = 0
+
+
+class JsonlExporter:
+    """
+    Appends finished traces, one JSON object per line, to path. The file is
+    rotated like logging.handlers.RotatingFileHandler: when it would grow past
+    max_bytes it becomes path.1, path.1 becomes path.2 and so on, and the
+    oldest beyond backup_count is deleted.
+    """
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self._lock = threading.Lock()
+
+    def _rotate(self):
+        for number in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{number}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{number + 1}")
+        if self.backup_count:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def export(self, record: Dict[str, Any]):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = 0
+            if size and size + len(line) > self.max_bytes:
+                self._rotate()
+            with open(self.path, "a", encoding="utf-8") as out:
+                out.write(line)
+
+    def find(self, rfq_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Most recent exported traces for an RFQ, newest first"""
+        needle = json.dumps(rfq_id)
+        found: List[Dict[str, Any]] = []
+        for path in [self.path] + [f"{self.path}.{n}" for n in range(1, self.backup_count + 1)]:
+            try:
+                with open(path, "r", encoding="utf-8") as source:
+                    lines = source.readlines()
+            except OSError:
+                continue
+            for line in reversed(lines):
+                # Cheap substring test before parsing the line
+                if needle not in line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if record.get("rfq_id") == rfq_id:
+                    found.append(record)
+                    if len(found) >= limit:
+                        return found
+        return found
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("current_span", default=None)
+
+
+class Tracer:
+    """
+    Creates spans and exports finished traces.
+
+    The current span is tracked in a context variable, so nested spans (also
+    across await) become children of the enclosing one. A trace is exported
+    when its root span ends. Sampling happens then, so the decision can look
+    at the whole trace: every trace slower than slow_seconds or with an
+    error is kept, and sample_rate of the rest. Spans record an rfq_id
+    attribute where the RFQ is known, and the exported trace is tagged with
+    it for lookup by RFQ.
+    """
+
+    def __init__(
+        self,
+        exporter: Optional[JsonlExporter] = None,
+        sample_rate: Optional[float] = None,
+        slow_seconds: Optional[float] = None
+    ):
+        self.exporter = exporter
+        self.sample_rate = settings.TRACE_SAMPLE_RATE if sample_rate is None else sample_rate
+        self.slow_seconds = settings.TRACE_SLOW_SECONDS if slow_seconds is None else slow_seconds
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """
+        Time the with block as a span, a child of the current span if any
+
+        Args:
+            name: Operation name (e.g. "llm.extract")
+            **attributes: Initial attributes; more can be set on the yielded span
+        """
+        parent = _current.get()
+        trace = parent.trace if parent is not None else _Trace()
+        span = Span(trace, name, parent.span_id if parent is not None else None, attributes)
+        token = _current.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            span.end = time.time()
+            _current.reset(token)
+            if len(trace.spans) < _MAX_SPANS_PER_TRACE:
+                trace.spans.append(span)
+            else:
+                trace.dropped += 1
+            if parent is None:
+                self._finish(span)
+
+    def _finish(self, root: Span):
+        if self.exporter is None:
+            return
+        errors = any(span.error for span in root.trace.spans)
+        if not (errors or root.duration >= self.slow_seconds or random.random() < self.sample_rate):
+            return
+        spans = sorted(root.trace.spans, key=lambda span: span.start)
+        rfq_id = next((span.attributes["rfq_id"] for span in spans if span.attributes.get("rfq_id")), None)
+        try:
+            self.exporter.export({
+                "trace_id": root.trace_id,
+                "rfq_id": rfq_id,
+                "name": root.name,
+                "start": root.start,
+                "duration_ms": round(root.duration * 1000, 3),
+                "error": errors,
+                "dropped_spans": root.trace.dropped,
+                "spans": [span.to_dict() for span in spans]
+            })
+        except Exception as e:
+            print(f"⚠️ Trace export failed: {str(e)}")
+
+    def find(self, rfq_id: str, limit: int = 20) -> List[Dict[str, Any]]:
+        return self.exporter.find(rfq_id, limit) if self.exporter is not None else []
+
+
+def current_span() -> Optional[Span]:
+    """The innermost active span, or None outside any span"""
+    return _current.get()
+
+
+def set_attributes(**attributes):
+    """Set attributes on the current span (no-op outside a span)"""
+    span = _current.get()
+    if span is not None:
+        span.attributes.update(attributes)
+
+
+def record_llm_attributes(span: Span, response):
+    """Token usage of an OpenAI chat completion response as span attributes"""
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        span.set_attribute("prompt_tokens", getattr(usage, "prompt_tokens", None))
+        span.set_attribute("completion_tokens", getattr(usage, "completion_tokens", None))
+
+
+tracer = Tracer(
+    JsonlExporter(settings.TRACE_EXPORT_PATH, settings.TRACE_MAX_BYTES, settings.TRACE_BACKUP_COUNT)
+    if settings.TRACE_EXPORT_PATH else None
+)
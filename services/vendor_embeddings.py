@@ -0,0 +1,314 @@
+import re
+from collections import OrderedDict
+from typing import List, Dict, Tuple, Optional
+import numpy as np
+from models import Vendor, ItemDetail
+
+# Short descriptions of common procurement categories. Each one becomes an
+# embedding axis (never a match), so item nouns land near the category
+# names vendors use, e.g. "laptop" near "IT equipment".
+CATEGORY_GLOSSARY = [
+    "it equipment computers laptop notebook desktop workstation server monitor keyboard mouse printer scanner",
+    "it equipment networking router switch firewall access point modem network cable patch panel rack",
+    "electronics electronic components resistor capacitor transistor diode inductor ic chip microcontroller",
+    "pcb assembly printed circuit board smt soldering electronic components prototype",
+    "electrical cable wire connector terminal breaker fuse switchgear transformer",
+    "mechanical components bearing gear shaft coupling spring bolt nut screw washer fastener",
+    "industrial equipment machinery parts motor pump valve compressor gearbox hydraulic pneumatic cylinder",
+    "industrial supplies consumables gloves helmet goggles safety shoes ppe tape adhesive lubricant",
+    "tools industrial supplies drill grinder wrench hammer spanner saw cutter",
+    "automation industrial electronics sensor plc relay contactor drive inverter hmi encoder",
+    "office supplies furniture chair desk paper stationery toner cartridge",
+    "laboratory chemicals reagent glassware beaker pipette solvent",
+    "packaging materials carton box pallet stretch film label",
+    "raw materials steel aluminium copper plastic sheet pipe tube rod",
+]
+
+# Scale of the glossary axes against the LSA axes. Item and vendor texts
+# are short, so without it shared character n-grams ("server" and
+# "OEM Services") outweigh the category a word belongs to.
+CONCEPT_WEIGHT = 3.0
+
+# Weight of a vendor's brands against its specializations in the vendor
+# embedding. Brands are already matched exactly by VendorIndex; their
+# n-grams say little about what a vendor supplies.
+BRAND_WEIGHT = 0.25
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace; used as the embedding cache key"""
+    return " ".join(text.lower().split())
+
+
+def _features(text: str) -> List[str]:
+    """Word tokens plus character 3-5 grams of each word (with boundary markers)"""
+    features = []
+    for word in _WORD.findall(text.lower()):
+        features.append("w:" + word)
+        padded = f" {word} "
+        for n in (3, 4, 5):
+            features.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return features
+
+
+def vendor_terms(vendor: Vendor) -> List[Tuple[str, float]]:
+    """Normalized specializations and brands that describe a vendor, with their weights"""
+    return [(normalize_text(term), 1.0) for term in vendor.specializations] + \
+        [(normalize_text(term), BRAND_WEIGHT) for term in vendor.brands_carried]
+
+
+def item_query(item: ItemDetail) -> str:
+    """Text embedded for an item: name, type and brand"""
+    parts = [item.name or "", getattr(item, "type", None) or "", getattr(item, "brand", None) or ""]
+    return normalize_text(" ".join(parts))
+
+
+class TfidfLsa:
+    """
+    Character n-gram TF-IDF followed by a truncated SVD (latent semantic
+    analysis), fitted locally with NumPy, optionally extended with fixed
+    concept axes.
+
+    The SVD is computed with a randomized range finder directly on the
+    sparse CSR matrix, so the dense documents x features matrix is never
+    built.
+    """
+
+    def __init__(self, dimensions: int = 64, seed: int = 13):
+        self.dimensions = dimensions
+        self.seed = seed
+        self.vocabulary: Dict[str, int] = {}
+        self.idf = np.empty(0)
+        self.components = np.empty((0, 0))
+
+    def _vectorize(self, texts: List[str], grow: bool = False):
+        """TF-IDF rows as CSR arrays (data, indices, indptr), L2-normalized"""
+        data, indices, indptr = [], [], [0]
+        for text in texts:
+            counts: Dict[int, int] = {}
+            for feature in _features(text):
+                column = self.vocabulary.get(feature)
+                if column is None:
+                    if not grow:
+                        continue
+                    column = self.vocabulary[feature] = len(self.vocabulary)
+                counts[column] = counts.get(column, 0) + 1
+            indices.extend(counts)
+            data.extend(counts.values())
+            indptr.append(len(indices))
+
+        data = np.array(data, dtype=np.float64)
+        indices = np.array(indices, dtype=np.int64)
+        indptr = np.array(indptr, dtype=np.int64)
+        if len(self.idf) == len(self.vocabulary):
+            data = (1 + np.log(np.maximum(data, 1))) * self.idf[indices]
+        rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        norms = np.sqrt(np.bincount(rows, weights=data ** 2, minlength=len(texts)))
+        norms[norms == 0] = 1.0
+        return data / norms[rows], indices, indptr
+
+    @staticmethod
+    def _product(keys: np.ndarray, data: np.ndarray, gather: np.ndarray, dense: np.ndarray, size: int) -> np.ndarray:
+        """
+        result[key] += data * dense[gather] for every nonzero, one column at a
+        time so no nonzeros x columns temporary is built
+        """
+        result = np.empty((size, dense.shape[1]))
+        for column in range(dense.shape[1]):
+            result[:, column] = np.bincount(keys, weights=data * dense[gather, column], minlength=size)
+        return result
+
+    def _matmul(self, csr, dense: np.ndarray) -> np.ndarray:
+        """CSR matrix times dense matrix"""
+        data, indices, indptr = csr
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        return self._product(rows, data, indices, dense, len(indptr) - 1)
+
+    def _rmatmul(self, csr, dense: np.ndarray) -> np.ndarray:
+        """Transposed CSR matrix times dense matrix"""
+        data, indices, indptr = csr
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        return self._product(indices, data, rows, dense, len(self.vocabulary))
+
+    def fit(self, texts: List[str], concepts: List[str] = (), concept_weight: float = 1.0) -> "TfidfLsa":
+        """
+        Learn the vocabulary, IDF weights and embedding axes from a corpus
+
+        Args:
+            texts: Documents to learn latent dimensions from
+            concepts: Short descriptive texts that become fixed extra axes
+                (similarity to each concept), bridging words that never
+                co-occur in texts
+            concept_weight: Scale of the concept axes against the LSA axes
+        """
+        corpus = list(texts) + list(concepts)
+        self.vocabulary = {}
+        self.idf = np.empty(0)
+        _, indices, _ = self._vectorize(corpus, grow=True)
+
+        document_frequency = np.bincount(indices, minlength=len(self.vocabulary))
+        self.idf = np.log((1 + len(corpus)) / (1 + document_frequency)) + 1
+        csr = self._vectorize(corpus)
+
+        # Randomized SVD: sample the range of A, orthonormalize, then take
+        # the exact SVD of the small projected matrix
+        rank = max(1, min(self.dimensions, len(corpus) // 2, len(self.vocabulary)))
+        rng = np.random.default_rng(self.seed)
+        sample = self._matmul(csr, rng.standard_normal((len(self.vocabulary), rank + 10)))
+        for _ in range(2):
+            sample, _ = np.linalg.qr(sample)
+            sample = self._matmul(csr, self._rmatmul(csr, sample))
+        basis, _ = np.linalg.qr(sample)
+        projected = self._rmatmul(csr, basis).T
+        _, _, vt = np.linalg.svd(projected, full_matrices=False)
+        axes = [vt[:rank].T]
+
+        if concepts:
+            data, indices, indptr = self._vectorize(list(concepts))
+            concept_axes = np.zeros((len(self.vocabulary), len(concepts)))
+            concept_axes[indices, np.repeat(np.arange(len(concepts)), np.diff(indptr))] = data * concept_weight
+            axes.append(concept_axes)
+
+        self.components = np.hstack(axes).astype(np.float32)
+        return self
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        """Embed texts as L2-normalized rows (unseen n-grams are ignored)"""
+        embeddings = self._matmul(self._vectorize(texts), self.components).astype(np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
+
+class IvfIndex:
+    """
+    Inverted-file approximate nearest-neighbour index for unit vectors.
+
+    Vectors are clustered with spherical k-means; a query is compared only
+    with the members of the nprobe clusters whose centroids are closest.
+    """
+
+    def __init__(self, vectors: np.ndarray, nlist: Optional[int] = None, iterations: int = 10, seed: int = 13):
+        self.vectors = vectors
+        count = len(vectors)
+        nlist = nlist or max(1, int(np.sqrt(count)))
+        nlist = min(nlist, count) if count else 1
+
+        rng = np.random.default_rng(seed)
+        if count:
+            centroids = vectors[rng.choice(count, nlist, replace=False)]
+            for _ in range(iterations):
+                assignment = np.argmax(vectors @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, vectors)
+                norms = np.linalg.norm(sums, axis=1, keepdims=True)
+                empty = norms[:, 0] == 0
+                centroids = np.where(empty[:, None], centroids, sums / np.where(norms == 0, 1, norms))
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+        else:
+            centroids = np.zeros((1, vectors.shape[1] if vectors.ndim == 2 else 0), dtype=np.float32)
+            assignment = np.empty(0, dtype=np.int64)
+
+        self.centroids = centroids
+        self.lists = [np.flatnonzero(assignment == cluster) for cluster in range(len(centroids))]
+
+    def search(self, query: np.ndarray, k: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Approximate k nearest rows by cosine similarity
+
+        Returns:
+            Tuple of (row indices, similarities), best first
+        """
+        probes = np.argsort(-(self.centroids @ query))[:nprobe]
+        rows = np.concatenate([self.lists[cluster] for cluster in probes]) if len(probes) else np.empty(0, int)
+        if not len(rows):
+            return rows, np.empty(0, dtype=np.float32)
+        similarities = self.vectors[rows] @ query
+        if len(rows) > k:
+            best = np.argpartition(-similarities, k - 1)[:k]
+            rows, similarities = rows[best], similarities[best]
+        order = np.argsort(-similarities, kind="stable")
+        return rows[order], similarities[order]
+
+
+class SemanticVendorIndex:
+    """
+    Embeds vendors (specializations + brands) and finds the vendors closest
+    to an item without comparing it to every vendor.
+
+    Item embeddings are cached by normalized query text, so repeated item
+    names across RFQs are embedded once per index.
+    """
+
+    def __init__(
+        self,
+        vendors: List[Vendor],
+        dimensions: int = 64,
+        nprobe: int = 4,
+        cache_size: int = 4096,
+        version: int = 0
+    ):
+        self.vendor_ids = [vendor.id for vendor in vendors]
+        self.nprobe = nprobe
+        self.cache_size = cache_size
+        self.version = version
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+        # Vendors share most of their specializations and brands, so each
+        # distinct term is embedded once and a vendor is the weighted sum of
+        # its terms
+        terms: Dict[str, int] = {}
+        vendor_term_ids = [
+            [(terms.setdefault(term, len(terms)), weight) for term, weight in vendor_terms(vendor)]
+            for vendor in vendors
+        ]
+        self.model = TfidfLsa(dimensions).fit(list(terms), concepts=CATEGORY_GLOSSARY, concept_weight=CONCEPT_WEIGHT)
+        term_embeddings = self.model.transform(list(terms))
+
+        vectors = np.zeros((len(vendors), self.model.components.shape[1]), dtype=np.float32)
+        for row, term_ids in enumerate(vendor_term_ids):
+            for term_id, weight in term_ids:
+                vectors[row] += weight * term_embeddings[term_id]
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.ann = IvfIndex(vectors / norms)
+
+    def __len__(self) -> int:
+        return len(self.vendor_ids)
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embedding for a query text, served from the LRU cache when possible"""
+        key = normalize_text(text)
+        embedding = self._cache.get(key)
+        if embedding is not None:
+            self._cache.move_to_end(key)
+            return embedding
+        embedding = self.model.transform([key])[0]
+        self._cache[key] = embedding
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return embedding
+
+    def similar_vendors(self, item: ItemDetail, k: int, min_similarity: float) -> Dict[str, float]:
+        """
+        Vendors semantically close to an item
+
+        Args:
+            item: An item from an RFQ
+            k: Maximum number of vendors returned
+            min_similarity: Lowest cosine similarity kept
+
+        Returns:
+            Dictionary mapping vendor IDs to cosine similarity
+        """
+        query = item_query(item)
+        if not query or not len(self.vendor_ids):
+            return {}
+        rows, similarities = self.ann.search(self.embed(query), k, self.nprobe)
+        return {
+            self.vendor_ids[row]: float(similarity)
+            for row, similarity in zip(rows, similarities)
+            if similarity >= min_similarity
+        }
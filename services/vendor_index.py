@@ -0,0 +1,322 @@
+import threading
+from typing import List, Dict, Set, Iterable, Optional, Tuple
+from models import Vendor, ItemDetail
+
+
+def _trigrams(value: str) -> Set[str]:
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+
+class SubstringIndex:
+    """
+    Set of distinct lowercase strings with fast substring lookups.
+
+    Each string gets a stable integer id. A trigram index answers "which
+    strings contain this text" without scanning every string, and a hash
+    lookup over the substrings of a text answers "which strings are
+    contained in this text". Both return exactly what the equivalent
+    `needle in string` checks would.
+
+    Strings are reference counted: every add() needs a matching release(),
+    and a string whose count drops to zero is removed and its id reused,
+    so the index does not grow as strings come and go.
+    """
+
+    def __init__(self):
+        self.strings: List[Optional[str]] = []
+        self.ids: Dict[str, int] = {}
+        self._trigrams: Dict[str, Set[int]] = {}
+        self._max_length = 0
+        self._references: Dict[int, int] = {}
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        """Number of ids in use or free for reuse (ids are below this)"""
+        return len(self.strings)
+
+    def add(self, value: str) -> int:
+        """Add a reference to a string (lowercased) and return its id"""
+        value = value.lower()
+        string_id = self.ids.get(value)
+        if string_id is not None:
+            self._references[string_id] += 1
+            return string_id
+
+        if self._free:
+            string_id = self._free.pop()
+            self.strings[string_id] = value
+        else:
+            string_id = len(self.strings)
+            self.strings.append(value)
+        self.ids[value] = string_id
+        self._references[string_id] = 1
+        self._max_length = max(self._max_length, len(value))
+        for gram in _trigrams(value):
+            self._trigrams.setdefault(gram, set()).add(string_id)
+        return string_id
+
+    def release(self, value: str) -> Optional[int]:
+        """
+        Drop a reference taken by add(), removing the string after the last one
+
+        Returns:
+            The string's id, or None if it is not in the index
+        """
+        value = value.lower()
+        string_id = self.ids.get(value)
+        if string_id is None:
+            return None
+        self._references[string_id] -= 1
+        if self._references[string_id] == 0:
+            del self._references[string_id]
+            del self.ids[value]
+            for gram in _trigrams(value):
+                postings = self._trigrams[gram]
+                postings.discard(string_id)
+                if not postings:
+                    del self._trigrams[gram]
+            self.strings[string_id] = None
+            self._free.append(string_id)
+        return string_id
+
+    def containing(self, needle: str) -> Set[int]:
+        """Ids of all strings that contain needle (case-insensitive)"""
+        needle = needle.lower()
+        if len(needle) < 3:
+            return {i for i, value in enumerate(self.strings) if value is not None and needle in value}
+
+        postings = []
+        for gram in _trigrams(needle):
+            ids = self._trigrams.get(gram)
+            if not ids:
+                return set()
+            postings.append(ids)
+        postings.sort(key=len)
+
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                return candidates
+        return {i for i in candidates if needle in self.strings[i]}
+
+    def contained_in(self, text: str) -> Set[int]:
+        """Ids of all strings that are substrings of text (case-insensitive)"""
+        text = text.lower()
+        found = set()
+        if "" in self.ids:
+            found.add(self.ids[""])
+        for start in range(len(text)):
+            for end in range(start + 1, min(len(text), start + self._max_length) + 1):
+                string_id = self.ids.get(text[start:end])
+                if string_id is not None:
+                    found.add(string_id)
+        return found
+
+
+def match_specializations(specializations: SubstringIndex, item: ItemDetail) -> Tuple[Set[int], Set[int]]:
+    """
+    Specialization ids that match an item
+
+    Args:
+        specializations: Index of distinct specialization strings
+        item: An item from an RFQ
+
+    Returns:
+        Tuple of (ids matching the item type, ids matching any word of the item name)
+    """
+    type_ids: Set[int] = set()
+    item_type = getattr(item, "type", None)
+    if item_type:
+        type_ids = specializations.containing(item_type) | specializations.contained_in(item_type)
+
+    name_ids: Set[int] = set()
+    if item.name:
+        for word in set(item.name.lower().split()):
+            name_ids |= specializations.containing(word)
+
+    return type_ids, name_ids
+
+
+def performance_points(vendor: Vendor) -> Optional[float]:
+    """Performance part of the match score (0-10), or None for vendors without performance data"""
+    if not vendor.performance:
+        return None
+    perf_score = (
+        (vendor.performance.quality_rating or 0) +
+        (vendor.performance.reliability_score or 0) +
+        (vendor.performance.pricing_consistency or 0)
+    ) / 15  # Max possible is 15 (3 * 5)
+    return perf_score * 10
+
+
+class VendorIndex:
+    """
+    Prebuilt lookup structures for matching RFQ items to vendors.
+
+    Brands and specializations are inverted to the vendors that carry them,
+    and performance points are computed once per vendor. Scoring an item
+    only touches vendors that share a brand or specialization with it, and
+    produces the same scores as calculate_vendor_match_score.
+    Vendors can be added or removed at any time.
+    """
+
+    def __init__(self, vendors: Iterable[Vendor] = ()):
+        self.vendors: Dict[str, Vendor] = {}
+        self.specializations = SubstringIndex()
+        self.brand_vendors: Dict[str, Set[str]] = {}
+        self.specialization_vendors: Dict[int, Set[str]] = {}
+        self.performance: Dict[str, Optional[float]] = {}
+        self.version = 0
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+        self._engine = None
+        self._semantic = None
+        self._semantic_lock = threading.Lock()
+        self._semantic_building = False
+
+        for vendor in vendors:
+            self.add_vendor(vendor)
+
+    def __len__(self) -> int:
+        return len(self.vendors)
+
+    def add_vendor(self, vendor: Vendor):
+        """Add a vendor, replacing any existing vendor with the same id"""
+        if vendor.id in self.vendors:
+            self.remove_vendor(vendor.id)
+
+        self.vendors[vendor.id] = vendor
+        self._order[vendor.id] = self._next_order
+        self._next_order += 1
+        self.performance[vendor.id] = performance_points(vendor)
+
+        for brand in vendor.brands_carried:
+            self.brand_vendors.setdefault(brand.lower(), set()).add(vendor.id)
+        for specialization in vendor.specializations:
+            spec_id = self.specializations.add(specialization)
+            self.specialization_vendors.setdefault(spec_id, set()).add(vendor.id)
+        self.version += 1
+
+    def remove_vendor(self, vendor_id: str):
+        """Remove a vendor from the index if present"""
+        vendor = self.vendors.pop(vendor_id, None)
+        if vendor is None:
+            return
+
+        del self._order[vendor_id]
+        del self.performance[vendor_id]
+        for brand in vendor.brands_carried:
+            holders = self.brand_vendors.get(brand.lower())
+            if holders is not None:
+                holders.discard(vendor_id)
+                if not holders:
+                    del self.brand_vendors[brand.lower()]
+        for specialization in vendor.specializations:
+            spec_id = self.specializations.release(specialization)
+            holders = self.specialization_vendors.get(spec_id)
+            if holders is not None:
+                holders.discard(vendor_id)
+                if not holders:
+                    del self.specialization_vendors[spec_id]
+        self.version += 1
+
+    def order(self, vendor_id: str) -> int:
+        """Insertion position of a vendor, used to keep result ordering stable"""
+        return self._order[vendor_id]
+
+    def matching_specializations(self, item: ItemDetail) -> Tuple[Set[int], Set[int]]:
+        """Specialization ids that match an item (see match_specializations)"""
+        return match_specializations(self.specializations, item)
+
+    def scoring_engine(self):
+        """NumPy scoring engine for the current vendors, rebuilt after any change"""
+        from services.vendor_scoring import VendorScoringEngine
+        if self._engine is None or self._engine.version != self.version:
+            self._engine = VendorScoringEngine.from_index(self)
+        return self._engine
+
+    def semantic_index(self, wait: bool = False):
+        """
+        Embedding-based nearest-neighbour index for the vendors
+        
+        After any change the index is rebuilt in a background thread, so
+        callers are never blocked by it: until the first build finishes this
+        returns None, and while a rebuild runs it returns the previous index,
+        which may still list vendors removed since (see add_semantic_scores).
+        
+        Args:
+            wait: Build the index in the calling thread if it is missing or
+                stale (for short-lived indexes that would not outlive a build)
+        """
+        with self._semantic_lock:
+            current = self._semantic
+            if current is not None and current.version == self.version:
+                return current
+            vendors = sorted(self.vendors.values(), key=lambda vendor: self.order(vendor.id))
+            version = self.version
+            if wait:
+                self._semantic = self._build_semantic(vendors, version)
+                return self._semantic
+            if not self._semantic_building:
+                self._semantic_building = True
+                threading.Thread(
+                    target=self._rebuild_semantic, args=(vendors, version),
+                    name="semantic-index", daemon=True
+                ).start()
+        return current
+
+    def _build_semantic(self, vendors: List[Vendor], version: int):
+        from config import settings
+        from services.vendor_embeddings import SemanticVendorIndex
+        return SemanticVendorIndex(
+            vendors,
+            dimensions=settings.VENDOR_SEMANTIC_DIMENSIONS,
+            nprobe=settings.VENDOR_SEMANTIC_NPROBE,
+            version=version
+        )
+
+    def _rebuild_semantic(self, vendors: List[Vendor], version: int):
+        try:
+            semantic = self._build_semantic(vendors, version)
+            with self._semantic_lock:
+                if self._semantic is None or self._semantic.version < version:
+                    self._semantic = semantic
+        except Exception as e:
+            print(f"⚠️ Could not build the semantic vendor index: {e}")
+        finally:
+            with self._semantic_lock:
+                self._semantic_building = False
+
+    def _vendors_for(self, spec_ids: Set[int]) -> Set[str]:
+        vendor_ids: Set[str] = set()
+        for spec_id in spec_ids:
+            vendor_ids |= self.specialization_vendors.get(spec_id, set())
+        return vendor_ids
+
+    def candidate_scores(self, item: ItemDetail) -> Dict[str, float]:
+        """
+        Score an item against the vendors that share a brand or specialization with it
+
+        Returns:
+            Dictionary mapping vendor IDs to match scores (0-100)
+        """
+        brand = getattr(item, "brand", None)
+        brand_hits = self.brand_vendors.get(brand.lower(), set()) if brand else set()
+        type_ids, name_ids = self.matching_specializations(item)
+        type_hits = self._vendors_for(type_ids)
+        name_hits = self._vendors_for(name_ids)
+
+        scores = {}
+        for vendor_id in brand_hits | type_hits | name_hits:
+            score = 0
+            if vendor_id in brand_hits:
+                score += 40
+            if vendor_id in type_hits:
+                score += 30
+            if vendor_id in name_hits:
+                score += 20
+            if self.performance[vendor_id] is not None:
+                score += self.performance[vendor_id]
+            scores[vendor_id] = score
+        return scores
@@ -1,41 +1,146 @@
 from typing import List, Dict, Any, Optional
-import re
 import math
+import heapq
 from models import Vendor, VendorType, ItemDetail
+from config import settings
+from services.vendor_index import VendorIndex
+from services.geo_index import GeoIndex, US_ZIP, UK_POSTCODE
+from services.shared_index import SharedVendorIndex
 
-def find_vendors_for_items(items: List[ItemDetail], vendors: List[Vendor]) -> Dict[str, List[Dict[str, Any]]]:
+def find_vendors_for_items(
+    items: List[ItemDetail],
+    vendors: Optional[List[Vendor]] = None,
+    index: Optional[VendorIndex] = None,
+    top_k: Optional[int] = None,
+    min_score: Optional[float] = None,
+    shared: Optional[SharedVendorIndex] = None
+) -> Dict[str, List[Dict[str, Any]]]:
     """
     Find suitable vendors for a list of items
     
+    Only vendors that share a brand or specialization with an item are
+    scored; vendors whose only points would come from performance are not
+    listed. Matches reference vendors by id so each vendor is serialized
+    once per response (see vendor_table).
+    
+    A shared memory-mapped index (settings.VENDOR_INDEX_PATH) is scored
+    with its NumPy engine; it takes precedence over vendors and index.
+    
     Args:
         items: List of items from an RFQ
-        vendors: List of available vendors
+        vendors: List of available vendors (used when no index is given)
+        index: Prebuilt vendor index to match against
+        top_k: Best vendors kept per item (settings.VENDOR_MATCH_TOP_K if None, 0 for all)
+        min_score: Lowest match score kept (settings.VENDOR_MATCH_MIN_SCORE if None)
+        shared: Shared index to match against (see current_shared_index)
         
     Returns:
-        Dictionary mapping item IDs to lists of matching vendors with match scores
+        Dictionary mapping item IDs to lists of {"vendor_id", "match_score"},
+        best match first
     """
+    if top_k is None:
+        top_k = settings.VENDOR_MATCH_TOP_K
+    if min_score is None:
+        min_score = settings.VENDOR_MATCH_MIN_SCORE
+    if shared is not None:
+        return rank_with_engine(items, shared.engine, top_k, min_score)
+    # A throwaway index would never see a background build, so its semantic
+    # index is built here
+    wait = index is None
+    if index is None:
+        index = VendorIndex(vendors or [])
+    
     item_vendor_matches = {}
+    semantic = index.semantic_index(wait=wait) if settings.VENDOR_SEMANTIC_MATCHING and len(index) else None
+    
+    # Larger RFQs are scored in one pass as an item x vendor matrix
+    # (semantic candidates are merged per item, so they take the loop below)
+    if semantic is None and len(items) >= settings.VENDOR_MATRIX_MIN_ITEMS and len(index):
+        return rank_with_engine(items, index.scoring_engine(), top_k, min_score)
     
     for item in items:
-        matching_vendors = []
-        
-        # Calculate matching score for each vendor
-        for vendor in vendors:
-            match_score = calculate_vendor_match_score(item, vendor)
-            if match_score > 0:
-                matching_vendors.append({
-                    "vendor": vendor.dict(),
-                    "match_score": match_score
-                })
+        scores = index.candidate_scores(item)
+        if semantic is not None:
+            add_semantic_scores(scores, item, index, semantic)
+        candidates = [
+            vendor_id for vendor_id, score in scores.items()
+            if score > 0 and score >= min_score
+        ]
         
-        # Sort vendors by match score (descending)
-        matching_vendors.sort(key=lambda x: x["match_score"], reverse=True)
+        # Best matches first, keeping catalog order for ties; a heap avoids
+        # sorting every candidate when only the top K are returned
+        rank_key = lambda vendor_id: (-scores[vendor_id], index.order(vendor_id))
+        if top_k and len(candidates) > top_k:
+            ranked = heapq.nsmallest(top_k, candidates, key=rank_key)
+        else:
+            ranked = sorted(candidates, key=rank_key)
         
-        # Store results
-        item_vendor_matches[item.id] = matching_vendors
+        item_vendor_matches[item.id] = [
+            {"vendor_id": vendor_id, "match_score": scores[vendor_id]}
+            for vendor_id in ranked
+        ]
     
     return item_vendor_matches
 
+def rank_with_engine(items: List[ItemDetail], engine, top_k: int, min_score: float) -> Dict[str, List[Dict[str, Any]]]:
+    """Top-K matches for every item from a VendorScoringEngine (same format as find_vendors_for_items)"""
+    return {
+        item.id: [
+            {"vendor_id": engine.vendor_ids[column], "match_score": score}
+            for column, score in ranked
+        ]
+        for item, ranked in zip(items, engine.rank(items, top_k=top_k or None, min_score=min_score))
+    }
+
+def add_semantic_scores(scores: Dict[str, float], item: ItemDetail, index: VendorIndex, semantic) -> None:
+    """
+    Add vendors that are semantically close to an item but share no brand or
+    specialization text with it
+    
+    Such vendors score like a name match scaled by cosine similarity
+    (up to 20 points) plus performance. Scores of lexical matches are left
+    unchanged.
+    
+    Args:
+        scores: Lexical scores from VendorIndex.candidate_scores, updated in place
+        item: An item from an RFQ
+        index: Vendor index the scores came from
+        semantic: SemanticVendorIndex built from the same or an earlier
+            version of the vendors; vendors no longer in index are skipped
+    """
+    similar = semantic.similar_vendors(
+        item, settings.VENDOR_SEMANTIC_CANDIDATES, settings.VENDOR_SEMANTIC_MIN_SIMILARITY
+    )
+    for vendor_id, similarity in similar.items():
+        if vendor_id in scores or vendor_id not in index.performance:
+            continue
+        score = 20 * similarity
+        if index.performance[vendor_id] is not None:
+            score += index.performance[vendor_id]
+        scores[vendor_id] = score
+
+def vendor_table(
+    item_vendor_matches: Dict[str, List[Dict[str, Any]]],
+    vendors: Dict[str, Vendor]
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Serialize each vendor referenced by a set of matches exactly once
+    
+    Args:
+        item_vendor_matches: Result of find_vendors_for_items
+        vendors: Vendors by ID
+        
+    Returns:
+        Dictionary mapping vendor IDs to vendor dictionaries
+    """
+    table = {}
+    for matches in item_vendor_matches.values():
+        for match in matches:
+            vendor_id = match["vendor_id"]
+            if vendor_id not in table:
+                table[vendor_id] = vendors[vendor_id].dict()
+    return table
+
 def calculate_vendor_match_score(item: ItemDetail, vendor: Vendor) -> float:
     """
     Calculate a match score between an item and a vendor
@@ -86,11 +191,16 @@ def search_vendors_by_criteria(
     city: Optional[str] = None,
     zip_code: Optional[str] = None,
     vendor_type: Optional[VendorType] = None,
-    radius_miles: Optional[int] = None
+    radius_miles: Optional[int] = None,
+    geo_index: Optional[GeoIndex] = None
 ) -> List[Vendor]:
     """
     Search vendors based on various criteria
     
+    With a geo_index, radius searches measure haversine distance between
+    postcode centroids; vendors (or a search postcode) missing from the
+    centroid dataset fall back to is_within_zip_radius.
+    
     Args:
         vendors: List of available vendors
         keywords: Search keywords
@@ -99,12 +209,17 @@ def search_vendors_by_criteria(
         zip_code: Filter by zip code
         vendor_type: Filter by vendor type
         radius_miles: If zip_code provided, find vendors within this radius
+        geo_index: Postcode-centroid index of the same vendors
         
     Returns:
         List of matching vendors
     """
     matching_vendors = []
     
+    in_radius = None
+    if zip_code and radius_miles and geo_index is not None:
+        in_radius = geo_index.within_postcode(country, zip_code, radius_miles)
+    
     for vendor in vendors:
         # Check if vendor matches all criteria
         if vendor_type and vendor.vendor_type != vendor_type:
@@ -118,7 +233,10 @@ def search_vendors_by_criteria(
         
         if zip_code and radius_miles:
             # If zip code and radius provided, check if vendor is within radius
-            if not vendor.location.zip_code or not is_within_zip_radius(zip_code, vendor.location.zip_code, radius_miles):
+            if in_radius is not None and vendor.id in geo_index:
+                if vendor.id not in in_radius:
+                    continue
+            elif not vendor.location.zip_code or not is_within_zip_radius(zip_code, vendor.location.zip_code, radius_miles):
                 continue
         elif zip_code:
             # If only zip code provided, exact match
@@ -158,8 +276,8 @@ def is_within_zip_radius(zip1: str, zip2: str, radius_miles: int) -> bool:
     """
     Check if two zip codes are within a given radius
     
-    In a real implementation, this would use geolocation services.
-    For this prototype, we'll use a simple check based on zip code patterns.
+    Rough estimate from postcode patterns, used when a postcode is not in
+    the centroid dataset (see services.geo_index).
     
     Args:
         zip1: First zip code
@@ -170,21 +288,22 @@ def is_within_zip_radius(zip1: str, zip2: str, radius_miles: int) -> bool:
         True if within radius, False otherwise
     """
     # For US zip codes, we can estimate based on first 3 digits
-    if re.match(r'^\d{5}$', zip1) and re.match(r'^\d{5}$', zip2):
+    us1, us2 = US_ZIP.match(zip1), US_ZIP.match(zip2)
+    if us1 and us2:
         # Get first 3 digits
-        z1 = int(zip1[:3])
-        z2 = int(zip2[:3])
+        z1 = int(us1.group(1)[:3])
+        z2 = int(us2.group(1)[:3])
         
         # Very rough approximation - each zip3 is about 30 miles
         distance_estimate = abs(z1 - z2) * 30
         return distance_estimate <= radius_miles
     
     # For UK postcodes, check first two characters
-    elif (re.match(r'^[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}$', zip1, re.IGNORECASE) and 
-          re.match(r'^[A-Z]{1,2}[0-9][A-Z0-9]? ?[0-9][A-Z]{2}$', zip2, re.IGNORECASE)):
+    uk1, uk2 = UK_POSTCODE.match(zip1), UK_POSTCODE.match(zip2)
+    if uk1 and uk2:
         # Extract the outward code (first part)
-        z1 = re.match(r'^([A-Z]{1,2}[0-9][A-Z0-9]?)', zip1, re.IGNORECASE).group(1)
-        z2 = re.match(r'^([A-Z]{1,2}[0-9][A-Z0-9]?)', zip2, re.IGNORECASE).group(1)
+        z1 = uk1.group(1)
+        z2 = uk2.group(1)
         
         # Simple check if they're the same
         if z1 == z2:
@@ -0,0 +1,336 @@
+import time
+import uuid
+import datetime
+import threading
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select, func, delete, text
+
+from config import settings
+from models import Vendor, Location, VendorPerformance
+import db_models
+from db_utils import app_context
+
+# Rows updated this long before the watermark are reloaded on each refresh,
+# so a transaction that commits late with an older updated_at is not missed
+WATERMARK_LOOKBACK = datetime.timedelta(seconds=5)
+
+
+class VendorSnapshot:
+    """
+    Immutable view of every vendor at one point in time.
+
+    Readers can hold on to a snapshot for as long as they need it; refreshes
+    build a new snapshot instead of changing this one. The Vendor objects
+    are shared between snapshots and must be treated as read-only.
+    """
+
+    __slots__ = ("vendors", "by_id", "version", "watermark")
+
+    def __init__(self, vendors: Tuple[Vendor, ...], version: int, watermark: Optional[datetime.datetime]):
+        self.vendors = vendors
+        self.by_id: Mapping[str, Vendor] = MappingProxyType({vendor.id: vendor for vendor in vendors})
+        self.version = version
+        self.watermark = watermark
+
+    def __len__(self) -> int:
+        return len(self.vendors)
+
+    def __iter__(self):
+        return iter(self.vendors)
+
+    def __contains__(self, vendor_id: str) -> bool:
+        return vendor_id in self.by_id
+
+    def get(self, vendor_id: str) -> Optional[Vendor]:
+        return self.by_id.get(vendor_id)
+
+
+def _to_model(row, location, performance, specializations: List[str], brands: List[str]) -> Vendor:
+    return Vendor(
+        id=row.id,
+        name=row.name,
+        vendor_type=row.vendor_type,
+        location=Location(
+            country=location.country,
+            city=location.city,
+            zip_code=location.zip_code,
+            address=location.address
+        ) if location is not None else Location(country=""),
+        website=row.website,
+        email=row.email,
+        phone=row.phone,
+        specializations=specializations,
+        brands_carried=brands,
+        performance=VendorPerformance(
+            response_time_avg=performance.response_time_avg,
+            quality_rating=performance.quality_rating,
+            pricing_consistency=performance.pricing_consistency,
+            reliability_score=performance.reliability_score
+        ) if performance is not None else None
+    )
+
+
+def load_vendors(vendor_filter=None) -> List[Vendor]:
+    """
+    Load vendors with their location, performance, specializations and brands
+
+    Uses one query per table (five in total) however many vendors match.
+
+    Args:
+        vendor_filter: Optional SQLAlchemy condition on db_models.Vendor
+
+    Returns:
+        List of vendor models
+    """
+    session = db_models.db.session
+    vendor_ids = select(db_models.Vendor.id)
+    vendors_query = select(db_models.Vendor.__table__)
+    if vendor_filter is not None:
+        vendor_ids = vendor_ids.where(vendor_filter)
+        vendors_query = vendors_query.where(vendor_filter)
+
+    def children(model):
+        return session.execute(
+            select(model.__table__).where(model.vendor_id.in_(vendor_ids))
+        ).all()
+
+    rows = session.execute(vendors_query.order_by(db_models.Vendor.created_at, db_models.Vendor.id)).all()
+    locations = {row.vendor_id: row for row in children(db_models.Location)}
+    performances = {row.vendor_id: row for row in children(db_models.VendorPerformance)}
+    specializations: Dict[str, List[str]] = {}
+    for row in children(db_models.VendorSpecialization):
+        specializations.setdefault(row.vendor_id, []).append(row.specialization)
+    brands: Dict[str, List[str]] = {}
+    for row in children(db_models.VendorBrand):
+        brands.setdefault(row.vendor_id, []).append(row.brand)
+
+    return [
+        _to_model(
+            row,
+            locations.get(row.id),
+            performances.get(row.id),
+            specializations.get(row.id, []),
+            brands.get(row.id, [])
+        )
+        for row in rows
+    ]
+
+
+class VendorRepository:
+    """
+    Vendors stored in PostgreSQL, read through an in-process snapshot.
+
+    The first read loads every vendor. Later reads return the cached
+    snapshot, re-checking the database at most every refresh_seconds: one
+    query for max(updated_at) and count(*), then only the vendors updated
+    since the watermark are reloaded. A full id query is made only when
+    vendors were deleted. Writes through the repository invalidate the
+    snapshot so the next read sees them.
+
+    Listeners registered with subscribe() receive (changed vendors, removed
+    ids) after every refresh, which keeps derived indexes incremental.
+    """
+
+    def __init__(self, refresh_seconds: Optional[float] = None):
+        self.refresh_seconds = settings.VENDOR_SNAPSHOT_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self._snapshot: Optional[VendorSnapshot] = None
+        self._checked_at = 0.0
+        self._stale = True
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[List[Vendor], List[str]], None]] = []
+
+    def subscribe(self, listener: Callable[[List[Vendor], List[str]], None]):
+        """Call listener(changed, removed_ids) after each refresh; it first receives every vendor"""
+        with self._lock:
+            self._listeners.append(listener)
+            if self._snapshot is not None:
+                listener(list(self._snapshot.vendors), [])
+
+    def invalidate(self):
+        """Make the next read check the database"""
+        self._stale = True
+
+    def snapshot(self) -> VendorSnapshot:
+        """Current snapshot, refreshed from the database if it may be out of date"""
+        snapshot = self._snapshot
+        if snapshot is not None and not self._stale and time.monotonic() - self._checked_at < self.refresh_seconds:
+            return snapshot
+        with self._lock:
+            if self._snapshot is None or self._stale or time.monotonic() - self._checked_at >= self.refresh_seconds:
+                with app_context():
+                    self._refresh()
+            return self._snapshot
+
+    def published(self) -> Optional[VendorSnapshot]:
+        """Last published snapshot, without checking the database (listeners get the one they are called for)"""
+        return self._snapshot
+
+    def get(self, vendor_id: str) -> Optional[Vendor]:
+        return self.snapshot().get(vendor_id)
+
+    def vendors(self) -> Tuple[Vendor, ...]:
+        return self.snapshot().vendors
+
+    def _refresh(self):
+        session = db_models.db.session
+        # Clear the stale flag first so a write during the refresh is not lost
+        self._stale = False
+        watermark, count = session.execute(
+            select(func.max(db_models.Vendor.updated_at), func.count(db_models.Vendor.id))
+        ).one()
+        previous = self._snapshot
+
+        if previous is None:
+            vendors = load_vendors()
+            self._publish(VendorSnapshot(tuple(vendors), 1, watermark), vendors, [])
+        elif watermark != previous.watermark or count != len(previous):
+            loaded = load_vendors(db_models.Vendor.updated_at > previous.watermark - WATERMARK_LOOKBACK) \
+                if previous.watermark is not None else load_vendors()
+            # Rows reloaded only because of the lookback window are unchanged
+            changed = [vendor for vendor in loaded if previous.get(vendor.id) != vendor]
+            by_id = dict(previous.by_id)
+            for vendor in changed:
+                by_id[vendor.id] = vendor
+
+            removed: List[str] = []
+            if len(by_id) != count:
+                live_ids = set(session.execute(select(db_models.Vendor.id)).scalars())
+                removed = [vendor_id for vendor_id in by_id if vendor_id not in live_ids]
+                for vendor_id in removed:
+                    del by_id[vendor_id]
+
+            self._publish(VendorSnapshot(tuple(by_id.values()), previous.version + 1, watermark), changed, removed)
+        self._checked_at = time.monotonic()
+
+    def _publish(self, snapshot: VendorSnapshot, changed: List[Vendor], removed: List[str]):
+        self._snapshot = snapshot
+        for listener in self._listeners:
+            listener(changed, removed)
+        print(f"🔄 Vendor snapshot v{snapshot.version}: {len(snapshot)} vendors "
+              f"({len(changed)} changed, {len(removed)} removed)")
+
+    def save(self, vendors: Iterable[Vendor]):
+        """
+        Insert or replace vendors with their child rows in one transaction
+
+        Args:
+            vendors: Vendor models; existing vendors with the same id are replaced
+        """
+        vendors = list(vendors)
+        if not vendors:
+            return
+
+        with app_context():
+            session = db_models.db.session
+            try:
+                self._write(session, vendors)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+        self.invalidate()
+
+    def seed(self, vendors: Iterable[Vendor]) -> bool:
+        """
+        Insert vendors if the vendors table is empty
+
+        Processes starting together against an empty table serialize on an
+        advisory lock, so only the first one inserts.
+
+        Args:
+            vendors: Vendor models to insert
+
+        Returns:
+            True if the vendors were inserted
+        """
+        vendors = list(vendors)
+        with app_context():
+            session = db_models.db.session
+            try:
+                session.execute(text("SELECT pg_advisory_xact_lock(hashtext(:name))"), {"name": "vendors_seed"})
+                seeded = not session.execute(select(func.count(db_models.Vendor.id))).scalar()
+                if seeded:
+                    self._write(session, vendors)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+        # Reload even when another process seeded the table first
+        self.invalidate()
+        return seeded
+
+    def _write(self, session, vendors: List[Vendor]):
+        now = datetime.datetime.utcnow()
+        ids = [vendor.id for vendor in vendors]
+        for model in (db_models.Location, db_models.VendorPerformance,
+                      db_models.VendorSpecialization, db_models.VendorBrand):
+            session.execute(delete(model).where(model.vendor_id.in_(ids)))
+        existing = set(session.execute(
+            select(db_models.Vendor.id).where(db_models.Vendor.id.in_(ids))
+        ).scalars())
+
+        vendor_rows, new_rows = [], []
+        for vendor in vendors:
+            row = {
+                "id": vendor.id, "name": vendor.name, "vendor_type": vendor.vendor_type,
+                "website": vendor.website, "email": vendor.email, "phone": vendor.phone,
+                "updated_at": now
+            }
+            (vendor_rows if vendor.id in existing else new_rows).append(row)
+        if new_rows:
+            session.execute(db_models.Vendor.__table__.insert(),
+                            [dict(row, created_at=now) for row in new_rows])
+        for row in vendor_rows:
+            session.execute(
+                db_models.Vendor.__table__.update().where(db_models.Vendor.id == row["id"]).values(**row)
+            )
+
+        self._insert_children(session, vendors)
+
+    @staticmethod
+    def _insert_children(session, vendors: List[Vendor]):
+        def new_id():
+            return str(uuid.uuid4())
+
+        locations = [
+            {"id": new_id(), "vendor_id": v.id, **v.location.dict()} for v in vendors
+        ]
+        performances = [
+            {"id": new_id(), "vendor_id": v.id, **v.performance.dict()} for v in vendors if v.performance
+        ]
+        specializations = [
+            {"id": new_id(), "vendor_id": v.id, "specialization": s} for v in vendors for s in v.specializations
+        ]
+        brands = [
+            {"id": new_id(), "vendor_id": v.id, "brand": b} for v in vendors for b in v.brands_carried
+        ]
+        for model, rows in ((db_models.Location, locations), (db_models.VendorPerformance, performances),
+                            (db_models.VendorSpecialization, specializations), (db_models.VendorBrand, brands)):
+            if rows:
+                session.execute(model.__table__.insert(), rows)
+
+    def delete(self, vendor_id: str) -> bool:
+        """
+        Delete a vendor and its child rows
+
+        Returns:
+            True if the vendor existed
+        """
+        with app_context():
+            session = db_models.db.session
+            try:
+                vendor = session.get(db_models.Vendor, vendor_id)
+                if vendor is None:
+                    return False
+                session.delete(vendor)
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+        self.invalidate()
+        return True
+
+
+vendor_repository = VendorRepository()
@@ -0,0 +1,185 @@
+from typing import List, Dict, Tuple, Optional
+import numpy as np
+from models import ItemDetail
+from services.vendor_index import VendorIndex, SubstringIndex, match_specializations
+
+
+def _csr(postings: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Pack per-row column lists into CSR (indptr, indices) arrays"""
+    indptr = np.zeros(len(postings) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(row) for row in postings])
+    indices = np.fromiter((col for row in postings for col in row), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def _gather(indptr: np.ndarray, indices: np.ndarray, rows: np.ndarray, keys: np.ndarray):
+    """
+    Expand (row, key) pairs into (row, column) pairs for every column stored
+    under key in a CSR structure, without a Python loop.
+    """
+    starts = indptr[keys]
+    lengths = indptr[keys + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    columns = indices[np.repeat(starts, lengths) + offsets]
+    return np.repeat(rows, lengths), columns
+
+
+class VendorScoringEngine:
+    """
+    Scores every item of an RFQ against every vendor in a few array operations.
+
+    Vendors are columns. Brand and specialization memberships are stored as
+    sparse CSR arrays (brand/specialization -> vendor columns), performance
+    as a dense vector. An RFQ is encoded as (item, brand) and
+    (item, specialization) pairs, scattered into dense item x vendor hit
+    masks and combined with the same weights as calculate_vendor_match_score,
+    which makes the scores bit-for-bit identical.
+    """
+
+    def __init__(
+        self,
+        vendor_ids: List[str],
+        performance: np.ndarray,
+        brand_ids: Dict[str, int],
+        brand_indptr: np.ndarray,
+        brand_indices: np.ndarray,
+        specializations: SubstringIndex,
+        spec_indptr: np.ndarray,
+        spec_indices: np.ndarray,
+        version: int = 0
+    ):
+        self.vendor_ids = vendor_ids
+        self.performance = performance
+        self.brand_ids = brand_ids
+        self.brand_indptr = brand_indptr
+        self.brand_indices = brand_indices
+        self.specializations = specializations
+        self.spec_indptr = spec_indptr
+        self.spec_indices = spec_indices
+        self.version = version
+
+    @classmethod
+    def from_index(cls, index: VendorIndex) -> "VendorScoringEngine":
+        """Build an engine from the current contents of a VendorIndex"""
+        vendor_ids = sorted(index.vendors, key=index.order)
+        column = {vendor_id: i for i, vendor_id in enumerate(vendor_ids)}
+
+        performance = np.array(
+            [index.performance[vendor_id] or 0.0 for vendor_id in vendor_ids], dtype=np.float64
+        )
+
+        brands = sorted(index.brand_vendors)
+        brand_indptr, brand_indices = _csr(
+            [sorted(column[v] for v in index.brand_vendors[brand]) for brand in brands]
+        )
+
+        spec_count = len(index.specializations)
+        spec_indptr, spec_indices = _csr(
+            [sorted(column[v] for v in index.specialization_vendors.get(spec_id, ()))
+             for spec_id in range(spec_count)]
+        )
+
+        return cls(
+            vendor_ids=vendor_ids,
+            performance=performance,
+            brand_ids={brand: i for i, brand in enumerate(brands)},
+            brand_indptr=brand_indptr,
+            brand_indices=brand_indices,
+            specializations=index.specializations,
+            spec_indptr=spec_indptr,
+            spec_indices=spec_indices,
+            version=index.version
+        )
+
+    def __len__(self) -> int:
+        return len(self.vendor_ids)
+
+    def _encode_items(self, items: List[ItemDetail]):
+        """Encode items as (item row, brand id) and (item row, specialization id) pairs"""
+        spec_count = len(self.spec_indptr) - 1
+        brand_pairs, type_pairs, name_pairs = [], [], []
+
+        for row, item in enumerate(items):
+            brand = getattr(item, "brand", None)
+            if brand and brand.lower() in self.brand_ids:
+                brand_pairs.append((row, self.brand_ids[brand.lower()]))
+            type_ids, name_ids = match_specializations(self.specializations, item)
+            type_pairs.extend((row, spec_id) for spec_id in type_ids if spec_id < spec_count)
+            name_pairs.extend((row, spec_id) for spec_id in name_ids if spec_id < spec_count)
+
+        def as_arrays(pairs):
+            if not pairs:
+                return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+            array = np.array(pairs, dtype=np.int64)
+            return array[:, 0], array[:, 1]
+
+        return as_arrays(brand_pairs), as_arrays(type_pairs), as_arrays(name_pairs)
+
+    def hit_masks(self, items: List[ItemDetail]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Item x vendor boolean masks for brand, type and name matches"""
+        shape = (len(items), len(self.vendor_ids))
+        brand_pairs, type_pairs, name_pairs = self._encode_items(items)
+
+        masks = []
+        for (rows, keys), indptr, indices in (
+            (brand_pairs, self.brand_indptr, self.brand_indices),
+            (type_pairs, self.spec_indptr, self.spec_indices),
+            (name_pairs, self.spec_indptr, self.spec_indices),
+        ):
+            mask = np.zeros(shape, dtype=bool)
+            hit_rows, hit_columns = _gather(indptr, indices, rows, keys)
+            mask[hit_rows, hit_columns] = True
+            masks.append(mask)
+        return masks[0], masks[1], masks[2]
+
+    def score_matrix(self, items: List[ItemDetail]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score all items against all vendors
+
+        Returns:
+            Tuple of (item x vendor scores, mask of pairs that share a brand or specialization)
+        """
+        brand_hit, type_hit, name_hit = self.hit_masks(items)
+        scores = brand_hit * 40.0
+        scores += type_hit * 30.0
+        scores += name_hit * 20.0
+        scores += self.performance
+        return scores, brand_hit | type_hit | name_hit
+
+    def rank(
+        self,
+        items: List[ItemDetail],
+        top_k: Optional[int] = None,
+        min_score: float = 0.0
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Rank candidate vendors for each item
+
+        Args:
+            items: Items from an RFQ
+            top_k: Keep only the best K vendors per item (all candidates if None)
+            min_score: Drop vendors scoring below this
+
+        Returns:
+            For each item, (vendor column, score) pairs sorted by score descending,
+            ties in catalog order
+        """
+        scores, candidates = self.score_matrix(items)
+        scores[~candidates] = -np.inf
+
+        ranked = []
+        for row in scores:
+            columns = np.flatnonzero((row > 0) & (row >= min_score))
+            if top_k is not None and len(columns) > top_k:
+                # argpartition finds the K-th best score; ties at that score are
+                # resolved in catalog order so results are deterministic
+                kth = row[columns[np.argpartition(-row[columns], top_k - 1)[top_k - 1]]]
+                above = columns[row[columns] > kth]
+                ties = columns[row[columns] == kth][:top_k - len(above)]
+                columns = np.concatenate([above, ties])
+            order = np.lexsort((columns, -row[columns]))
+            ranked.append([(int(column), float(row[column])) for column in columns[order]])
+        return ranked
@@ -0,0 +1,189 @@
+import heapq
+from itertools import chain, islice
+from typing import List, Dict, Set, Iterable, Optional, Tuple
+from models import Vendor, VendorType
+from services.vendor_index import SubstringIndex
+from services.geo_index import GeoIndex, country_code
+from services.vendor_matcher import is_within_zip_radius
+
+
+def country_key(country: str) -> str:
+    """Lookup key for a country, so "USA", "US" and "United States" are the same country"""
+    return country_code(country) or country.strip().lower()
+
+
+class VendorSearchIndex:
+    """
+    Lookup structures for /vendors/search.
+
+    Country, city, vendor type and zip code are hash indexes (value -> vendor
+    ids). Names, specializations and brands are stored once as distinct
+    lowercase terms in a SubstringIndex, so a keyword finds every vendor
+    with a term containing it without scanning vendors. Filters are combined
+    by intersecting id sets, smallest first. Results keep catalog order.
+    """
+
+    def __init__(self, vendors: Iterable[Vendor] = ()):
+        self.vendors: Dict[str, Vendor] = {}
+        self.by_country: Dict[str, Set[str]] = {}
+        self.by_city: Dict[str, Set[str]] = {}
+        self.by_type: Dict[VendorType, Set[str]] = {}
+        self.by_zip: Dict[str, Set[str]] = {}
+        self.terms = SubstringIndex()
+        self.term_vendors: Dict[int, Set[str]] = {}
+        self._order: Dict[str, int] = {}
+        self._next_order = 0
+
+        for vendor in vendors:
+            self.add_vendor(vendor)
+
+    def __len__(self) -> int:
+        return len(self.vendors)
+
+    @staticmethod
+    def _terms(vendor: Vendor) -> Set[str]:
+        return {term.lower() for term in [vendor.name] + list(vendor.specializations) + list(vendor.brands_carried)}
+
+    def _keys(self, vendor: Vendor):
+        location = vendor.location
+        yield self.by_country, country_key(location.country)
+        if location.city:
+            yield self.by_city, location.city.lower()
+        if location.zip_code:
+            yield self.by_zip, location.zip_code
+        yield self.by_type, vendor.vendor_type
+
+    def add_vendor(self, vendor: Vendor):
+        """Add a vendor, replacing any existing vendor with the same id"""
+        if vendor.id in self.vendors:
+            self.remove_vendor(vendor.id)
+
+        self.vendors[vendor.id] = vendor
+        self._order[vendor.id] = self._next_order
+        self._next_order += 1
+        for index, key in self._keys(vendor):
+            index.setdefault(key, set()).add(vendor.id)
+        for term in self._terms(vendor):
+            self.term_vendors.setdefault(self.terms.add(term), set()).add(vendor.id)
+
+    def remove_vendor(self, vendor_id: str):
+        """Remove a vendor from the index if present"""
+        vendor = self.vendors.pop(vendor_id, None)
+        if vendor is None:
+            return
+
+        del self._order[vendor_id]
+        for index, key in self._keys(vendor):
+            holders = index.get(key)
+            if holders is not None:
+                holders.discard(vendor_id)
+                if not holders:
+                    del index[key]
+        for term in self._terms(vendor):
+            term_id = self.terms.release(term)
+            holders = self.term_vendors.get(term_id)
+            if holders is not None:
+                holders.discard(vendor_id)
+                if not holders:
+                    del self.term_vendors[term_id]
+
+    def keyword_matches(self, keywords: str) -> Set[str]:
+        """Vendors with a name, specialization or brand containing any comma-separated keyword"""
+        found: Set[str] = set()
+        for keyword in {k.strip().lower() for k in keywords.split(',')}:
+            for term_id in self.terms.containing(keyword):
+                found |= self.term_vendors.get(term_id, set())
+        return found
+
+    def _within_radius(
+        self,
+        vendor_id: str,
+        zip_code: str,
+        radius_miles: int,
+        geo_index: Optional[GeoIndex],
+        in_radius: Optional[Dict[str, float]]
+    ) -> bool:
+        if in_radius is not None and vendor_id in geo_index:
+            return vendor_id in in_radius
+        vendor_zip = self.vendors[vendor_id].location.zip_code
+        return bool(vendor_zip) and is_within_zip_radius(zip_code, vendor_zip, radius_miles)
+
+    def search(
+        self,
+        keywords: Optional[str] = None,
+        country: Optional[str] = None,
+        city: Optional[str] = None,
+        zip_code: Optional[str] = None,
+        vendor_type: Optional[VendorType] = None,
+        radius_miles: Optional[int] = None,
+        geo_index: Optional[GeoIndex] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> Tuple[List[Vendor], int]:
+        """
+        Search vendors based on various criteria (same filters as search_vendors_by_criteria)
+
+        Args:
+            keywords: Comma-separated keywords matched against names, specializations and brands
+            country: Filter by country name or ISO code
+            city: Filter by city
+            zip_code: Filter by zip code
+            vendor_type: Filter by vendor type
+            radius_miles: If zip_code provided, find vendors within this radius
+            geo_index: Postcode-centroid index of the same vendors
+            limit: Maximum number of vendors returned (all if None)
+            offset: Number of matching vendors to skip
+
+        Returns:
+            Tuple of (page of matching vendors, total number of matches)
+        """
+        filters: List[Set[str]] = []
+        if vendor_type:
+            filters.append(self.by_type.get(vendor_type, set()))
+        if country:
+            filters.append(self.by_country.get(country_key(country), set()))
+        if city:
+            filters.append(self.by_city.get(city.lower(), set()))
+        if zip_code and not radius_miles:
+            filters.append(self.by_zip.get(zip_code, set()))
+        if keywords:
+            filters.append(self.keyword_matches(keywords))
+
+        # Without filters every vendor matches; vendors is kept in catalog order
+        if not filters and not (zip_code and radius_miles):
+            end = offset + limit if limit is not None else None
+            page = list(islice(self.vendors.values(), offset, end))
+            return page, len(self.vendors)
+
+        in_radius = None
+        if zip_code and radius_miles and geo_index is not None:
+            in_radius = geo_index.within_postcode(country, zip_code, radius_miles)
+            if in_radius is not None:
+                # Only vendors found in the grid or left unlocated by it can be in range
+                filters.append({
+                    vendor_id for vendor_id in chain(in_radius, geo_index.unlocated)
+                    if vendor_id in self.vendors
+                })
+
+        filters.sort(key=len)
+        matches = set(filters[0]) if filters else set(self.vendors)
+        for ids in filters[1:]:
+            matches &= ids
+            if not matches:
+                break
+
+        if zip_code and radius_miles:
+            # Vendors located by the geo index are checked by distance; the
+            # rest fall back to the postcode heuristic
+            matches = {
+                vendor_id for vendor_id in matches
+                if self._within_radius(vendor_id, zip_code, radius_miles, geo_index, in_radius)
+            }
+
+        # A page near the start only needs a partial sort
+        if limit is not None and offset + limit < len(matches):
+            ordered = heapq.nsmallest(offset + limit, matches, key=self._order.__getitem__)
+        else:
+            ordered = sorted(matches, key=self._order.__getitem__)
+        page = ordered[offset:offset + limit] if limit is not None else ordered[offset:]
+        return [self.vendors[vendor_id] for vendor_id in page], len(matches)
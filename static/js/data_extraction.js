@@ -76,6 +76,9 @@ function processDocuments(rfqId) {
                 const saveButton = document.getElementById('save-items-btn');
                 if (saveButton) {
                     saveButton.disabled = false;
+                    if (data.updated_at) {
+                        saveButton.setAttribute('data-updated-at', data.updated_at);
+                    }
                 }
             } else {
                 // If no items in response, reload the page
@@ -284,8 +287,12 @@ function saveItemCorrections(rfqId) {
     
     console.log('Sending items to server:', items);
     
+    // Send the RFQ version this page was loaded with so concurrent edits are detected
+    const saveButton = document.getElementById('save-items-btn');
+    const updatedAt = saveButton ? saveButton.getAttribute('data-updated-at') : null;
+    
     // Create a JSON string for debugging
-    const jsonBody = JSON.stringify(items);
+    const jsonBody = JSON.stringify({ items: items, updated_at: updatedAt || null });
     console.log('Request JSON body:', jsonBody);
     
     fetch(`/rfq/${rfqId}/items`, {
@@ -300,6 +307,11 @@ function saveItemCorrections(rfqId) {
         console.log('Server response status:', response.status);
         console.log('Server response headers:', [...response.headers.entries()]);
         
+        if (response.status === 409) {
+            return response.json().then(data => {
+                throw new Error(data.message);
+            });
+        }
         if (!response.ok) {
             return response.text().then(text => {
                 console.error('Error response body:', text);
@@ -310,6 +322,19 @@ function saveItemCorrections(rfqId) {
     })
     .then(data => {
         console.log('Save successful:', data);
+        
+        // Newly added rows now have server-side ids
+        const idMap = data.id_map || {};
+        document.querySelectorAll('#items-table tbody tr[data-item-id]').forEach(row => {
+            const newId = idMap[row.getAttribute('data-item-id')];
+            if (newId) {
+                row.setAttribute('data-item-id', newId);
+            }
+        });
+        if (saveButton && data.updated_at) {
+            saveButton.setAttribute('data-updated-at', data.updated_at);
+        }
+        
         showToast('Items saved successfully', 'success');
     })
     .catch(error => {
@@ -24,15 +24,32 @@ function initializeVendorMatchingPage() {
             e.preventDefault();
             searchVendors();
         });
+        
+        // Search as the user types, once typing pauses
+        const keywordsInput = document.getElementById('search-keywords');
+        if (keywordsInput) {
+            let typeaheadTimer = null;
+            keywordsInput.addEventListener('input', function() {
+                clearTimeout(typeaheadTimer);
+                typeaheadTimer = setTimeout(() => searchVendors(0), SEARCH_TYPEAHEAD_DELAY_MS);
+            });
+        }
     }
 }
 
+// Vendors per search results page, and the pause before a typeahead search
+const SEARCH_PAGE_SIZE = 25;
+const SEARCH_TYPEAHEAD_DELAY_MS = 250;
+
+// Only the latest search request may render results
+let latestSearchRequest = 0;
+
 // Match vendors for items in an RFQ
 function matchVendorsForRfq(rfqId) {
     showLoadingSpinner('vendor-matches-container', 'Finding suitable vendors...');
     
     fetch(`/vendors/match/${rfqId}`, {
-        method: 'GET',
+        method: 'POST',
         headers: {
             'Content-Type': 'application/json'
         }
@@ -55,10 +72,15 @@ function matchVendorsForRfq(rfqId) {
 }
 
 // Display vendor matches for items
-function displayVendorMatches(itemVendorMatches, rfqId) {
+// data.item_vendor_matches maps item ids to [{vendor_id, match_score}];
+// vendor and item details are looked up in data.vendors and data.items
+function displayVendorMatches(data, rfqId) {
     const container = document.getElementById('vendor-matches-container');
     if (!container) return;
     
+    const itemVendorMatches = data.item_vendor_matches || {};
+    const vendors = data.vendors || {};
+    const items = data.items || {};
     let html = '';
     
     if (Object.keys(itemVendorMatches).length === 0) {
@@ -68,10 +90,19 @@ function displayVendorMatches(itemVendorMatches, rfqId) {
         </div>
         `;
     } else {
+        const vendorCount = Object.keys(vendors).length;
+        html += `
+        <div class="d-flex justify-content-end mb-3">
+            <button type="button" class="btn btn-primary generate-all-emails-btn" data-rfq-id="${rfqId}">
+                <span data-feather="send"></span> Email all ${vendorCount} matched vendors
+            </button>
+        </div>
+        `;
+        
         // For each item, display matched vendors
         for (const itemId in itemVendorMatches) {
-            const item = itemVendorMatches[itemId];
-            const matchedVendors = item.vendors;
+            const item = items[itemId] || {name: itemId};
+            const matchedVendors = itemVendorMatches[itemId];
             
             html += `
             <div class="card mb-4">
@@ -96,8 +127,8 @@ function displayVendorMatches(itemVendorMatches, rfqId) {
             
             if (matchedVendors && matchedVendors.length > 0) {
                 matchedVendors.forEach((match, index) => {
-                    const vendor = match.vendor;
-                    const matchScore = match.score;
+                    const vendor = vendors[match.vendor_id];
+                    const matchScore = match.match_score;
                     
                     html += `
                     <tr>
@@ -161,6 +192,13 @@ function displayVendorMatches(itemVendorMatches, rfqId) {
     
     // Initialize email buttons
     initializeEmailButtons();
+    
+    const allEmailsButton = container.querySelector('.generate-all-emails-btn');
+    if (allEmailsButton) {
+        allEmailsButton.addEventListener('click', function() {
+            generateEmails(this.getAttribute('data-rfq-id'), Object.keys(vendors));
+        });
+    }
 }
 
 // Initialize email generation buttons
@@ -201,6 +239,38 @@ function generateEmail(rfqId, vendorId, serial) {
     });
 }
 
+// Generate emails for many vendors with one request; vendors are numbered in order
+function generateEmails(rfqId, vendorIds) {
+    showToast(`Generating ${vendorIds.length} emails...`, 'info');
+    
+    fetch(`/emails/generate/${rfqId}`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            vendor_ids: vendorIds,
+            serials: vendorIds.map((vendorId, index) => index + 1)
+        })
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error('Error generating emails');
+        }
+        return response.json();
+    })
+    .then(data => {
+        const missing = data.missing_vendor_ids.length;
+        const unsupported = data.unsupported_vendor_ids.length;
+        showToast(`Generated ${data.emails.length} emails` +
+            (missing ? ` (${missing} vendors no longer exist)` : '') +
+            (unsupported ? ` (no email template for ${unsupported} vendors)` : ''), 'success');
+    })
+    .catch(error => {
+        showToast(`Error: ${error.message}`, 'danger');
+    });
+}
+
 // Show email preview modal
 function showEmailPreviewModal(email) {
     const modalContainer = document.getElementById('modal-container');
@@ -283,15 +353,15 @@ function sendEmail(emailId) {
         return response.json();
     })
     .then(data => {
-        showToast('Email sent successfully', 'success');
+        showToast('Email queued for sending', 'success');
     })
     .catch(error => {
         showToast(`Error: ${error.message}`, 'danger');
     });
 }
 
-// Search vendors by criteria
-function searchVendors() {
+// Search vendors by criteria, one page at a time
+function searchVendors(offset = 0) {
     const form = document.getElementById('vendor-search-form');
     const formData = new FormData(form);
     
@@ -301,7 +371,10 @@ function searchVendors() {
             queryParams.append(key, value);
         }
     }
+    queryParams.append('limit', SEARCH_PAGE_SIZE);
+    queryParams.append('offset', offset);
     
+    const requestId = ++latestSearchRequest;
     showLoadingSpinner('search-results-container', 'Searching vendors...');
     
     fetch(`/vendors/search?${queryParams.toString()}`, {
@@ -317,20 +390,23 @@ function searchVendors() {
         return response.json();
     })
     .then(data => {
+        if (requestId !== latestSearchRequest) return;
         hideLoadingSpinner('search-results-container');
         displaySearchResults(data);
     })
     .catch(error => {
+        if (requestId !== latestSearchRequest) return;
         hideLoadingSpinner('search-results-container');
         showToast(`Error: ${error.message}`, 'danger');
     });
 }
 
-// Display vendor search results
-function displaySearchResults(vendors) {
+// Display one page of vendor search results
+function displaySearchResults(data) {
     const container = document.getElementById('search-results-container');
     if (!container) return;
     
+    const vendors = data.vendors || [];
     let html = '';
     
     if (vendors.length === 0) {
@@ -380,11 +456,30 @@ function displaySearchResults(vendors) {
                 </tbody>
             </table>
         </div>
+        <div class="d-flex justify-content-between align-items-center">
+            <span class="small text-muted">
+                Showing ${data.offset + 1}-${data.offset + vendors.length} of ${data.total}
+            </span>
+            <div>
+                <button type="button" class="btn btn-sm btn-outline-secondary search-page-btn"
+                        data-offset="${Math.max(0, data.offset - data.limit)}"
+                        ${data.offset === 0 ? 'disabled' : ''}>Previous</button>
+                <button type="button" class="btn btn-sm btn-outline-secondary search-page-btn"
+                        data-offset="${data.offset + data.limit}"
+                        ${data.offset + vendors.length >= data.total ? 'disabled' : ''}>Next</button>
+            </div>
+        </div>
         `;
     }
     
     container.innerHTML = html;
     
+    container.querySelectorAll('.search-page-btn').forEach(button => {
+        button.addEventListener('click', function() {
+            searchVendors(parseInt(this.getAttribute('data-offset'), 10));
+        });
+    });
+    
     // Initialize feather icons
     if (typeof feather !== 'undefined') {
         feather.replace();
@@ -0,0 +1,38 @@
+from db_utils import diff_items
+
+
+def stored_items():
+    return {
+        "a": {"name": "Laptop", "quantity": None, "description": None},
+        "b": {"name": "Mouse", "quantity": 3, "description": "Wireless"},
+    }
+
+
+def test_noop_resubmit_from_item_editor_changes_nothing():
+    # What data_extraction.js sends back for an unedited page
+    submitted = [
+        {"id": "a", "name": "Laptop", "quantity": 1, "description": ""},
+        {"id": "b", "name": "Mouse", "quantity": "3", "description": "Wireless"},
+    ]
+    inserts, updates, deletes, id_map = diff_items(stored_items(), submitted)
+    assert (inserts, updates, deletes, id_map) == ([], [], [], {})
+
+
+def test_edited_fields_are_updated_in_stored_form():
+    submitted = [
+        {"id": "a", "name": "Laptop", "quantity": "2", "description": ""},
+        {"id": "b", "name": "Mouse", "quantity": 3, "description": ""},
+    ]
+    _, updates, _, _ = diff_items(stored_items(), submitted)
+    assert updates == [
+        {"_id": "a", "name": "Laptop", "quantity": 2, "description": None},
+        {"_id": "b", "name": "Mouse", "quantity": 3, "description": None},
+    ]
+
+
+def test_new_and_removed_items():
+    submitted = [{"id": "new-1", "name": "Cable", "quantity": 5, "description": "Cat6"}]
+    inserts, updates, deletes, id_map = diff_items(stored_items(), submitted)
+    assert updates == []
+    assert sorted(deletes) == ["a", "b"]
+    assert [row["id"] for row in inserts] == [id_map["new-1"]]